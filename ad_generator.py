@@ -1,28 +1,27 @@
 # Standard Libraries
-import json
-import time
-
-# LangChain Libraries
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-
-# Prompt Template for Google Ads Generation
-prompt_template = PromptTemplate(
-    input_variables=[
-        "rules",
-        "website",
-        "questionnaire",
-        "offers",
-        "transcript",
-        "keywords",
-    ],
-    template="""
+import os
+
+# Local Modules
+from ad_schema import parse_json_tolerant, repair_ad
+from concurrency import imap_concurrent
+from prompt_prefix import PrefixStats, SharedPrefix, canonicalize
+from model_routing import for_stage
+
+# Concurrency settings for ad generation (one request per keyword group)
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 1.0
+
+# Keyword groups packed into one request (1 = one request per group; override via AD_BATCH_SIZE)
+BATCH_SIZE = int(os.getenv("AD_BATCH_SIZE", 1))
+
+# Static ad-writing instructions and JSON schema, shared verbatim by every request
+AD_INSTRUCTIONS = """
 You are a Google Ads strategist.
 
 🎯 TASK:
 Generate a high-converting Responsive Search Ad using the provided TRAINING RULES, COMPANY INFO, OFFERS, and TARGET KEYWORDS.
 
-✅ Return strictly valid JSON only. Do not include any commentary, explanations, markdown (like ```json), or extra formatting. The JSON should match the schema shown at the bottom.
+✅ Return strictly valid JSON only. Do not include any commentary, explanations, markdown (like ```json), or extra formatting. The JSON should match the schema shown below.
 
 💡 PRIORITIZATION:
 - Emphasize emotion, urgency, clarity, and user benefit.
@@ -104,7 +103,39 @@ Generate a high-converting Responsive Search Ad using the provided TRAINING RULE
 
 ---
 
-📘 TRAINING RULES:
+✍ Return JSON like this:
+
+{
+  "adGroupName": "...",
+  "path1": "...",
+  "path2": "...",
+  "headlines": ["...", "..."],
+  "descriptions": ["...", "..."],
+  "callouts": ["...", "..."],
+  "sitelinks": [
+    {
+      "headline": "...",
+      "description1": "...",
+      "description2": "..."
+    },
+    ...
+  ],
+  "structuredSnippet": {
+    "snippetType": "Models",
+    "values": ["...", "...", "...", "..."]
+  },
+  "callExtension": "...",
+  "locationExtension": "...",
+  "promotionalExtension": "...",
+  "priceExtension": "..."
+}
+
+---
+
+"""
+
+# Shared run context (rules and client summaries), frozen once per run
+AD_CONTEXT_TEMPLATE = """📘 TRAINING RULES:
 Use these official ad-writing rules to guide structure, clarity, and performance:
 {rules}
 
@@ -133,139 +164,299 @@ Use this to capture intent, delivery style, and customer phrasing:
 
 ---
 
-🔑 TARGET KEYWORDS:
+"""
+
+# Per-group block appended after the shared prefix
+AD_KEYWORDS_TEMPLATE = """🔑 TARGET KEYWORDS:
 These are the only themes or search intents this ad should be focused on. Do not drift to unrelated topics:
 {keywords}
+"""
 
----
+# Per-batch block: several keyword groups answered in one request
+AD_BATCH_TEMPLATE = """🔑 TARGET KEYWORD GROUPS:
+Write one separate ad for EACH keyword group below. Each ad must focus only on its own group's themes or search intents. Do not mix keywords between groups or drift to unrelated topics.
 
-✍ Return JSON like this:
+{groups}
 
-{{
-  "adGroupName": "...",
-  "path1": "...",
-  "path2": "...",
-  "headlines": ["...", "..."],
-  "descriptions": ["...", "..."],
-  "callouts": ["...", "..."],
-  "sitelinks": [
-    {{
-      "headline": "...",
-      "description1": "...",
-      "description2": "..."
-    }},
-    ...
-  ],
-  "structuredSnippet": {{
-    "snippetType": "Models",
-    "values": ["...", "...", "...", "..."]
-  }},
-  "callExtension": "...",
-  "locationExtension": "...",
-  "promotionalExtension": "...",
-  "priceExtension": "..."
-}}
-""",
-)
+✍ Return a JSON array with exactly {count} ad objects, one per group in the same order. Each object must follow the schema above and add a "groupId" field set to its group number.
+"""
 
 
-# Function to generate Google Ads based on keyword groups and provided context
-def generate_ads(llm, keyword_groups, rules, website, questionnaire="", offers="", transcript=""):
-    chain = LLMChain(llm=llm, prompt=prompt_template)
-    ads = []
+# Function to freeze the run's shared context into one canonical prompt prefix
+def build_ad_prefix(rules, website="", questionnaire="", offers="", transcript=""):
+    context = AD_CONTEXT_TEMPLATE.format(
+        rules=canonicalize(rules),
+        website=canonicalize(website),
+        questionnaire=canonicalize(questionnaire),
+        offers=canonicalize(offers),
+        transcript=canonicalize(transcript),
+    )
+    return SharedPrefix(AD_INSTRUCTIONS + context)
 
-    # Iterate through each keyword group and generate ads
-    for idx, (label, keywords) in enumerate(keyword_groups.items()):
-        if not any(keywords):
-            continue
 
-        print(f"\n📢 [{idx+1}/{len(keyword_groups)}] Generating ad for keyword group: '{label}'")
+# Function to render the keyword block appended after the shared prefix
+def render_keywords_block(keywords):
+    return AD_KEYWORDS_TEMPLATE.format(keywords=canonicalize(", ".join(keywords)))
 
-        try:
-            response = chain.run(
-                rules=rules,
-                website=website,
-                questionnaire=questionnaire,
-                offers=offers,
-                transcript=transcript,
-                keywords=", ".join(keywords),
+
+# Function to render several keyword groups into one batched request block
+def render_batch_block(keyword_lists):
+    groups = "\n\n".join(
+        f"Group {n}:\n{canonicalize(', '.join(keywords))}"
+        for n, keywords in enumerate(keyword_lists, start=1)
+    )
+    return AD_BATCH_TEMPLATE.format(groups=groups, count=len(keyword_lists))
+
+
+# Function to parse the model's JSON response (an ad object or an array of ads)
+def parse_ad_response(response):
+    return parse_json_tolerant(response)
+
+
+# A batched ad is only accepted if it has usable headlines and descriptions
+def is_valid_ad(ad):
+    if not isinstance(ad, dict):
+        return False
+    try:
+        return bool(
+            clean_list(_items(ad.get("headlines")), 10)
+            and clean_list(_items(ad.get("descriptions")), 4)
+        )
+    except (AttributeError, TypeError):
+        return False
+
+
+# Clean and structure the ad data
+def clean_list(items, max_len):
+    seen = set()
+    result = []
+    for item in items:
+        if not isinstance(item, str):
+            continue
+        item = item.strip()
+        if item and item.lower() not in seen:
+            seen.add(item.lower())
+            result.append(item)
+        if len(result) >= max_len:
+            break
+    return result
+
+
+# Text of a field the model may have returned as null, a number or the wrong type
+def _text(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return ""
+
+
+# List of a field the model may have returned as null or the wrong type
+def _items(value):
+    return value if isinstance(value, list) else []
+
+
+# Function to convert a parsed ad into a Google Ads Editor row; null or mistyped fields
+# (e.g. "path1": null, or a field a failed repair left invalid) become empty cells
+def build_ad_row(ad, idx):
+
+    # Ensure all fields are present and clean
+    headlines = clean_list(_items(ad.get("headlines")), 10)
+    descriptions = clean_list(_items(ad.get("descriptions")), 4)
+    callouts = clean_list(_items(ad.get("callouts")), 8)
+    structured = ad.get("structuredSnippet")
+    structured = structured if isinstance(structured, dict) else {}
+    snippets = clean_list(_items(structured.get("values")), 4)
+    snippet_type = _text(structured.get("snippetType"))
+    sitelinks = [sl for sl in _items(ad.get("sitelinks")) if isinstance(sl, dict)][:4]
+
+    # Structure the ad row
+    ad_row = {
+        "Campaign": "emarketing",
+        "Ad group": _text(ad.get("adGroupName")) or f"AdGroup_{idx+1}",
+        "Ad type": "Responsive Search Ad",
+        "Final URL": "",
+        "Path 1": _text(ad.get("path1")),
+        "Path 2": _text(ad.get("path2")),
+        **{
+            f"Headline {i+1}": (headlines[i] if i < len(headlines) else "")
+            for i in range(10)
+        },
+        **{
+            f"Description {i+1}": (
+                descriptions[i] if i < len(descriptions) else ""
             )
-            ad = json.loads(response.strip("```json\n").strip("```").strip())
-            
-            # Clean and structure the ad data
-            def clean_list(items, max_len):
-                seen = set()
-                result = []
-                for item in items:
-                    item = item.strip()
-                    if item and item.lower() not in seen:
-                        seen.add(item.lower())
-                        result.append(item)
-                    if len(result) >= max_len:
-                        break
-                return result
-            
-            # Ensure all fields are present and clean
-            headlines = clean_list(ad.get("headlines", []), 10)
-            descriptions = clean_list(ad.get("descriptions", []), 4)
-            callouts = clean_list(ad.get("callouts", []), 8)
-            structured = ad.get("structuredSnippet") or {}
-            snippets = clean_list(structured.get("values", []), 4)
-            snippet_type = structured.get("snippetType", "")
-            sitelinks = ad.get("sitelinks", [])[:4]
-
-            # Structure the ad row
-            ad_row = {
-                "Campaign": "emarketing",
-                "Ad group": ad.get("adGroupName", f"AdGroup_{idx+1}"),
-                "Ad type": "Responsive Search Ad",
-                "Final URL": "",
-                "Path 1": ad.get("path1", "").strip(),
-                "Path 2": ad.get("path2", "").strip(),
-                **{
-                    f"Headline {i+1}": (headlines[i] if i < len(headlines) else "")
-                    for i in range(10)
-                },
-                **{
-                    f"Description {i+1}": (
-                        descriptions[i] if i < len(descriptions) else ""
-                    )
-                    for i in range(4)
-                },
-                **{
-                    f"Callout {i+1}": (callouts[i] if i < len(callouts) else "")
-                    for i in range(8)
-                },
-            }
-
-            # Add sitelinks (1 Headline + 2 Descriptions each)
-            for i in range(4):
-                sl = sitelinks[i] if i < len(sitelinks) else {}
-                ad_row[f"Sitelink Headline {i+1}"] = sl.get("headline", "").strip()
-                ad_row[f"Sitelink Description {i*2+1}"] = sl.get(
-                    "description1", ""
-                ).strip()
-                ad_row[f"Sitelink Description {i*2+2}"] = sl.get(
-                    "description2", ""
-                ).strip()
-
-            # Add structured snippets (1 Type + 4 Values)
-            ad_row["Structured Snippets Type"] = snippet_type.strip()
-            for i in range(4):
-                ad_row[f"Structured Snippets {i+1}"] = (
-                    snippets[i] if i < len(snippets) else ""
-                )
-            
-            # Add extensions
-            ad_row["Call Extension"] = ad.get("callExtension", "").strip()
-            ad_row["Location Extension"] = ad.get("locationExtension", "").strip()
-            ad_row["Promotional Extension"] = ad.get("promotionalExtension", "").strip()
-            ad_row["Price Extension"] = ad.get("priceExtension", "").strip()
-
-            ads.append(ad_row)
+            for i in range(4)
+        },
+        **{
+            f"Callout {i+1}": (callouts[i] if i < len(callouts) else "")
+            for i in range(8)
+        },
+    }
+
+    # Add sitelinks (1 Headline + 2 Descriptions each)
+    for i in range(4):
+        sl = sitelinks[i] if i < len(sitelinks) else {}
+        ad_row[f"Sitelink Headline {i+1}"] = _text(sl.get("headline"))
+        ad_row[f"Sitelink Description {i*2+1}"] = _text(sl.get("description1"))
+        ad_row[f"Sitelink Description {i*2+2}"] = _text(sl.get("description2"))
+
+    # Add structured snippets (1 Type + 4 Values)
+    ad_row["Structured Snippets Type"] = snippet_type
+    for i in range(4):
+        ad_row[f"Structured Snippets {i+1}"] = (
+            snippets[i] if i < len(snippets) else ""
+        )
+
+    # Add extensions
+    ad_row["Call Extension"] = _text(ad.get("callExtension"))
+    ad_row["Location Extension"] = _text(ad.get("locationExtension"))
+    ad_row["Promotional Extension"] = _text(ad.get("promotionalExtension"))
+    ad_row["Price Extension"] = _text(ad.get("priceExtension"))
+
+    return ad_row
+
+# Function to stream ad rows as keyword groups finish, yielding (position, label, ad_row)
+def _iter_group_results(
+    llm,
+    keyword_groups,
+    rules,
+    website="",
+    questionnaire="",
+    offers="",
+    transcript="",
+    max_workers=MAX_WORKERS,
+    requests_per_second=REQUESTS_PER_SECOND,
+    on_progress=None,
+    skip_groups=(),
+    prefix_stats=None,
+    batch_size=BATCH_SIZE,
+    repair=True,
+):
+    # Freeze the shared context once so every group sends a byte-identical prefix
+    prefix = build_ad_prefix(rules, website, questionnaire, offers, transcript)
+    stats = prefix_stats if prefix_stats is not None else PrefixStats()
+    total_groups = len(keyword_groups)
+    print(f"🧩 Shared prompt prefix: {prefix.token_count} tokens")
+
+    # Keep the sheet position of each group so results can be returned in order
+    groups = [
+        (idx, label, keywords)
+        for idx, (label, keywords) in enumerate(keyword_groups.items())
+        if any(keywords) and label not in skip_groups
+    ]
+    batch_size = max(1, batch_size)
+    batches = [
+        list(range(start, min(start + batch_size, len(groups))))
+        for start in range(0, len(groups), batch_size)
+    ]
+
+    ads_llm = for_stage(llm, "ads")
+    repair_llm = for_stage(llm, "repair")
+
+    # Send one request made of the shared prefix plus a suffix block
+    def send(suffix):
+        stats.record(prefix, suffix, getattr(ads_llm, "model_name", ""))
+        return ads_llm.predict(prefix.render(suffix))
+
+    # Repair calls are small follow-ups to the repair stage's model: the ad, its failing
+    # fields and their limits, without the shared prefix
+    def send_repair(block):
+        return repair_llm.predict(block)
+
+    # Validate the parsed ad and regenerate only its invalid fields
+    def finish_ad(ad, keywords, idx):
+        if repair:
+            ad = repair_ad(send_repair, ad, keywords)
+        return build_ad_row(ad, idx)
+
+    # Generate a single ad row, returning None if the group fails
+    def generate_group(group):
+        idx, label, keywords = group
+        print(f"\n📢 [{idx+1}/{total_groups}] Generating ad for keyword group: '{label}'")
+
+        try:
+            ad = parse_ad_response(send(render_keywords_block(keywords)))
+            return finish_ad(ad, keywords, idx)
 
         except Exception as e:
             print(f"❌ Error for group '{label}': {e}")
-        time.sleep(1)
+            return None
+
+    # Generate ads for a batch of groups in one request; invalid groups fall back to single calls
+    def generate_batch(batch):
+        if len(batch) == 1:
+            return [generate_group(groups[batch[0]])]
+
+        labels = [groups[position][1] for position in batch]
+        print(f"\n📦 Generating {len(batch)} ads in one request: {labels}")
+
+        ads_by_group = {}
+        try:
+            suffix = render_batch_block([groups[position][2] for position in batch])
+            ads = parse_ad_response(send(suffix))
+            if isinstance(ads, dict):
+                ads = [ads]
+            for n, ad in enumerate(ads, start=1):
+                if isinstance(ad, dict):
+                    try:
+                        group_id = int(ad.get("groupId", n))
+                    except (TypeError, ValueError):
+                        group_id = n
+                    ads_by_group.setdefault(group_id, ad)
+        except Exception as e:
+            print(f"❌ Error for batch {labels}: {e}")
+
+        rows = []
+        for n, position in enumerate(batch, start=1):
+            idx, label, keywords = groups[position]
+            ad = ads_by_group.get(n)
+            if is_valid_ad(ad):
+                try:
+                    rows.append(finish_ad(ad, keywords, idx))
+                    continue
+                except Exception as e:
+                    print(f"❌ Error for group '{label}': {e}")
+            print(f"↩️ Retrying group '{label}' on its own")
+            rows.append(generate_group(groups[position]))
+        return rows
+
+    # Report each ad row as soon as its batch finishes
+    stream = imap_concurrent(
+        generate_batch,
+        batches,
+        max_workers=max_workers,
+        rate_limit=requests_per_second,
+    )
+    done = 0
+    for batch_index, rows in stream:
+        for position, ad_row in zip(batches[batch_index], rows):
+            done += 1
+            label = groups[position][1]
+            if on_progress:
+                on_progress(done, len(groups), label, ad_row)
+            yield position, label, ad_row
+
+    print(stats.summary())
+
+
+# Generator variant: yield (sheet position, label, ad_row) for each group as soon as it is parsed
+def iter_ads(llm, keyword_groups, rules, website="", **kwargs):
+    for position, label, ad_row in _iter_group_results(
+        llm, keyword_groups, rules, website, **kwargs
+    ):
+        if ad_row is not None:
+            yield position, label, ad_row
 
-    return ads
\ No newline at end of file
+
+# Function to generate Google Ads based on keyword groups and provided context
+def generate_ads(llm, keyword_groups, rules, website="", **kwargs):
+    results = {}
+    for position, _, ad_row in _iter_group_results(
+        llm, keyword_groups, rules, website, **kwargs
+    ):
+        if ad_row is not None:
+            results[position] = ad_row
+
+    # Return the ads in sheet order
+    return [results[position] for position in sorted(results)]
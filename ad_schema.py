@@ -0,0 +1,331 @@
+# Standard Libraries
+import json
+import re
+
+# Snippet headers accepted by Google Ads structured snippets
+SNIPPET_TYPES = [
+    "Amenities",
+    "Brand",
+    "Courses",
+    "Degree Programs",
+    "Destinations",
+    "Featured Hotels",
+    "Insurance Coverage",
+    "Models",
+    "Neighbourhood",
+    "Service Catalogue",
+    "Shows",
+    "Styles",
+    "Types",
+]
+
+# Declared schema for one generated ad (limits match the generation prompt)
+AD_SCHEMA = {
+    "type": "object",
+    "fields": {
+        "adGroupName": {"type": "string", "required": True},
+        "path1": {"type": "string", "max_len": 15},
+        "path2": {"type": "string", "max_len": 15},
+        "headlines": {
+            "type": "list",
+            "count": 10,
+            "required": True,
+            "items": {"type": "string", "max_len": 30},
+        },
+        "descriptions": {
+            "type": "list",
+            "count": 4,
+            "required": True,
+            "items": {"type": "string", "max_len": 90},
+        },
+        "callouts": {
+            "type": "list",
+            "count": 8,
+            "required": True,
+            "items": {"type": "string", "max_len": 25},
+        },
+        "sitelinks": {
+            "type": "list",
+            "count": 4,
+            "required": True,
+            "items": {
+                "type": "object",
+                "fields": {
+                    "headline": {"type": "string", "max_len": 25, "required": True},
+                    "description1": {"type": "string", "max_len": 35, "required": True},
+                    "description2": {"type": "string", "max_len": 35, "required": True},
+                },
+            },
+        },
+        "structuredSnippet": {
+            "type": "object",
+            "required": True,
+            "fields": {
+                "snippetType": {"type": "string", "enum": SNIPPET_TYPES, "required": True},
+                "values": {
+                    "type": "list",
+                    "count": 4,
+                    "required": True,
+                    "items": {"type": "string", "max_len": 25},
+                },
+            },
+        },
+        "callExtension": {"type": "string", "max_len": 25, "required": True},
+        "locationExtension": {"type": "string", "required": True},
+        "promotionalExtension": {"type": "string", "max_len": 25, "required": True},
+        "priceExtension": {"type": "string", "max_len": 25, "required": True},
+    },
+}
+
+# Prompt block asking the model to rewrite only the failing fields
+REPAIR_TEMPLATE = """🛠️ REPAIR:
+An ad you wrote for these TARGET KEYWORDS failed validation: {keywords}
+
+Current ad JSON:
+{ad}
+
+Rewrite ONLY the fields listed below so each one satisfies its rule. Keep the meaning, tone and language of the ad, and do not repeat phrases used elsewhere in it.
+
+{problems}
+
+✍ Return strictly valid JSON only: one object whose keys are exactly the field paths listed above and whose values are the replacement values.
+"""
+
+# How many repair calls to make for one ad before giving up
+REPAIR_ROUNDS = 1
+
+
+# Incremental JSON scanner that tolerates fences, chatter, trailing commas and truncation
+class TolerantJSONParser:
+    def __init__(self):
+        self._buffer = []
+        self._stack = []
+        self._started = False
+        self._finished = False
+        self._in_string = False
+        self._escape = False
+        self._checkpoints = []  # (buffer length, open brackets) after each complete element
+
+    # Consume the next piece of model output
+    def feed(self, text):
+        for char in text:
+            if self._finished:
+                return
+            if not self._started:
+                if char in "{[":
+                    self._started = True
+                    self._stack.append(char)
+                    self._buffer.append(char)
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self._finished = True
+                else:
+                    self._checkpoints.append((len(self._buffer), tuple(self._stack)))
+            elif char == ",":
+                self._checkpoints.append((len(self._buffer) - 1, tuple(self._stack)))
+
+    # Return the parsed value, closing any structure left open by truncated output
+    def close(self):
+        if not self._started:
+            raise ValueError("No JSON object found in model output")
+
+        text = "".join(self._buffer)
+        candidates = [(text, tuple(self._stack), self._in_string)]
+        for length, stack in reversed(self._checkpoints):
+            candidates.append((text[:length], stack, False))
+
+        for candidate, stack, in_string in candidates:
+            if in_string:
+                candidate += '"'
+            candidate = candidate.rstrip().rstrip(",")
+            candidate += "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+            candidate = re.sub(r",\s*([\]}])", r"\1", candidate)
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+
+        raise ValueError("Could not recover JSON from model output")
+
+
+# An ad, a batch of ads or a field -> value fix map (not a stray "[2]" from chatter)
+def _is_structured(value):
+    if isinstance(value, dict):
+        return True
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+# Parse model output into JSON, tolerating common formatting problems. Chatter may contain
+# brackets of its own, so scanning restarts at the next opener until an object (or a list
+# of objects) is found; failing that, the first value that parsed is returned
+def parse_json_tolerant(text):
+    first = None
+    for match in re.finditer(r"[\[{]", text or ""):
+        parser = TolerantJSONParser()
+        parser.feed(text[match.start():])
+        try:
+            value = parser.close()
+        except ValueError:
+            continue
+        if _is_structured(value):
+            return value
+        if first is None:
+            first = (value,)
+
+    if first is not None:
+        return first[0]
+    raise ValueError("No JSON object found in model output")
+
+
+# Validate a value against a schema node, collecting (path, problem) pairs
+def _validate(value, spec, path, errors):
+    kind = spec["type"]
+
+    if kind == "string":
+        if not isinstance(value, str):
+            errors.append((path, "must be a text value"))
+            return
+        text = value.strip()
+        if spec.get("required") and not text:
+            errors.append((path, "must not be empty"))
+        elif spec.get("max_len") and len(text) > spec["max_len"]:
+            errors.append((path, f"is {len(text)} characters, max {spec['max_len']}"))
+        elif spec.get("enum") and text not in spec["enum"]:
+            errors.append((path, f"must be one of: {', '.join(spec['enum'])}"))
+
+    elif kind == "list":
+        if not isinstance(value, list):
+            errors.append((path, f"must be a list of {spec['count']} items"))
+            return
+        seen = set()
+        for i, item in enumerate(value[: spec["count"]]):
+            item_path = f"{path}[{i}]"
+            before = len(errors)
+            _validate(item, spec["items"], item_path, errors)
+            if len(errors) == before and isinstance(item, str):
+                key = item.strip().lower()
+                if key in seen:
+                    errors.append((item_path, "duplicates another item in the list"))
+                seen.add(key)
+        for i in range(len(value), spec["count"]):
+            errors.append((f"{path}[{i}]", "is missing"))
+
+    elif kind == "object":
+        if not isinstance(value, dict):
+            errors.append((path, "must be an object"))
+            return
+        for name, field_spec in spec["fields"].items():
+            field_path = f"{path}.{name}" if path else name
+            if name not in value or value[name] is None:
+                if field_spec.get("required"):
+                    errors.append((field_path, "is missing"))
+                continue
+            _validate(value[name], field_spec, field_path, errors)
+
+
+# Function to validate an ad against AD_SCHEMA; returns a list of (path, problem)
+def validate_ad(ad, schema=AD_SCHEMA):
+    errors = []
+    _validate(ad, schema, "", errors)
+    return errors
+
+
+# Split a field path like "sitelinks[1].headline" into keys and indexes
+def _path_parts(path):
+    return [
+        int(index) if index else name
+        for name, index in re.findall(r"([A-Za-z_][A-Za-z0-9_]*)|\[(\d+)\]", path)
+    ]
+
+
+# Set a value inside the ad at the given field path, creating containers as needed
+def set_path(ad, path, value):
+    parts = _path_parts(path)
+    if not parts:
+        return
+    target = ad
+    for part, next_part in zip(parts, parts[1:]):
+        # A fresh container for every slot, so padded list items never alias each other
+        container = list if isinstance(next_part, int) else dict
+        if isinstance(part, int):
+            while len(target) <= part:
+                target.append(container())
+            if not isinstance(target[part], container):
+                target[part] = container()
+        elif not isinstance(target.get(part), container):
+            target[part] = container()
+        target = target[part]
+
+    last = parts[-1]
+    if isinstance(last, int):
+        while len(target) <= last:
+            target.append(None)
+    target[last] = value
+
+
+# Read the value at a field path (None if it does not exist)
+def get_path(ad, path):
+    value = ad
+    for part in _path_parts(path):
+        try:
+            value = value[part]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return value
+
+
+# Function to render the repair prompt block for the failing fields
+def render_repair_block(ad, errors, keywords):
+    problems = "\n".join(
+        f'- "{path}" {problem}. Current value: {json.dumps(get_path(ad, path), ensure_ascii=False)}'
+        for path, problem in errors
+    )
+    return REPAIR_TEMPLATE.format(
+        keywords=", ".join(keywords),
+        ad=json.dumps(ad, ensure_ascii=False),
+        problems=problems,
+    )
+
+
+# Function to fix invalid fields with small follow-up calls instead of regenerating the ad
+def repair_ad(send, ad, keywords, rounds=REPAIR_ROUNDS):
+    errors = validate_ad(ad)
+    for _ in range(rounds):
+        if not errors:
+            break
+        print(f"🛠️ Repairing {len(errors)} invalid field(s): {[path for path, _ in errors]}")
+        try:
+            fixes = parse_json_tolerant(send(render_repair_block(ad, errors, keywords)))
+        except Exception as e:
+            print(f"❌ Repair failed: {e}")
+            break
+        if not isinstance(fixes, dict):
+            break
+
+        failing = {path for path, _ in errors}
+        for path, value in fixes.items():
+            if path in failing:
+                set_path(ad, path, value)
+        errors = validate_ad(ad)
+
+    if errors:
+        print(f"⚠️ {len(errors)} field(s) still invalid after repair")
+    return ad
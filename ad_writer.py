@@ -0,0 +1,135 @@
+# Standard Libraries
+import csv
+import os
+
+# Third-Party Libraries
+import pandas as pd
+from openpyxl import Workbook
+
+# Journal column recording which keyword group produced each row
+GROUP_COLUMN = "Keyword Group"
+
+# Journal column recording the group's position in the keyword sheet
+POSITION_COLUMN = "Sheet Position"
+JOURNAL_COLUMNS = (GROUP_COLUMN, POSITION_COLUMN)
+
+
+# Path of the CSV journal holding the rows written so far for a run
+def journal_path(output_path, run_key=""):
+    suffix = f".{run_key[:12]}" if run_key else ""
+    return f"{output_path}{suffix}.partial.csv"
+
+
+# Whether an output path is written as CSV (anything else is XLSX)
+def is_csv_output(output_path):
+    return output_path.lower().endswith(".csv")
+
+
+# Function to load a finalized output file as strings, in whichever format it was written
+def read_output(output_path):
+    if is_csv_output(output_path):
+        return pd.read_csv(output_path, dtype=str, keep_default_na=False)
+    return pd.read_excel(output_path, dtype=str).fillna("")
+
+
+# Function to save ad rows back to an output file in the format its path names
+def write_output(df, output_path):
+    if is_csv_output(output_path):
+        df.to_csv(output_path, index=False)
+    else:
+        df.to_excel(output_path, index=False)
+    return output_path
+
+
+# Incremental ad row writer: appends each row to a CSV journal as soon as it is
+# generated, then streams the journal into the final XLSX or CSV output
+class AdRowWriter:
+    def __init__(self, output_path, run_key=""):
+        self.output_path = output_path
+        self.journal_path = journal_path(output_path, run_key)
+        self.fieldnames = None
+        self.completed_groups = set()
+        self.rows_written = 0
+
+        # Resume from an existing journal for the same run
+        if os.path.exists(self.journal_path):
+            self._load_journal()
+
+        self._file = open(self.journal_path, "a", newline="", encoding="utf-8")
+        self._writer = None
+        if self.fieldnames:
+            # Journals from before sheet positions were recorded have no position column
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+
+    # Read completed groups and drop a row left half-written by a crash
+    def _load_journal(self):
+        with open(self.journal_path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            self.fieldnames = reader.fieldnames
+            rows = list(reader)
+
+        valid = [row for row in rows if None not in row.values() and None not in row]
+        if len(valid) != len(rows):
+            with open(self.journal_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=self.fieldnames)
+                writer.writeheader()
+                writer.writerows(valid)
+
+        self.completed_groups = {row[GROUP_COLUMN] for row in valid}
+        self.rows_written = len(valid)
+        print(f"♻️ Resuming: {self.rows_written} ad rows already written to {self.journal_path}")
+
+    # Append one ad row and flush it to disk so a crash keeps it; position is the group's
+    # place in the keyword sheet (rows without one go last, in completion order)
+    def write(self, label, ad_row, position=None):
+        if self._writer is None:
+            self.fieldnames = [*JOURNAL_COLUMNS, *ad_row.keys()]
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+            self._writer.writeheader()
+
+        position = "" if position is None else position
+        self._writer.writerow({GROUP_COLUMN: label, POSITION_COLUMN: position, **ad_row})
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.completed_groups.add(label)
+        self.rows_written += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    # Write the journal into the final output file (XLSX or CSV) in keyword sheet order,
+    # whatever order the groups finished in; the journal is kept when some groups failed,
+    # so the next run retries only those
+    def finalize(self, keep_journal=False):
+        self.close()
+        columns = [name for name in (self.fieldnames or []) if name not in JOURNAL_COLUMNS]
+
+        with open(self.journal_path, newline="", encoding="utf-8") as f:
+            journal = sorted(csv.DictReader(f), key=_sheet_position)
+        rows = ([row[name] for name in columns] for row in journal)
+
+        if is_csv_output(self.output_path):
+            with open(self.output_path, "w", newline="", encoding="utf-8") as out:
+                writer = csv.writer(out)
+                if columns:
+                    writer.writerow(columns)
+                writer.writerows(rows)
+        else:
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("Sheet1")
+            if columns:
+                sheet.append(columns)
+            for row in rows:
+                sheet.append(row)
+            workbook.save(self.output_path)
+
+        if not keep_journal:
+            os.remove(self.journal_path)
+        return self.output_path
+
+
+# Sort key for journal rows: sheet position, with rows that have none (older journals) last
+def _sheet_position(row):
+    position = row.get(POSITION_COLUMN) or ""
+    return (0, int(position)) if position.isdigit() else (1, 0)
@@ -0,0 +1,97 @@
+# Standard Libraries
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Cache size and lifetime (override via environment variables)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 200))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 3600))
+
+# Words that carry no meaning for matching questions
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "can", "could",
+    "would", "should", "will", "you", "your", "me", "my", "i", "we", "our", "us",
+    "they", "their", "it", "its", "this", "that", "these", "those", "of", "for",
+    "to", "in", "on", "at", "by", "with", "about", "from", "and", "or", "please",
+    "tell", "give", "show", "there", "any", "some", "have", "has", "s",
+}
+
+# Negations are always kept as terms, so "Do you not offer X?" never reuses "Do you offer X?"
+NEGATION_WORDS = frozenset({"not", "no", "never", "none", "nor", "without"})
+
+
+# Lowercase, drop punctuation and collapse whitespace
+def normalize_question(question):
+    text = question.lower().replace("’", "'")
+    text = re.sub(r"\bcan't\b|\bcannot\b", "can not", text)
+    text = re.sub(r"\bwon't\b", "will not", text)
+    text = re.sub(r"n't\b", " not", text)
+    text = re.sub(r"'s\b|'", "", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# Content words of a normalized question, with a plural "s" stripped
+def question_terms(normalized):
+    return frozenset(
+        word[:-1] if len(word) > 3 and word.endswith("s") else word
+        for word in normalized.split()
+        if word in NEGATION_WORDS or word not in STOPWORDS
+    )
+
+
+# Cache key of a question: its content terms, so only paraphrases with exactly the same
+# terms (question word, places, negations...) share an answer
+def question_key(question):
+    normalized = normalize_question(question)
+    return question_terms(normalized) or frozenset({normalized})
+
+
+# Per-session answer cache keyed on the question terms and the document set, with TTL/LRU eviction
+class AnswerCache:
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (doc_hash, terms) -> (answer, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Drop entries older than the TTL
+    def _expire(self, now):
+        for key in [key for key, (_, stored_at) in self._entries.items() if now - stored_at > self.ttl]:
+            del self._entries[key]
+
+    # Function to return a cached (response, source) for this question or a paraphrase of it
+    def get(self, question, doc_hash):
+        key = (doc_hash, question_key(question))
+        with self._lock:
+            self._expire(time.time())
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    # Function to store an answer, evicting the least recently used entries past the limit
+    def set(self, question, doc_hash, answer):
+        key = (doc_hash, question_key(question))
+        with self._lock:
+            self._entries[key] = (answer, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        return (
+            f"🗃️ Answer cache: {self.hits} hits / {self.misses} misses "
+            f"({self.hit_rate:.0%}) | {len(self._entries)} stored"
+        )
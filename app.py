@@ -8,22 +8,15 @@ import pandas as pd
 import bcrypt
 import streamlit as st
 
-# LangChain Libraries
-from langchain.chat_models import ChatOpenAI
-
 # Local Modules
-from file_utils import (
-    download_google_file_as_bytes,
-    extract_text_from_pdf_bytes,
-    extract_text_auto,
-    extract_text_from_docx_bytes,
-    read_excel_sheet_from_bytes,
-)
-from summarizer import summarize_text
-from ad_generator import generate_ads
+from generation import run_generation
+from model_routing import ModelRouter
+from jobs import DONE, FAILED, QUEUED, get_job_runner
+from tracing import start_metrics_server
 
 # Chatbot Logic
-from chatbot import answer_question
+from chatbot import answer_question, build_chat_index
+from answer_cache import AnswerCache
 
 # Streamlit App Configuration
 st.set_page_config(page_title="Google Ads Generator", layout="wide", page_icon="📢")
@@ -36,6 +29,9 @@ if "ads_ready" not in st.session_state:
 api_key = st.secrets["OPENAI_API_KEY"]
 training_url = st.secrets["TRAINING_PDF_URL"]
 
+# Seconds between UI refreshes while a generation job is running
+JOB_POLL_SECONDS = 2
+
 
 # Authentication Function
 def check_password(username: str, password: str) -> bool:
@@ -131,52 +127,28 @@ with st.sidebar:
         st.rerun()
 
 
-# Initialize the LLM
-llm = ChatOpenAI(
-    model_name="gpt-4.1-2025-04-14",
-    temperature=0.3,
-    openai_api_key=api_key,
-)
+# Per-stage models (MODEL_ROUTING in .env overrides the defaults), built once per process so
+# reruns keep the same clients, connection pools and governors
+@st.cache_resource
+def get_llm(api_key):
+    return ModelRouter(api_key=api_key, temperature=0.3)
 
 
-# Function to summarize text with progress bar
-def summarize_with_progress(title, text):
-    st.subheader(f"🧠 Summarizing: {title}")
-    placeholder = st.empty()
-    bar = st.progress(0.0)
-    total_start = time.time()
-    chunks = text.split("\n\n")
-    summaries = []
-    total = len(chunks)
-
-    for i, chunk in enumerate(chunks, 1):
-        summary = llm.predict(
-            f"""
-You are a Google Ads strategist. Summarize this part of the document titled '{title}' into 150 words or fewer.
-
-CONTENT:
-{chunk}
-"""
-        )
-        summaries.append(summary)
-        elapsed = time.time() - total_start
-        avg_time = elapsed / i
-        remaining = avg_time * (total - i)
-        placeholder.text(f"⏳ ETA: {int(remaining)}s | Elapsed: {int(elapsed)}s")
-        bar.progress(i / total)
-        time.sleep(0.5)
-
-    final_prompt = f"""
-You are a Google Ads strategist. Summarize the following summaries of the document titled '{title}' into 400 words or fewer.
-
-CONTENT:
-{"\n\n".join(summaries)}
-"""
-    combined = llm.predict(final_prompt)
-    bar.empty()
-    placeholder.empty()
-    st.success(f"✅ Summary complete for: {title}")
-    return combined
+# Generation runs on the shared background job runner so reruns never interrupt it; the
+# handler is registered once, not on every rerun
+@st.cache_resource
+def get_generation_runner(api_key, training_url):
+    llm = get_llm(api_key)
+    runner = get_job_runner()
+    runner.register("generate_ads", lambda job: run_generation(job, llm, training_url))
+    return runner
+
+
+llm = get_llm(api_key)
+job_runner = get_generation_runner(api_key, training_url)
+
+# Prometheus text endpoint for stage and LLM call metrics (once per process; only when METRICS_PORT is set)
+start_metrics_server()
 
 
 # Main App UI
@@ -208,103 +180,79 @@ keyword_url = st.text_input(
 sheet_name = st.text_input("📑 Sheet Name", placeholder="e.g., Sheet1")
 generate = st.button("🚀 Generate Ads", use_container_width=True)
 
-# Ad Generation Flow
+# Ad Generation Flow: enqueue a job; the page polls it below
 if generate:
-    try:
-        # Reset download visibility
+    if not keyword_url or not sheet_name:
+        st.error("❌ Please provide both the Keywords sheet and Sheet name.")
+    else:
         st.session_state["ads_ready"] = False
-
-        start_total = time.time()
+        st.session_state["job_id"] = job_runner.submit(
+            "generate_ads",
+            {
+                "urls": {
+                    "website": website_url,
+                    "questionnaire": questionnaire_url,
+                    "offers": offers_url,
+                    "transcript": transcript_url,
+                },
+                "keyword_url": keyword_url,
+                "sheet_name": sheet_name,
+            },
+            owner=st.session_state.get("username", "user"),
+        )
         st.success("✅ Inputs received. Starting processing...")
 
-        if not keyword_url or not sheet_name:
-            st.error("❌ Please provide both the Keywords sheet and Sheet name.")
-            st.stop()
-
-        def extract_google_file(url: str) -> str:
-            file_bytes = download_google_file_as_bytes(url)
-            return extract_text_auto(file_bytes)
+# After a reconnect, pick up this user's latest job
+if "job_id" not in st.session_state:
+    recent = job_runner.recent_jobs(st.session_state.get("username", "user"), limit=1)
+    if recent:
+        st.session_state["job_id"] = recent[0]
 
-        summaries = {"website": "", "questionnaire": "", "offers": "", "transcript": ""}
+job = job_runner.get(st.session_state["job_id"]) if "job_id" in st.session_state else None
+job_active = job is not None and job["status"] not in (DONE, FAILED)
 
-        with st.status(
-            "📥 Downloading and extracting documents...", expanded=True
-        ) as status:
-            st.write("📘 Summarizing Training Rules...")
-            training_text = extract_text_auto(
-                download_google_file_as_bytes(training_url)
-            )
-            rules_summary = summarize_with_progress("Training Rules", training_text)
-
-            if website_url:
-                summaries["website"] = summarize_with_progress(
-                    "Website Summary", extract_google_file(website_url)
-                )
-            if questionnaire_url:
-                summaries["questionnaire"] = summarize_with_progress(
-                    "Questionnaire", extract_google_file(questionnaire_url)
-                )
-            if offers_url:
-                summaries["offers"] = summarize_with_progress(
-                    "Offers", extract_google_file(offers_url)
-                )
-            if transcript_url:
-                summaries["transcript"] = summarize_with_progress(
-                    "Zoom Transcript", extract_google_file(transcript_url)
-                )
-
-            if not any(summaries.values()):
-                st.error("❌ At least one optional document must be provided.")
-                st.stop()
-
-            st.session_state["training_text"] = training_text
-            st.session_state["summaries"] = summaries
-
-            # Download and process the keywords sheet
-            excel_bytes = download_google_file_as_bytes(keyword_url)
-            df = read_excel_sheet_from_bytes(excel_bytes, sheet_name)
-
-            # Keyword Groups Extraction
-            keyword_groups = {
-                col.strip(): df[col].dropna().astype(str).tolist()
-                for col in df.columns
-                if df[col].dropna().any()
-            }
-            st.write(f"📊 Found `{len(keyword_groups)}` keyword groups in sheet.")
-
-            # Generate keyword summary text
-            keyword_summary_text = ""
-            for group, words in keyword_groups.items():
-                if words:
-                    keyword_summary_text += f"\n🗂️ {group}:\n- " + "\n- ".join(words)
-
-            st.session_state["keyword_summary"] = keyword_summary_text.strip()
-            status.update(label="✅ All documents loaded.", state="complete")
-
-        st.markdown("## 🛠️ Generating Ads")
-        progress_label = st.empty()
-        progress_bar = st.progress(0)
-        ads = []
-
-        for idx, (label, keywords) in enumerate(keyword_groups.items()):
-            progress_label.markdown(
-                f"🔄 Generating ad for **{label}** (`{idx+1}/{len(keyword_groups)}`)"
-            )
-            ads.extend(generate_ads(llm, {label: keywords}, rules_summary, **summaries))
-            progress_bar.progress((idx + 1) / len(keyword_groups))
-
-        # Store output in session state for persistence
-        output_df = pd.DataFrame(ads)
+# === Job Progress ===
+if job_active:
+    st.markdown("## 🛠️ Generating Ads")
+    if job["status"] == QUEUED:
+        st.info(f"⏳ Queued: `{job['position']}` job(s) ahead of yours.")
+    else:
+        st.progress(min(job["progress"], 1.0))
+        st.write(job["message"])
+    with st.expander("📜 Job log"):
+        st.text("\n".join(job["log"]))
+elif job is not None and job["status"] == FAILED:
+    st.error(f"❌ Error: {job['error']}")
+
+# Load a finished job's output into the session once
+elif job is not None and st.session_state.get("loaded_job_id") != job["id"]:
+    result = job["result"]
+    try:
+        output_df = pd.read_excel(result["output_path"], dtype=str).fillna("")
+    except FileNotFoundError:
+        output_df = None
+        st.warning("⚠️ The output file of your last job no longer exists. Please generate again.")
+    if output_df is not None:
         output_buffer = BytesIO()
         output_df.to_excel(output_buffer, index=False)
         output_buffer.seek(0)
         st.session_state["output_df"] = output_df
         st.session_state["output_buffer"] = output_buffer
+        st.session_state["training_text"] = result["training_text"]
+        st.session_state["summaries"] = result["summaries"]
+        st.session_state["keyword_summary"] = result["keyword_summary"]
+        st.session_state["trace_summary"] = result.get("trace_summary", [])
+        st.session_state["llm_metrics"] = result.get("llm_metrics", {})
+        st.session_state["stage_costs"] = result.get("stage_costs", [])
+
+        # Index the source documents once so each chat question is a single LLM call
+        st.session_state["chat_index"] = build_chat_index(
+            {**result["document_chunks"], "Target Keywords": result["keyword_summary"]}
+        )
         st.session_state["ads_ready"] = True
-        st.info(f"⏱️ Total processing time: {round(time.time() - start_total)} seconds")
-
-    except Exception as e:
-        st.error(f"❌ Error: {str(e)}")
+    st.session_state["loaded_job_id"] = job["id"]
+    if output_df is not None:
+        st.info(f"⏱️ Total processing time: {result['elapsed']} seconds")
 
 # === Persistent Output Display ===
 if st.session_state.get("ads_ready") and "output_buffer" in st.session_state:
@@ -317,6 +265,22 @@ if st.session_state.get("ads_ready") and "output_buffer" in st.session_state:
         use_container_width=True,
         key="download_button_cached",  # ✅ Unique key
     )
+    if st.session_state.get("llm_metrics"):
+        metrics = st.session_state["llm_metrics"]
+        st.caption(
+            f"📈 LLM: {metrics['calls']} calls | p50 {metrics['latency_p50']}s, "
+            f"p95 {metrics['latency_p95']}s | tokens {metrics['prompt_tokens']} in / "
+            f"{metrics['completion_tokens']} out | {metrics['retries']} retries"
+        )
+    if st.session_state.get("trace_summary"):
+        with st.expander("🧭 Run summary: where the time went"):
+            st.dataframe(
+                pd.DataFrame(st.session_state["trace_summary"]).set_index("stage"),
+                use_container_width=True,
+            )
+    if st.session_state.get("stage_costs"):
+        with st.expander("💵 Cost and latency by model stage"):
+            st.dataframe(pd.DataFrame(st.session_state["stage_costs"]), use_container_width=True)
 
 
 # === Sidebar for Chatbot Interaction ===
@@ -336,7 +300,25 @@ if ask and user_question:
                 "Zoom Transcript": st.session_state["summaries"]["transcript"],
                 "Target Keywords": st.session_state.get("keyword_summary", ""),
             }
-            with st.spinner("Thinking..."):
-                response, source = answer_question(llm, user_question, docs_for_chat)
-                st.sidebar.markdown(f"**💬 Answer:** {response}")
-                st.sidebar.markdown(f"📄 *Reference:* `{source}`")
+            # Repeated or paraphrased questions about the same documents are answered from cache
+            answer_cache = st.session_state.setdefault("answer_cache", AnswerCache())
+            chat_index = st.session_state["chat_index"]
+            cached = answer_cache.get(user_question, chat_index.hash)
+            if cached:
+                response, source = cached
+            else:
+                with st.spinner("Thinking..."):
+                    response, source = answer_question(
+                        llm, user_question, chat_index, documents=docs_for_chat
+                    )
+                answer_cache.set(user_question, chat_index.hash, (response, source))
+            st.sidebar.markdown(f"**💬 Answer:** {response}")
+            st.sidebar.markdown(f"📄 *Reference:* `{source}`")
+
+if "answer_cache" in st.session_state:
+    st.sidebar.caption(st.session_state["answer_cache"].summary())
+
+# Keep polling while the job runs (any widget interaction simply reruns sooner)
+if job_active:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
@@ -0,0 +1,181 @@
+# Standard Libraries
+import json
+import re
+
+# Third-Party Libraries
+import pandas as pd
+
+# Local Modules
+from ad_schema import parse_json_tolerant
+from concurrency import map_concurrent
+from model_routing import for_stage
+
+# Google Ads character limits by output column (matched on the column name)
+COLUMN_LIMITS = [
+    (r"Headline \d+", "headline", 30),
+    (r"Description \d+", "description", 90),
+    (r"Callout \d+", "callout", 25),
+    (r"Sitelink Headline \d+", "sitelink headline", 25),
+    (r"Sitelink Description \d+", "sitelink description", 35),
+    (r"Structured Snippets \d+", "snippet value", 25),
+    (r"Path \d+", "path", 15),
+    (r"(Call|Promotional|Price) Extension", "extension", 25),
+]
+
+# Families deduped across the whole run; the rest (paths, extensions, ...) repeat
+# legitimately from group to group and are only deduped within one ad
+CROSS_GROUP_DEDUPE_FAMILIES = ("headline", "description")
+
+# Violations sent per "shorten these" request
+SHORTEN_BATCH_SIZE = 40
+
+# Prompt used to rewrite a batch of over-length or duplicate assets in one call
+SHORTEN_TEMPLATE = """
+You are a Google Ads strategist. Rewrite each ad asset below so it fits its character limit and, where a near-duplicate is named, reads clearly different from it. Keep the meaning, tone and key benefit. Do not add new claims.
+
+{items}
+
+Return strictly valid JSON only: one object mapping each id to its rewritten text.
+"""
+
+
+# Map each limited column to its asset family and character limit
+def limited_columns(columns):
+    result = {}
+    for column in columns:
+        for pattern, family, limit in COLUMN_LIMITS:
+            if re.fullmatch(pattern, column):
+                result[column] = (family, limit)
+                break
+    return result
+
+
+# Lowercase, drop punctuation and collapse whitespace so near-duplicates compare equal
+def _normalize(values):
+    return (
+        values.str.lower()
+        .str.replace(r"[^\w\s]", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+# Function to find every over-length and near-duplicate asset in one columnar pass
+def find_violations(df, dedupe_across_groups=True, cross_group_families=CROSS_GROUP_DEDUPE_FAMILIES):
+    columns = limited_columns(df.columns)
+    if df.empty or not columns:
+        return pd.DataFrame(columns=["row", "column", "family", "limit", "value", "issue"])
+
+    # One long table of (row, column, value) for every limited asset in the run
+    assets = (
+        df[list(columns)]
+        .fillna("")
+        .astype(str)
+        .rename_axis("row")
+        .reset_index()
+        .melt(id_vars="row", var_name="column", value_name="value")
+    )
+    assets["value"] = assets["value"].str.strip()
+    assets = assets[assets["value"] != ""]
+    assets["family"] = assets["column"].map(lambda c: columns[c][0])
+    assets["limit"] = assets["column"].map(lambda c: columns[c][1])
+    assets["length"] = assets["value"].str.len()
+    assets["norm"] = _normalize(assets["value"])
+
+    # Order by row then column so the first occurrence of an asset is kept
+    column_order = {column: i for i, column in enumerate(df.columns)}
+    assets = assets.assign(order=assets["column"].map(column_order)).sort_values(["row", "order"])
+
+    # Duplicates are looked for within a scope: the whole run for cross-group families,
+    # otherwise the asset's own row
+    across = assets["family"].isin(cross_group_families if dedupe_across_groups else ())
+    assets["scope"] = assets["row"].where(~across, -1)
+
+    too_long = assets["length"] > assets["limit"]
+    subset = ["scope", "family", "norm"]
+    duplicate = assets.duplicated(subset=subset) & (assets["norm"] != "")
+
+    assets["issue"] = ""
+    assets.loc[too_long, "issue"] = (
+        "too long (" + assets.loc[too_long, "length"].astype(str) + " chars)"
+    )
+    if duplicate.any():
+        first_seen = assets.drop_duplicates(subset=subset).set_index(subset)["value"]
+        keys = pd.MultiIndex.from_frame(assets.loc[duplicate, subset])
+        originals = pd.Series(first_seen.reindex(keys).to_numpy(), index=assets.index[duplicate])
+        assets.loc[duplicate, "issue"] = (
+            assets.loc[duplicate, "issue"] + "; near-duplicate of \"" + originals + "\""
+        ).str.lstrip("; ")
+
+    violations = assets[too_long | duplicate]
+    return violations[["row", "column", "family", "limit", "value", "issue"]].reset_index(drop=True)
+
+
+# Cut text at a word boundary so it fits within limit characters
+def truncate_to_limit(text, limit):
+    text = text.strip()
+    if len(text) <= limit:
+        return text
+    cut = text[: limit + 1].rsplit(" ", 1)[0] if " " in text[: limit + 1] else text[:limit]
+    return cut[:limit].rstrip(" ,;:-–")
+
+
+# Function to fix violations with a few batched LLM calls, then hard-truncate any leftovers
+def enforce_asset_limits(
+    llm,
+    df,
+    dedupe_across_groups=True,
+    batch_size=SHORTEN_BATCH_SIZE,
+    max_workers=4,
+    cross_group_families=CROSS_GROUP_DEDUPE_FAMILIES,
+):
+    llm = for_stage(llm, "repair")
+    df = df.copy()
+    violations = find_violations(df, dedupe_across_groups, cross_group_families)
+    report = {"violations": len(violations), "rewritten": 0, "truncated": 0, "calls": 0}
+    if violations.empty:
+        return df, report
+
+    print(f"✂️ Fixing {len(violations)} asset(s) over limit or duplicated across the run")
+    batches = [violations.iloc[i : i + batch_size] for i in range(0, len(violations), batch_size)]
+
+    # Rewrite one batch of violating assets in a single request
+    def rewrite(batch):
+        items = "\n".join(
+            f'- id "{i}": {row.family}, max {row.limit} characters, {row.issue}: '
+            f"{json.dumps(row.value, ensure_ascii=False)}"
+            for i, row in batch.iterrows()
+        )
+        try:
+            fixes = parse_json_tolerant(llm.predict(SHORTEN_TEMPLATE.format(items=items)))
+            return fixes if isinstance(fixes, dict) else {}
+        except Exception as e:
+            print(f"❌ Error shortening assets: {e}")
+            return {}
+
+    results = map_concurrent(rewrite, batches, max_workers=max_workers)
+    report["calls"] = len(batches)
+
+    for fixes in results:
+        for key, text in fixes.items():
+            try:
+                i = int(key)
+            except (TypeError, ValueError):
+                continue
+            if i in violations.index and isinstance(text, str) and text.strip():
+                row = violations.loc[i]
+                df.at[row["row"], row["column"]] = text.strip()
+                report["rewritten"] += 1
+
+    # Anything still over its limit would be rejected on import, so truncate it
+    for _, row in find_violations(df, dedupe_across_groups=False).iterrows():
+        value = str(df.at[row["row"], row["column"]])
+        if len(value) > row["limit"]:
+            df.at[row["row"], row["column"]] = truncate_to_limit(value, row["limit"])
+            report["truncated"] += 1
+
+    print(
+        f"✅ Asset limits: {report['rewritten']} rewritten in {report['calls']} call(s), "
+        f"{report['truncated']} truncated"
+    )
+    return df, report
@@ -0,0 +1,285 @@
+# Standard Libraries
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Benchmarks never touch the app's caches: point every cache at a scratch directory
+# before the Local Modules read their paths
+SCRATCH_DIR = tempfile.mkdtemp(prefix="ads_bench_")
+for _name, _path in [
+    ("CHECKPOINT_PATH", "checkpoints.sqlite3"),
+    ("SUMMARY_CACHE_PATH", "summaries.sqlite3"),
+    ("PAGE_CACHE_PATH", "pages.sqlite3"),
+    ("DOWNLOAD_CACHE_DIR", "downloads"),
+    ("TRACE_DIR", "traces"),
+]:
+    os.environ[_name] = os.path.join(SCRATCH_DIR, _path)
+
+# Third-Party Libraries
+import pandas as pd
+from docx import Document
+
+# Local Modules
+from file_utils import download_google_file_as_bytes, extract_chunks_auto
+from chunking import CHUNK_TOKENS, chunk_text, chunks_to_text
+from summarizer import summarize_chunks
+from ad_generator import build_ad_row, generate_ads, parse_ad_response
+from ad_writer import AdRowWriter
+from generation import DOCUMENT_TITLES, run_pipeline
+from llm_replay import FixtureStore, record_llm, replay_router
+from mock_llm import MOCK_LATENCY_SCALE, mock_response
+from benchmark_routing import CORPUS_DIR, load_corpus
+
+# Sheet name used for the generated keyword workbook
+SHEET_NAME = "Keywords"
+
+# A stage counts as a regression when it is this much slower than the baseline
+REGRESSION_THRESHOLD = 0.2
+
+
+# Quiet static file server for the benchmark inputs
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+# Function to serve a directory over HTTP on a free local port; returns (base_url, server)
+def serve_directory(path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=path))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server
+
+
+# Function to write the corpus as DOCX files plus a keyword workbook, repeated `scale` times
+def build_inputs(corpus_dir, scale, out_dir):
+    documents, keyword_groups = load_corpus(corpus_dir)
+    for key, text in documents.items():
+        doc = Document()
+        for _ in range(scale if key != "rules" else 1):
+            for paragraph in text.split("\n"):
+                doc.add_paragraph(paragraph)
+        doc.save(os.path.join(out_dir, f"{key}.docx"))
+
+    # Every copy of a group is its own ad group, so the sheet scales with the documents
+    groups = {
+        f"{label} {n + 1}" if n else label: keywords
+        for n in range(scale)
+        for label, keywords in keyword_groups.items()
+    }
+    sheet = pd.DataFrame({label: pd.Series(keywords) for label, keywords in groups.items()})
+    sheet.to_excel(os.path.join(out_dir, "keywords.xlsx"), sheet_name=SHEET_NAME, index=False)
+    return list(documents), groups
+
+
+# Times one benchmark step and its peak traced memory
+class StageTimer:
+    def __init__(self):
+        self.results = []
+
+    @contextlib.contextmanager
+    def stage(self, name, unit=None):
+        stats = {"stage": name, "count": 0, "unit": unit}
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats["seconds"] = round(time.perf_counter() - start, 3)
+            stats["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            if unit and stats["seconds"] > 0:
+                per_minute = unit.endswith("/min")
+                rate = stats["count"] / stats["seconds"] * (60 if per_minute else 1)
+                stats["throughput"] = round(rate, 2)
+            self.results.append(stats)
+
+
+# Function to build the benchmark LLM: replayed fixtures, falling back to the mock for misses
+def build_llm(args, store):
+    return replay_router(
+        store,
+        routing=args.routing,
+        latency_scale=args.latency_scale,
+        error_rate=args.error_rate,
+        max_retries=args.max_retries,
+        seed=args.seed,
+        fallback=mock_response,
+    )
+
+
+# Function to time each stage on its own: download, extract, split, summarize, generate, parse, write
+def run_stages(args, base_url, keys, keyword_groups, work_dir):
+    timer = StageTimer()
+    # Record what the generate step receives so the parse step replays real responses
+    capture = FixtureStore(path=None)
+    llm = record_llm(build_llm(args, FixtureStore(args.fixtures)), capture)
+
+    files = {}
+    with timer.stage("download", "MB/s") as stats:
+        for key in [*keys, "keywords"]:
+            ext = "xlsx" if key == "keywords" else "docx"
+            files[key] = download_google_file_as_bytes(f"{base_url}/{key}.{ext}", use_cache=False)
+        size = sum(f.seek(0, os.SEEK_END) for f in files.values())
+        stats["count"] = round(size / 2**20, 3)
+        stats["bytes"] = size
+
+    texts = {}
+    with timer.stage("extract", "docs/s") as stats:
+        for key in keys:
+            texts[key] = chunks_to_text(extract_chunks_auto(files[key]))
+        stats["count"] = len(texts)
+
+    chunks = {}
+    with timer.stage("split", "chunks/s") as stats:
+        for key, text in texts.items():
+            chunks[key] = chunk_text(text, max_tokens=args.chunk_tokens)
+        stats["count"] = sum(len(c) for c in chunks.values())
+
+    summaries = {}
+    with timer.stage("summarize", "chunks/s") as stats:
+        for key, doc_chunks in chunks.items():
+            title = DOCUMENT_TITLES.get(key, "Training Rules")
+            summaries[key] = summarize_chunks(llm, doc_chunks, title, use_cache=False)
+        stats["count"] = sum(len(c) for c in chunks.values())
+
+    rules = summaries.pop("rules", "")
+    with timer.stage("generate", "groups/min") as stats:
+        rows = generate_ads(llm, keyword_groups, rules, **summaries)
+        stats["count"] = len(rows)
+        stats["failed"] = len(keyword_groups) - len(rows)
+
+    responses = capture.responses("🔑 TARGET KEYWORD")
+    with timer.stage("parse", "ads/s") as stats:
+        for _ in range(args.parse_repeat):
+            for idx, response in enumerate(responses):
+                ad = parse_ad_response(response)
+                if isinstance(ad, dict):
+                    build_ad_row(ad, idx)
+                    stats["count"] += 1
+
+    with timer.stage("write", "rows/s") as stats:
+        writer = AdRowWriter(os.path.join(work_dir, "stage_output.xlsx"), run_key="benchmark")
+        for n, row in enumerate(rows):
+            writer.write(f"group {n}", row, n)
+        writer.close()
+        writer.finalize()
+        stats["count"] = len(rows)
+
+    return timer.results
+
+
+# Function to time the whole main.py pipeline (the run_pipeline DAG) against the local server
+def run_end_to_end(args, base_url, keys, keyword_groups, work_dir):
+    timer = StageTimer()
+    llm = build_llm(args, FixtureStore(args.fixtures))
+    urls = {key: f"{base_url}/{key}.docx" for key in keys if key != "rules"}
+    training_url = f"{base_url}/rules.docx" if "rules" in keys else ""
+
+    with timer.stage("pipeline", "groups/min") as stats:
+        result = run_pipeline(
+            llm,
+            training_url,
+            urls,
+            f"{base_url}/keywords.xlsx",
+            SHEET_NAME,
+            os.path.join(work_dir, "pipeline_output.xlsx"),
+            lambda progress=None, message=None: None,
+        )
+        stats["count"] = len(keyword_groups) - len(result["failed_groups"])
+        stats["failed"] = len(result["failed_groups"])
+        stats["chunks"] = sum(len(c) for c in result["document_chunks"].values())
+        stats["trace"] = result["trace_summary"]
+        stats["llm"] = result["llm_metrics"]
+        stats["trace_path"] = result["trace_path"]
+    return timer.results
+
+
+# Function to print the results and flag stages slower than the baseline
+def print_report(results, baseline=None):
+    baseline = {r["stage"]: r for r in (baseline or [])}
+    print(f"\n{'stage':<12} {'seconds':>9} {'count':>9} {'throughput':>18} {'peak MB':>8}")
+    for r in results:
+        throughput = f"{r['throughput']} {r['unit']}" if "throughput" in r else ""
+        line = f"{r['stage']:<12} {r['seconds']:>9} {r['count']:>9} {throughput:>18} {r['peak_mb']:>8}"
+        before = baseline.get(r["stage"])
+        if before and before["seconds"] > 0:
+            change = r["seconds"] / before["seconds"] - 1
+            flag = " ⚠️ regression" if change > REGRESSION_THRESHOLD else ""
+            line += f"  ({change:+.0%} vs baseline){flag}"
+        print(line)
+
+    pipeline = next((r for r in results if r["stage"] == "pipeline"), None)
+    if pipeline:
+        print(
+            f"\n🏁 End to end: {pipeline['count']} groups ({pipeline['failed']} failed), "
+            f"{pipeline['chunks']} chunks in {pipeline['seconds']}s"
+        )
+        for row in sorted(pipeline["trace"], key=lambda row: -row["seconds"]):
+            print(
+                f"  {row['stage']:<24} {row['seconds']:>7}s | {row['llm_calls']:>4} LLM calls, "
+                f"{row['retries']} retries | wait {row['queue_wait']}s vs model {row['model_latency']}s"
+            )
+        print(f"🧾 Spans: {pipeline['trace_path']}")
+    # ru_maxrss is in kilobytes on Linux
+    print(f"\n🧠 Peak process RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+
+# Benchmark the pipeline offline, e.g.
+#   python benchmark.py --scale 20 --fixtures benchmarks/fixtures/llm.jsonl --json after.json --baseline before.json
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the ad generation pipeline")
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--scale", type=int, default=10, help="repeat documents and keyword groups")
+    parser.add_argument("--fixtures", default=None, help="replay responses recorded with LLM_RECORD_PATH")
+    parser.add_argument("--routing", default=None, help="stage=model,... (see MODEL_ROUTING)")
+    parser.add_argument("--latency-scale", type=float, default=MOCK_LATENCY_SCALE)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of LLM calls that fail")
+    parser.add_argument("--max-retries", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--parse-repeat", type=int, default=20)
+    parser.add_argument("--skip-stages", action="store_true", help="only run end to end")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    args = parser.parse_args()
+
+    serve_dir = os.path.join(SCRATCH_DIR, "inputs")
+    os.makedirs(serve_dir)
+    keys, keyword_groups = build_inputs(args.corpus, args.scale, serve_dir)
+    base_url, server = serve_directory(serve_dir)
+    print(f"📚 {len(keys)} documents x{args.scale}, {len(keyword_groups)} keyword groups | scratch: {SCRATCH_DIR}")
+
+    tracemalloc.start()
+    results = []
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            if not args.skip_stages:
+                results += run_stages(args, base_url, keys, keyword_groups, SCRATCH_DIR)
+            results += run_end_to_end(args, base_url, keys, keyword_groups, SCRATCH_DIR)
+    finally:
+        tracemalloc.stop()
+        server.shutdown()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# Standard Libraries
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import time
+
+# Third-Party Libraries
+import pandas as pd
+
+# Local Modules
+from chunking import chunk_text
+from summarizer import summarize_chunks
+from ad_generator import generate_ads
+from asset_limits import enforce_asset_limits, find_violations
+from chatbot import answer_question, build_chat_index, is_fallback
+from generation import DOCUMENT_TITLES
+from model_routing import DEFAULT_ROUTING, FLAGSHIP_MODEL, MINI_MODEL, ModelRouter, load_routing
+from mock_llm import MockLLM, mock_response
+from llm_replay import FixtureStore, ReplayLLM
+from retrieval import tokenize
+
+# Fixed local corpus: one .txt per document plus keywords.csv (one column per keyword group)
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "corpus")
+
+# Routings compared by default
+NANO_MODEL = "gpt-4.1-nano-2025-04-14"
+ROUTING_PRESETS = {
+    "flagship": {stage: FLAGSHIP_MODEL for stage in DEFAULT_ROUTING},
+    "tiered": dict(DEFAULT_ROUTING),
+    "budget": {
+        "map": NANO_MODEL,
+        "reduce": MINI_MODEL,
+        "ads": MINI_MODEL,
+        "chatbot": MINI_MODEL,
+        "repair": NANO_MODEL,
+    },
+}
+
+# Questions put to the chatbot stage
+CHAT_QUESTIONS = [
+    "How fast does the emergency team arrive?",
+    "What warranty comes with a water heater installation?",
+    "How much is the furnace tune-up this fall?",
+]
+
+
+# Function to load the corpus: ({session key: text}, {group: [keywords]})
+def load_corpus(path=CORPUS_DIR):
+    documents = {}
+    for key in ["rules", *DOCUMENT_TITLES]:
+        file_path = os.path.join(path, f"{key}.txt")
+        if os.path.exists(file_path):
+            with open(file_path, encoding="utf-8") as f:
+                documents[key] = f.read()
+
+    with open(os.path.join(path, "keywords.csv"), newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    keyword_groups = {
+        group.strip(): [row[i].strip() for row in rows[1:] if i < len(row) and row[i].strip()]
+        for i, group in enumerate(rows[0])
+    }
+    return documents, keyword_groups
+
+
+# Share of keyword terms that appear in the text
+def term_coverage(terms, text):
+    terms = {term for term in terms if len(term) > 2}
+    if not terms:
+        return 0.0
+    return len(terms & set(tokenize(text))) / len(terms)
+
+
+# Function to run summaries, ads, asset limits and chat for one routing and measure them
+# (recorded fixtures when given, so quality differences between models show up)
+def run_routing(name, routing, documents, keyword_groups, chunk_tokens, latency_scale, fixtures=None):
+    if fixtures is not None:
+        scale = 1.0 if latency_scale is None else latency_scale
+        client_factory = lambda model: ReplayLLM(fixtures, model, latency_scale=scale, fallback=mock_response)
+    else:
+        client_factory = lambda model: MockLLM(model, latency_scale)
+    router = ModelRouter(routing, client_factory=client_factory)
+    start = time.time()
+
+    summaries = {}
+    for key, text in documents.items():
+        title = DOCUMENT_TITLES.get(key, "Training Rules")
+        summaries[key] = summarize_chunks(
+            router, chunk_text(text, max_tokens=chunk_tokens), title, use_cache=False
+        )
+    rules_summary = summaries.pop("rules", "")
+
+    ads = generate_ads(router, keyword_groups, rules_summary, **summaries)
+    ads_df = pd.DataFrame(ads)
+    violations = len(find_violations(ads_df)) if ads else 0
+    ads_df, limit_report = enforce_asset_limits(router, ads_df)
+
+    index = build_chat_index({DOCUMENT_TITLES[key]: text for key, text in documents.items() if key != "rules"})
+    answers = [answer_question(router, question, index)[0] for question in CHAT_QUESTIONS]
+    wall_time = time.time() - start
+
+    # Quality: keyword terms kept by the summaries and used in each group's ad copy
+    all_terms = [term for keywords in keyword_groups.values() for term in tokenize(" ".join(keywords))]
+    ad_coverage = [
+        term_coverage(tokenize(" ".join(keywords)), " ".join(row.values()))
+        for keywords, row in zip(keyword_groups.values(), ads_df.to_dict("records"))
+    ]
+    headline_columns = [column for column in ads_df.columns if column.startswith(("Headline", "Description"))]
+    stage_costs = router.stage_report()
+    return {
+        "routing": name,
+        "models": routing,
+        "wall_time": round(wall_time, 2),
+        "cost": round(sum(row["cost"] for row in stage_costs), 4),
+        "summary_keyword_coverage": round(term_coverage(all_terms, " ".join(summaries.values())), 3),
+        "ad_keyword_coverage": round(sum(ad_coverage) / len(ad_coverage), 3) if ad_coverage else 0.0,
+        "ads_generated": len(ads),
+        "groups": len(keyword_groups),
+        "violations_before_limits": violations,
+        "truncated": limit_report["truncated"],
+        "empty_assets": int((ads_df[headline_columns] == "").sum().sum()) if headline_columns else 0,
+        "chat_answered": sum(not is_fallback(answer) for answer in answers),
+        "stages": stage_costs,
+    }
+
+
+# Function to print one line per routing plus its per-stage breakdown
+def print_results(results):
+    print(
+        f"\n{'routing':<10} {'wall s':>7} {'cost $':>8} {'sum cov':>8} {'ad cov':>7} "
+        f"{'ads':>5} {'viol':>5} {'trunc':>6} {'empty':>6} {'chat':>5}"
+    )
+    for r in results:
+        print(
+            f"{r['routing']:<10} {r['wall_time']:>7} {r['cost']:>8.4f} "
+            f"{r['summary_keyword_coverage']:>8} {r['ad_keyword_coverage']:>7} "
+            f"{r['ads_generated']:>2}/{r['groups']:<2} {r['violations_before_limits']:>5} "
+            f"{r['truncated']:>6} {r['empty_assets']:>6} {r['chat_answered']:>2}/{len(CHAT_QUESTIONS)}"
+        )
+    for r in results:
+        print(f"\n💵 {r['routing']}:")
+        for row in r["stages"]:
+            print(
+                f"  {row['stage']:<8} {row['model']:<26} {row['calls']:>4} calls | "
+                f"{row['prompt_tokens']:>7} in / {row['completion_tokens']:>6} out | "
+                f"${row['cost']:.4f} | {row['latency_total']}s"
+            )
+
+
+# Compare routings on the local corpus with the mock LLM, e.g.
+#   python benchmark_routing.py --routing custom=map=gpt-4.1-nano,ads=gpt-4.1
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-stage model routings offline")
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--presets", default=",".join(ROUTING_PRESETS), help="comma-separated preset names")
+    parser.add_argument("--routing", action="append", default=[], help="NAME=stage=model,... (repeatable)")
+    parser.add_argument("--chunk-tokens", type=int, default=200)
+    parser.add_argument("--latency-scale", type=float, default=None)
+    parser.add_argument("--fixtures", help="replay responses recorded with LLM_RECORD_PATH")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    args = parser.parse_args()
+
+    routings = {name: ROUTING_PRESETS[name] for name in args.presets.split(",") if name}
+    for item in args.routing:
+        name, spec = item.split("=", 1)
+        routings[name] = spec
+    documents, keyword_groups = load_corpus(args.corpus)
+    fixtures = FixtureStore(args.fixtures) if args.fixtures else None
+    print(f"📚 Corpus: {len(documents)} documents, {len(keyword_groups)} keyword groups")
+
+    results = []
+    for name, spec in routings.items():
+        print(f"🏁 Running routing: {name}")
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            results.append(
+                run_routing(
+                    name,
+                    load_routing(spec),
+                    documents,
+                    keyword_groups,
+                    args.chunk_tokens,
+                    args.latency_scale,
+                    fixtures,
+                )
+            )
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,36 @@
+# Standard Libraries
+import asyncio
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+# LangChain Libraries
 from langchain.prompts import PromptTemplate
 
+# Local Modules
+from retrieval import RetrievalIndex, cite
+from model_routing import for_stage
+
+# Passages sent with each question
+TOP_K = 6
+
+FALLBACK_ANSWER = "I'm sorry, I couldn’t find that information in the provided documents."
 
-def answer_question(llm, question, documents):
-    prompt = PromptTemplate(
-        input_variables=["context", "question"],
-        template="""
+# Phrases that mark an answer as "not found", matched after normalizing quotes and case
+FALLBACK_PATTERNS = re.compile(
+    r"^(sorry|i'?m sorry|unfortunately|i apologi[sz]e)?[ ,.]*("
+    r"i (do not|don'?t) know|i'?m not sure|i am not sure|i (can ?not|can'?t) (answer|find|determine)"
+    r"|i (could ?not|couldn'?t|was unable to|am unable to) (find|locate|determine)"
+    r"|(the|this) (information|answer) (is|was) not (available|provided|mentioned|found|included)"
+    r"|(there is |there'?s )?no (information|mention|details?) (about|on|of|regarding|is provided)"
+    r"|not (mentioned|provided|specified|available|found) in the (provided )?(documents?|context|passages?)"
+    r")"
+)
+
+# Prompt used to ask one whole document at a time (concurrent fan-out mode)
+document_prompt = PromptTemplate(
+    input_variables=["context", "question"],
+    template="""
 You are a helpful, knowledgeable assistant supporting a Google Ads strategist.
 
 Answer the user's question based ONLY on the content provided in the context below.
@@ -26,29 +52,133 @@ QUESTION:
 
 ANSWER:
 """,
-    )
+)
 
-    # Loop through documents to find the best source
-    for source, content in documents.items():
-        if not content.strip():
-            continue  # skip if empty
-
-        # Fill prompt and ask LLM
-        response = llm.predict(
-            prompt.format(context=content, question=question)
-        ).strip()
-
-        # Return if not a generic fallback response
-        if response.lower() not in [
-            "i don't know",
-            "i do not know",
-            "i’m not sure",
-            "i cannot answer that",
-            "i'm sorry, i couldn’t find that information in the provided documents.",
-        ]:
-            return response, source
-
-    return (
-        "I'm sorry, I couldn’t find that information in the provided documents.",
-        "None",
+# Prompt used to answer from retrieved passages
+prompt = PromptTemplate(
+    input_variables=["context", "question"],
+    template="""
+You are a helpful, knowledgeable assistant supporting a Google Ads strategist.
+
+Answer the user's question based ONLY on the numbered passages below.
+They were taken from client materials (website, offers, questionnaire, transcript, or target keywords).
+
+✅ Be concise, clear, and professional.
+✅ Focus only on factual, verifiable details found in the passages.
+✅ Cite the passages you used by their number in square brackets, e.g. [2].
+❌ Do NOT make up answers. If the answer isn’t in the passages, say:
+
+"I'm sorry, I couldn’t find that information in the provided documents."
+
+---
+
+PASSAGES:
+{context}
+
+QUESTION:
+{question}
+
+ANSWER:
+""",
+)
+
+
+# Function to tell whether an answer is a "not found" reply, including near-variants
+def is_fallback(response):
+    text = unicodedata.normalize("NFKC", response or "").lower()
+    text = text.replace("’", "'").replace("‘", "'").strip(" \"'\n\t")
+    return not text or FALLBACK_PATTERNS.match(text) is not None
+
+
+# Send one prompt on the fan-out's own executor, so abandoned calls never hold up the caller
+async def _ask(llm, prompt_text, executor):
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(executor, llm.predict, prompt_text)
+    return response.strip()
+
+
+# Function to ask every non-empty source at once and return the highest-priority real answer
+async def answer_question_async(llm, question, documents):
+    llm = for_stage(llm, "chatbot")
+    sources = [(source, content) for source, content in documents.items() if content.strip()]
+    if not sources:
+        return FALLBACK_ANSWER, "None"
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="chat")
+    tasks = [
+        asyncio.create_task(
+            _ask(llm, document_prompt.format(context=content, question=question), executor)
+        )
+        for _, content in sources
+    ]
+    answers = [None] * len(tasks)
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i = tasks.index(task)
+                try:
+                    answers[i] = task.result()
+                except Exception as e:
+                    print(f"❌ Error asking {sources[i][0]}: {e}")
+                    answers[i] = ""
+
+            # Sources are in priority order: stop at the first one still running
+            for (source, _), answer in zip(sources, answers):
+                if answer is None:
+                    break
+                if not is_fallback(answer):
+                    return answer, source
+    finally:
+        # Cancel the lower-priority calls still in flight and drop any not yet started;
+        # calls already on the wire finish in the background instead of delaying the answer
+        for task in pending:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return FALLBACK_ANSWER, "None"
+
+
+# Synchronous wrapper for the concurrent fan-out
+def answer_question_concurrent(llm, question, documents):
+    return asyncio.run(answer_question_async(llm, question, documents))
+
+
+# Function to build the chatbot's retrieval index from {source: chunks or text}
+def build_chat_index(documents):
+    return RetrievalIndex.from_documents(documents)
+
+
+# Render retrieved passages as a numbered context block
+def format_passages(passages):
+    return "\n\n".join(
+        f"[{n}] ({cite(passage)})\n{passage['text']}" for n, passage in enumerate(passages, start=1)
     )
+
+
+# Citations for the passage numbers the answer refers to (all retrieved passages if none)
+def cited_sources(response, passages):
+    numbers = sorted({int(n) for n in re.findall(r"\[(\d+)\]", response)})
+    used = [passages[n - 1] for n in numbers if 0 < n <= len(passages)] or passages
+    return "; ".join(cite(passage) for passage in used)
+
+
+# Function to answer a question with one LLM call over the best-matching passages;
+# when no passage matches, the whole documents (if given) are asked concurrently instead
+def answer_question(llm, question, index, top_k=TOP_K, documents=None):
+    llm = for_stage(llm, "chatbot")
+    if not isinstance(index, RetrievalIndex):
+        index = build_chat_index(index)
+
+    passages = index.search(question, top_k)
+    if not passages:
+        if documents:
+            return answer_question_concurrent(llm, question, documents)
+        return FALLBACK_ANSWER, "None"
+
+    response = llm.predict(
+        prompt.format(context=format_passages(passages), question=question)
+    ).strip()
+    if is_fallback(response):
+        return response, "None"
+    return response, cited_sources(response, passages)
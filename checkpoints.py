@@ -0,0 +1,112 @@
+# Standard Libraries
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Local Modules
+from summary_cache import make_key
+from tracing import count
+
+# Checkpoint database location (override via environment variable)
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", os.path.join(".cache", "checkpoints.sqlite3"))
+
+
+# Persistent record of each completed pipeline unit, grouped by run
+class CheckpointStore:
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                run TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                name TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (run, stage, name)
+            )
+            """
+        )
+        self._conn.commit()
+
+    # Return (key, value) stored for a unit, or (None, None)
+    def get(self, run, stage, name):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, value FROM checkpoints WHERE run = ? AND stage = ? AND name = ?",
+                (run, stage, name),
+            ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    # Record a completed unit; key identifies the inputs it was computed from
+    def set(self, run, stage, name, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run, stage, name, key, value, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (run, stage, name, key, json.dumps(value), time.time()),
+            )
+            self._conn.commit()
+
+    def clear(self, run):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE run = ?", (run,))
+            self._conn.commit()
+
+
+# Checkpoints of one run, identified by its inputs (URLs, sheet name)
+class RunCheckpoint:
+    def __init__(self, store, *inputs):
+        self.store = store
+        self.run = make_key(*inputs)
+        self.resumed = 0
+
+    # Function to return a unit's stored value if it was computed from the same key
+    def lookup(self, stage, name, key):
+        stored_key, value = self.store.get(self.run, stage, name)
+        if stored_key != key:
+            return None
+        self.resumed += 1
+        count("checkpoint_hits")
+        return value
+
+    # Record a completed unit
+    def record(self, stage, name, value, key=""):
+        self.store.set(self.run, stage, name, key, value)
+
+    # Function to return the checkpointed value for key, or compute and record it
+    def cached(self, stage, name, key, compute):
+        value = self.lookup(stage, name, key)
+        if value is None:
+            value = compute()
+            self.record(stage, name, value, key)
+        return value
+
+    # Last recorded value of a unit, whatever inputs produced it
+    def get(self, stage, name):
+        return self.store.get(self.run, stage, name)[1]
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+# Shared checkpoint store used by main.py and the Streamlit jobs
+def get_checkpoint_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = CheckpointStore()
+        return _default_store
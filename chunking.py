@@ -0,0 +1,175 @@
+# Standard Libraries
+import os
+import re
+import threading
+from bisect import bisect_right
+
+# LangChain Libraries
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# Local Modules
+from prompt_prefix import count_tokens
+
+# Single chunking path shared by extraction and summarization. Chunks are sized
+# by tokens and summarized independently, so they carry no overlap.
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", 128000))
+PROMPT_RESERVE_TOKENS = 1000  # instruction preamble plus the model's reply
+CHUNK_TOKENS = min(int(os.getenv("CHUNK_TOKENS", 4000)), CONTEXT_TOKENS - PROMPT_RESERVE_TOKENS)
+PAGE_SEPARATOR = "\n\n"
+
+# Paragraph breaks and speaker turns ("John Smith: ...", "00:12:03 Jane: ...")
+BLOCK_BREAK = re.compile(r"\n[ \t]*\n")
+SPEAKER_TURN = re.compile(
+    r"^[ \t]*(?:\[?\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?\]?[ \t]+)?"
+    r"[A-Z][\w.'-]*(?:[ \t][A-Z][\w.'-]*){0,3}[ \t]*:[ \t]",
+    re.M,
+)
+
+
+# Splitter used only for a single paragraph or turn that is larger than a chunk
+def _fallback_splitter(max_tokens):
+    return RecursiveCharacterTextSplitter(
+        chunk_size=max_tokens,
+        chunk_overlap=0,
+        length_function=count_tokens,
+        add_start_index=True,
+    )
+
+
+# Spans of text between paragraph and speaker-turn boundaries (whitespace-only spans included)
+def _units(text):
+    points = {0, len(text)}
+    points.update(m.end() for m in BLOCK_BREAK.finditer(text))
+    points.update(m.start() for m in SPEAKER_TURN.finditer(text))
+    points = sorted(points)
+    return [(start, end) for start, end in zip(points, points[1:]) if start < end]
+
+
+# Function to yield (offset, text) for every unit of the joined pages, reading pages lazily.
+# The last unit read so far is held back, since the next page may still extend it
+def _stream_units(pages, page_starts, page_numbers):
+    buffer = ""
+    buffer_offset = 0
+    for page_number, text in pages:
+        if page_numbers:
+            buffer += PAGE_SEPARATOR
+        page_starts.append(buffer_offset + len(buffer))
+        page_numbers.append(page_number)
+        buffer += text
+
+        units = _units(buffer)
+        for start, end in units[:-1]:
+            yield buffer_offset + start, buffer[start:end]
+        keep = units[-1][0] if units else len(buffer)
+        buffer_offset += keep
+        buffer = buffer[keep:]
+
+    for start, end in _units(buffer):
+        yield buffer_offset + start, buffer[start:end]
+
+
+# Function to pack paragraphs and speaker turns into chunks of at most max_tokens,
+# yielding (start, text, tokens) as soon as each chunk is full
+def _pack(units, max_tokens):
+    current_start = None
+    current_text = []
+    current_tokens = 0
+
+    for start, text in units:
+        # Whitespace between units is kept inside a chunk but never starts one
+        if not text.strip():
+            if current_start is not None:
+                current_text.append(text)
+            continue
+        tokens = count_tokens(text)
+
+        # A single oversized unit is split on its own, by tokens
+        if tokens > max_tokens:
+            if current_start is not None:
+                yield current_start, "".join(current_text), current_tokens
+                current_start = None
+                current_text = []
+                current_tokens = 0
+            for doc in _fallback_splitter(max_tokens).create_documents([text]):
+                yield start + doc.metadata["start_index"], doc.page_content, count_tokens(doc.page_content)
+            continue
+
+        if current_start is not None and current_tokens + tokens > max_tokens:
+            yield current_start, "".join(current_text), current_tokens
+            current_start = None
+            current_text = []
+            current_tokens = 0
+
+        if current_start is None:
+            current_start = start
+        current_text.append(text)
+        current_tokens += tokens
+
+    if current_start is not None:
+        yield current_start, "".join(current_text), current_tokens
+
+
+# Function to split (page_number, text) pairs into chunks with source offsets and pages.
+# Pages are read lazily and each chunk is yielded once it is full, so summarizing can
+# start on early pages while later ones are still being extracted
+def chunk_pages(pages, max_tokens=CHUNK_TOKENS):
+    page_numbers = []
+    page_starts = []
+
+    # Page containing a character offset in the joined document text
+    def page_at(position):
+        return page_numbers[max(0, bisect_right(page_starts, position) - 1)]
+
+    for start, raw, tokens in _pack(_stream_units(pages, page_starts, page_numbers), max_tokens):
+        text = raw.strip()
+        start += len(raw) - len(raw.lstrip())
+        end = start + len(text)
+        yield {
+            "text": text,
+            "start": start,
+            "end": end,
+            "page": page_at(start),
+            "end_page": page_at(end - 1),
+            "tokens": tokens,
+        }
+
+
+# Re-iterable view of a lazy chunk source: the first pass pulls chunks as they are produced,
+# later passes replay them; on_complete(chunks) runs once the source is exhausted
+class ChunkStream:
+    def __init__(self, source, on_complete=None):
+        self._source = iter(source)
+        self._on_complete = on_complete
+        self._lock = threading.Lock()
+        self.chunks = []
+        self.complete = False
+
+    def __iter__(self):
+        position = 0
+        while True:
+            with self._lock:
+                if position < len(self.chunks):
+                    chunk = self.chunks[position]
+                elif self.complete:
+                    return
+                else:
+                    try:
+                        chunk = next(self._source)
+                    except StopIteration:
+                        self.complete = True
+                        if self._on_complete:
+                            self._on_complete(self.chunks)
+                        return
+                    self.chunks.append(chunk)
+            position += 1
+            yield chunk
+
+
+# Function to chunk plain text that has no page structure
+def chunk_text(text, max_tokens=CHUNK_TOKENS):
+    return list(chunk_pages([(None, text)], max_tokens=max_tokens))
+
+
+# Rebuild readable document text from its chunks
+def chunks_to_text(chunks):
+    return PAGE_SEPARATOR.join(chunk["text"] for chunk in chunks)
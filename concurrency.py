@@ -0,0 +1,91 @@
+# Standard Libraries
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Local Modules
+from tracing import count
+
+
+# Token bucket that limits how many LLM requests may start per second
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Block until a token is available, then consume it
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Run func over items with bounded concurrency, yielding (index, result) as each finishes.
+# Items are pulled lazily, so a generator (e.g. pages still being extracted) can feed it.
+def imap_concurrent(func, items, max_workers=4, rate_limit=None):
+    bucket = TokenBucket(rate_limit) if rate_limit else None
+    max_workers = max(1, max_workers)
+    source = enumerate(items)
+
+    # Time spent waiting on the rate limit counts as queue wait on the caller's trace span
+    def run(item):
+        if bucket:
+            start = time.monotonic()
+            bucket.acquire()
+            count("rate_limit_wait", time.monotonic() - start)
+        return func(item)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+
+        # Keep a small backlog queued ahead of the workers; each item runs in a copy of
+        # the caller's context so trace spans nest under the caller's span
+        def submit_next():
+            for i, item in source:
+                pending[pool.submit(contextvars.copy_context().run, run, item)] = i
+                return True
+            return False
+
+        for _ in range(max_workers * 2):
+            if not submit_next():
+                break
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = pending.pop(future)
+                    yield i, future.result()
+                    submit_next()
+        finally:
+            # Stop queued work if the consumer stops early
+            for future in pending:
+                future.cancel()
+
+
+# Run func over items with bounded concurrency and return results in input order
+def map_concurrent(func, items, max_workers=4, rate_limit=None, on_done=None):
+    items = list(items)
+    results = [None] * len(items)
+
+    # on_done runs on the calling thread, so it is safe for UI updates
+    stream = imap_concurrent(func, items, max_workers=max_workers, rate_limit=rate_limit)
+    for done, (i, result) in enumerate(stream, start=1):
+        results[i] = result
+        if on_done:
+            on_done(done, len(items), i, result)
+
+    return results
@@ -1,55 +1,231 @@
+import hashlib
 import io
+import json
+import os
 import re
+import shutil
+import tempfile
+import threading
 import requests
-import fitz  # PyMuPDF
 import pandas as pd
 from docx import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+from chunking import chunk_pages, chunk_text, chunks_to_text
+from pdf_pages import iter_pdf_pages
+from tracing import count
 
-def download_google_file_as_bytes(url, export_type=None):
+# ---- fetch layer: pooled session, timeouts, retries and conditional requests ----
+DOWNLOAD_TIMEOUT = (10, 120)  # (connect, read) seconds
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_WORKERS = 6
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+SPOOL_BYTES = 8 * 1024 * 1024  # larger downloads spill to a temp file on disk
+MAX_DOWNLOAD_BYTES = int(os.getenv("MAX_DOWNLOAD_BYTES", 200 * 1024 * 1024))
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(".cache", "downloads"))
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+
+_session = None
+_session_lock = threading.Lock()
+_cache_lock = threading.Lock()
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=DOWNLOAD_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"],
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=DOWNLOAD_WORKERS,
+                pool_maxsize=DOWNLOAD_WORKERS,
+                max_retries=retry,
+            )
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def resolve_export_url(url, export_type=None):
     if "docs.google.com/document" in url:
         m = re.search(r"/d/([a-zA-Z0-9_-]+)", url)
         if not m:
             raise ValueError("Invalid Google Docs link")
         file_id = m.group(1)
         fmt = export_type if export_type else "docx"
-        export_url = f"https://docs.google.com/document/d/{file_id}/export?format={fmt}"
+        return f"https://docs.google.com/document/d/{file_id}/export?format={fmt}"
 
-    elif "docs.google.com/spreadsheets" in url:
+    if "docs.google.com/spreadsheets" in url:
         m = re.search(r"/d/([a-zA-Z0-9_-]+)", url)
         if not m:
             raise ValueError("Invalid Google Sheets link")
         fmt = export_type if export_type else "xlsx"
-        export_url = f"https://docs.google.com/spreadsheets/d/{m.group(1)}/export?format={fmt}"
+        return f"https://docs.google.com/spreadsheets/d/{m.group(1)}/export?format={fmt}"
 
-    elif "drive.google.com/file" in url:
+    if "drive.google.com/file" in url:
         m = re.search(r"/d/([a-zA-Z0-9_-]+)", url)
         if not m:
             raise ValueError("Invalid Google Drive file link")
         file_id = m.group(1)
-        export_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+        return f"https://drive.google.com/uc?export=download&id={file_id}"
+
+    return url
+
+# Cached copy of a previous download plus its validators (ETag / Last-Modified)
+def _cache_paths(export_url):
+    key = hashlib.sha256(export_url.encode("utf-8")).hexdigest()
+    base = os.path.join(DOWNLOAD_CACHE_DIR, key)
+    return base + ".bin", base + ".json"
+
+def _load_cached(export_url):
+    data_path, meta_path = _cache_paths(export_url)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None, {}
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    return data_path, meta
+
+# Mark a cached copy as recently used, so eviction keeps it
+def _touch_cached(data_path):
+    try:
+        os.utime(data_path)
+    except OSError:
+        pass
+
+# Delete least recently used copies until the cache fits DOWNLOAD_CACHE_MAX_BYTES
+def _evict_cached():
+    entries = []
+    for name in os.listdir(DOWNLOAD_CACHE_DIR):
+        if name.endswith(".bin"):
+            stat = os.stat(os.path.join(DOWNLOAD_CACHE_DIR, name))
+            entries.append((stat.st_mtime, stat.st_size, name[:-4]))
+    total = sum(size for _, size, _ in entries)
+    for _, size, key in sorted(entries):
+        if total <= DOWNLOAD_CACHE_MAX_BYTES:
+            break
+        for suffix in (".json", ".bin"):
+            try:
+                os.remove(os.path.join(DOWNLOAD_CACHE_DIR, key + suffix))
+            except FileNotFoundError:
+                pass
+        total -= size
+
+def _store_cached(export_url, file_obj, headers):
+    meta = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+    if not (meta["etag"] or meta["last_modified"]):
+        return
+    os.makedirs(DOWNLOAD_CACHE_DIR, exist_ok=True)
+    data_path, meta_path = _cache_paths(export_url)
+    with _cache_lock:
+        file_obj.seek(0)
+        with open(data_path, "wb") as f:
+            shutil.copyfileobj(file_obj, f)
+        file_obj.seek(0)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        _evict_cached()
+
+# Copy byte chunks into a spool: small files stay in memory, large ones spill to disk.
+# Returns (file object rewound to the start, size)
+def _spool_chunks(chunks, url):
+    buffer = io.BytesIO()
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            if size > MAX_DOWNLOAD_BYTES:
+                raise Exception(f"❌ File is larger than {MAX_DOWNLOAD_BYTES} bytes: {url}")
+            if isinstance(buffer, io.BytesIO) and size > SPOOL_BYTES:
+                spilled = tempfile.NamedTemporaryFile(prefix="ads_download_")
+                spilled.write(buffer.getbuffer())
+                buffer = spilled
+            buffer.write(chunk)
+    except Exception:
+        buffer.close()
+        raise
+
+    buffer.flush()
+    buffer.seek(0)
+    return buffer, size
+
+# Stream the response body into a spool
+def _spool_response(resp, url):
+    declared = int(resp.headers.get("Content-Length") or 0)
+    if declared > MAX_DOWNLOAD_BYTES:
+        resp.close()
+        raise Exception(f"❌ File is larger than {MAX_DOWNLOAD_BYTES} bytes: {url}")
+    try:
+        buffer, size = _spool_chunks(resp.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES), url)
+    finally:
+        resp.close()
+    count("bytes_downloaded", size)
+    return buffer
+
+# Read the cached copy into a spool, so callers get the same kind of file object (and
+# nothing keeps the cache file open) whether or not the download was skipped
+def _spool_cached(cached_path, url):
+    with open(cached_path, "rb") as f:
+        buffer, _ = _spool_chunks(iter(lambda: f.read(DOWNLOAD_CHUNK_BYTES), b""), url)
+    return buffer
 
-    else:
-        export_url = url
+def download_google_file_as_bytes(url, export_type=None, use_cache=True):
+    export_url = resolve_export_url(url, export_type)
+
+    # Ask the server to answer 304 if the file is unchanged since the cached copy
+    headers = {}
+    cached_path, meta = _load_cached(export_url) if use_cache else (None, {})
+    if cached_path:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    resp = get_session().get(
+        export_url, headers=headers, timeout=DOWNLOAD_TIMEOUT, stream=True
+    )
+    if resp.status_code == 304 and cached_path:
+        resp.close()
+        print(f"💾 Not modified, using cached copy of: {url}")
+        count("cache_hits")
+        _touch_cached(cached_path)
+        try:
+            return _spool_cached(cached_path, url)
+        except FileNotFoundError:
+            # Evicted since we looked it up; fetch it again
+            return download_google_file_as_bytes(url, export_type, use_cache=False)
 
-    resp = requests.get(export_url)
     if resp.status_code != 200 or "text/html" in resp.headers.get("Content-Type", ""):
+        resp.close()
         raise Exception(f"❌ Could not download file from: {url}")
-    return io.BytesIO(resp.content)
+    file_obj = _spool_response(resp, url)
+    if use_cache:
+        _store_cached(export_url, file_obj, resp.headers)
+    return file_obj
 
-# ---- existing extractors stay the same ----
-def extract_text_from_docx_bytes(docx_bytes):
+# ---- extractors: return chunks (text + source offsets + page numbers) ----
+def extract_chunks_from_docx_bytes(docx_bytes):
     docx_bytes.seek(0)
     doc = Document(docx_bytes)
     paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-    return "\n\n".join(splitter.split_text("\n".join(paragraphs)))
+    return chunk_text("\n".join(paragraphs))
 
-def extract_text_from_pdf_bytes(pdf_bytes):
+def extract_chunks_from_pdf_bytes(pdf_bytes):
     pdf_bytes.seek(0)
-    doc = fitz.open(stream=pdf_bytes.read(), filetype="pdf")
-    return "\n\n".join(splitter.split_text("\n\n".join([page.get_text() for page in doc])))
+    return chunk_pages(iter_pdf_pages(pdf_bytes))
+
+def extract_text_from_docx_bytes(docx_bytes):
+    return chunks_to_text(extract_chunks_from_docx_bytes(docx_bytes))
+
+def extract_text_from_pdf_bytes(pdf_bytes):
+    return chunks_to_text(extract_chunks_from_pdf_bytes(pdf_bytes))
 
 def read_excel_sheet_from_bytes(excel_bytes, sheet_name):
     excel_bytes.seek(0)
@@ -67,20 +243,24 @@ def _sniff_file_kind(data: bytes) -> str:
         return "zip"  # docx/xlsx/pptx/zip
     return "unknown"
 
-def extract_text_auto(file_bytes):
+def extract_chunks_auto(file_bytes):
+    # Only the header is read here; the extractors work on the file object itself
     file_bytes.seek(0)
-    raw = file_bytes.read()
+    kind = _sniff_file_kind(file_bytes.read(8))
     file_bytes.seek(0)
 
     # PDF starts with "%PDF"
-    if raw.startswith(b"%PDF"):
-        return extract_text_from_pdf_bytes(io.BytesIO(raw))
+    if kind == "pdf":
+        return extract_chunks_from_pdf_bytes(file_bytes)
 
     # DOCX/XLSX/PPTX are zip containers → start with PK
-    if raw.startswith(b"PK"):
+    if kind == "zip":
         try:
-            return extract_text_from_docx_bytes(io.BytesIO(raw))
+            return extract_chunks_from_docx_bytes(file_bytes)
         except Exception as e:
             raise Exception("❌ File is a ZIP-based format (maybe XLSX), not a DOCX.") from e
 
     raise Exception("❌ Unsupported file type. Please provide a DOCX or PDF.")
+
+def extract_text_auto(file_bytes):
+    return chunks_to_text(extract_chunks_auto(file_bytes))
@@ -0,0 +1,317 @@
+# Standard Libraries
+import os
+import time
+
+# Local Modules
+from file_utils import (
+    download_google_file_as_bytes,
+    extract_chunks_auto,
+    read_excel_sheet_from_bytes,
+)
+from chunking import ChunkStream, chunks_to_text
+from summarizer import summarize_chunks
+from prefilter import prefilter_summary
+from ad_generator import BATCH_SIZE, iter_ads
+from ad_writer import AdRowWriter, read_output, write_output
+from asset_limits import enforce_asset_limits
+from summary_cache import make_key
+from checkpoints import RunCheckpoint, get_checkpoint_store
+from pdf_pages import hash_file
+from pipeline import Pipeline
+from model_routing import for_stage
+from tracing import Tracer
+
+# Directory holding generated ad files (and partial journals of interrupted runs)
+OUTPUT_DIR = "outputs"
+
+# Share of Zoom transcript chunks kept by the relevance pre-filter (1.0 disables it), and
+# whether the rest is merged into condensed chunks rather than dropped (override via environment variables)
+TRANSCRIPT_KEEP_FRACTION = float(os.getenv("TRANSCRIPT_KEEP_FRACTION", 1.0))
+TRANSCRIPT_PREFILTER_MERGE = os.getenv("TRANSCRIPT_PREFILTER_MERGE", "1") != "0"
+
+# Share of the job's progress bar given to each phase
+SUMMARY_SHARE = 0.3
+ADS_SHARE = 0.65
+
+# Client documents: session key -> display title
+DOCUMENT_TITLES = {
+    "website": "Website Summary",
+    "questionnaire": "Questionnaire",
+    "offers": "Offers",
+    "transcript": "Zoom Transcript",
+}
+
+
+# Function to extract a document's chunks, reusing the checkpoint when its bytes are unchanged.
+# PDFs are extracted page by page and come back as a ChunkStream, so the summary stage maps
+# each chunk as soon as it is ready; their chunks are checkpointed once the stream is read
+def extract_document(checkpoint, title, file_obj):
+    digest = hash_file(file_obj)
+    checkpoint.record("download", title, digest)
+    chunks = checkpoint.lookup("extract", title, digest)
+    if chunks is not None:
+        return digest, chunks
+
+    chunks = extract_chunks_auto(file_obj)
+    if isinstance(chunks, list):
+        checkpoint.record("extract", title, chunks, digest)
+        return digest, chunks
+    return digest, ChunkStream(
+        chunks, on_complete=lambda chunks: checkpoint.record("extract", title, list(chunks), digest)
+    )
+
+
+# Function to summarize a document, reusing the checkpointed summary of the same inputs;
+# only complete summaries are checkpointed so failed chunks are retried next run
+def summarize_document(
+    checkpoint,
+    llm,
+    title,
+    digest,
+    chunks,
+    on_progress=None,
+    keep_fraction=None,
+    keyword_groups=None,
+    merge_filtered=False,
+    report=None,
+):
+    key = make_key(
+        digest,
+        getattr(for_stage(llm, "map"), "model_name", ""),
+        getattr(for_stage(llm, "reduce"), "model_name", ""),
+        keep_fraction,
+        sorted(keyword_groups.items()) if keep_fraction and keyword_groups else None,
+        merge_filtered if keep_fraction else None,
+    )
+    summary = checkpoint.lookup("summary", title, key)
+    if summary is not None:
+        print(f"♻️ Resumed summary for {title} from checkpoint")
+        return summary
+
+    report = {} if report is None else report
+    summary = summarize_chunks(
+        llm,
+        chunks,
+        title,
+        on_progress=on_progress,
+        keep_fraction=keep_fraction,
+        keyword_groups=keyword_groups,
+        merge_filtered=merge_filtered,
+        report=report,
+    )
+    if report["complete"]:
+        checkpoint.record("summary", title, summary, key)
+    return summary
+
+
+# Function to record which groups failed and finalize the output; failed groups are
+# retried by the next run with the same inputs
+def finish_ads(checkpoint, writer, keyword_groups):
+    failed = sorted(
+        label for label, keywords in keyword_groups.items()
+        if any(keywords) and label not in writer.completed_groups
+    )
+    checkpoint.record("ads", "failed", failed)
+    writer.finalize(keep_journal=bool(failed))
+    return failed
+
+
+# Function to run the generation DAG under a tracer. Every stage and LLM call becomes a
+# span; the spans are written as JSON lines and rolled up into a per-stage run summary.
+# update(progress=None, message=None) receives progress (0-1) and status lines
+def run_pipeline(
+    llm, training_url, urls, keyword_url, sheet_name, output_path, update, batch_size=BATCH_SIZE
+):
+    tracer = Tracer()
+    try:
+        with tracer.activate(), tracer.span("run", kind="run", sheet=sheet_name):
+            result = _run_pipeline(
+                llm, training_url, urls, keyword_url, sheet_name, output_path, update, batch_size
+            )
+    finally:
+        trace_path = tracer.write_jsonl()
+    update(message=tracer.summary())
+    update(message=f"🧾 Trace written to {trace_path}")
+    result["trace_summary"] = tracer.summary_rows()
+    result["trace_path"] = trace_path
+    return result
+
+
+# Function to build and run the generation DAG. Downloads, extraction and the document
+# summaries all overlap; ad generation starts once the summaries and keyword sheet are ready
+def _run_pipeline(llm, training_url, urls, keyword_url, sheet_name, output_path, update, batch_size):
+    start_total = time.time()
+    # Each run gets its own retry budget and call metrics on the shared client
+    if hasattr(llm, "for_run"):
+        llm = llm.for_run()
+    sources = {"rules": training_url, **{key: urls.get(key, "") for key in DOCUMENT_TITLES}}
+    titles = {"rules": "Training Rules", **DOCUMENT_TITLES}
+    sources = {key: url for key, url in sources.items() if url}
+    if not any(key in sources for key in DOCUMENT_TITLES):
+        raise ValueError("❌ Please provide at least one document (Website, Questionnaire, Transcript, or Offers).")
+
+    checkpoint = RunCheckpoint(
+        get_checkpoint_store(), training_url, sorted(urls.items()), keyword_url, sheet_name
+    )
+    previously_failed = checkpoint.get("ads", "failed")
+    if previously_failed:
+        update(message=f"🔁 Last run left {len(previously_failed)} failed group(s); retrying only those.")
+
+    pipeline = Pipeline()
+    summary_progress = {key: 0.0 for key in sources}
+
+    # Each file downloads on its own, so its document can be extracted as soon as it lands
+    for key, url in [*sources.items(), ("sheet", keyword_url)]:
+        pipeline.add(f"download:{key}", lambda url=url: download_google_file_as_bytes(url))
+
+    # Parse the keyword sheet; its keywords steer the transcript pre-filter
+    def parse_keywords(sheet_file):
+        df = read_excel_sheet_from_bytes(sheet_file, sheet_name)
+        keyword_groups = {
+            col.strip(): df[col].dropna().astype(str).tolist()
+            for col in df.columns
+            if df[col].dropna().any()
+        }
+        update(message=f"📊 Found {len(keyword_groups)} keyword groups in sheet.")
+        return keyword_groups
+
+    pipeline.add("keywords", parse_keywords, deps=["download:sheet"])
+
+    for key in sources:
+        title = titles[key]
+        pipeline.add(
+            f"extract:{key}",
+            lambda file_obj, title=title: extract_document(checkpoint, title, file_obj),
+            deps=[f"download:{key}"],
+        )
+
+        # Summarize one document, advancing its share of the progress bar as chunks finish
+        def summarize(extracted, keywords=None, key=key, title=title):
+            digest, chunks = extracted
+            update(message=f"🧠 Summarizing: {title}")
+
+            def on_progress(done, total):
+                summary_progress[key] = done / total
+                update(SUMMARY_SHARE * sum(summary_progress.values()) / len(summary_progress))
+
+            report = {}
+            summary = summarize_document(
+                checkpoint,
+                llm,
+                title,
+                digest,
+                chunks,
+                on_progress=on_progress,
+                keep_fraction=TRANSCRIPT_KEEP_FRACTION if key == "transcript" else None,
+                keyword_groups=keywords,
+                merge_filtered=TRANSCRIPT_PREFILTER_MERGE,
+                report=report,
+            )
+            if "prefilter" in report:
+                update(message=f"🧹 {title}: {prefilter_summary(report['prefilter'])}")
+            update(message=f"✅ Summary complete for: {title}")
+            return summary
+
+        deps = [f"extract:{key}", "keywords"] if key == "transcript" else [f"extract:{key}"]
+        pipeline.add(f"summary:{key}", summarize, deps=deps)
+
+    # Generate ads as soon as every summary and the keyword groups are ready
+    def generate(keywords, *document_summaries):
+        done = dict(zip(sources, document_summaries))
+        summaries = {key: done.get(key, "") for key in DOCUMENT_TITLES}
+        rules_summary = done.get("rules", "")
+
+        # Journal rows as they arrive so an interrupted run resumes where it stopped
+        run_key = make_key(rules_summary, sorted(summaries.items()), sorted(keywords.items()))
+        writer = AdRowWriter(output_path, run_key=run_key)
+        if writer.completed_groups:
+            update(message=f"♻️ Resuming: {len(writer.completed_groups)} ad groups already generated.")
+
+        # Update progress as each keyword group finishes
+        def on_ad_progress(done, total, label, ad_row):
+            status_icon = "✅" if ad_row else "❌"
+            update(
+                SUMMARY_SHARE + ADS_SHARE * done / total,
+                f"{status_icon} Finished ad for {label} ({done}/{total})",
+            )
+
+        update(SUMMARY_SHARE, "🛠️ Generating Ads")
+        try:
+            for position, label, ad_row in iter_ads(
+                llm,
+                keywords,
+                rules_summary,
+                on_progress=on_ad_progress,
+                skip_groups=writer.completed_groups,
+                batch_size=batch_size,
+                **summaries,
+            ):
+                writer.write(label, ad_row, position)
+        finally:
+            writer.close()
+        failed = finish_ads(checkpoint, writer, keywords)
+        if failed:
+            update(message=f"⚠️ {len(failed)} group(s) failed: {failed}. Run again to retry only those.")
+        return summaries, failed
+
+    pipeline.add("ads", generate, deps=["keywords", *(f"summary:{key}" for key in sources)])
+
+    # Enforce character limits and cross-group uniqueness over the whole run at once
+    def check_limits(ads):
+        update(SUMMARY_SHARE + ADS_SHARE, "✂️ Checking character limits and duplicates...")
+        output_df, limit_report = enforce_asset_limits(llm, read_output(output_path))
+        if limit_report["violations"]:
+            update(
+                message=f"✂️ Fixed {limit_report['violations']} assets: "
+                f"{limit_report['rewritten']} rewritten, {limit_report['truncated']} truncated."
+            )
+        write_output(output_df, output_path)
+        return limit_report
+
+    pipeline.add("limits", check_limits, deps=["ads"])
+
+    results = pipeline.run()
+    summaries, failed = results["ads"]
+    keyword_groups = results["keywords"]
+    metrics = getattr(llm, "metrics", None)
+    if metrics:
+        update(message=metrics.summary())
+    if hasattr(llm, "stage_summary"):
+        update(message=llm.stage_summary())
+
+    elapsed = round(time.time() - start_total)
+    update(1.0, f"⏱️ Total processing time: {elapsed} seconds")
+    return {
+        "output_path": output_path,
+        "summaries": summaries,
+        "training_text": chunks_to_text(results["extract:rules"][1]) if "rules" in sources else "",
+        "keyword_summary": "\n".join(
+            f"🗂️ {group}:\n- " + "\n- ".join(words)
+            for group, words in keyword_groups.items()
+            if words
+        ),
+        "document_chunks": {
+            titles[key]: list(results[f"extract:{key}"][1]) for key in sources if key != "rules"
+        },
+        "limit_report": results["limits"],
+        "failed_groups": failed,
+        "llm_metrics": metrics.as_dict() if metrics else {},
+        "stage_costs": llm.stage_report() if hasattr(llm, "stage_report") else [],
+        "elapsed": elapsed,
+    }
+
+
+# Function to run the full ad generation pipeline as a background job.
+# job.params holds the document URLs, keyword sheet and sheet name; the result
+# is JSON-serializable so the UI can reload it after a rerun or reconnect
+def run_generation(job, llm, training_url):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    return run_pipeline(
+        llm,
+        training_url,
+        job.params["urls"],
+        job.params["keyword_url"],
+        job.params["sheet_name"],
+        os.path.join(OUTPUT_DIR, f"{job.owner}_Generated_Ads_Output.xlsx"),
+        job.update,
+    )
@@ -0,0 +1,216 @@
+# Standard Libraries
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Job queue location and worker limits (override via environment variables)
+JOBS_PATH = os.getenv("JOBS_DB_PATH", os.path.join(".cache", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+MAX_JOBS_PER_OWNER = int(os.getenv("MAX_JOBS_PER_OWNER", 1))
+
+# Status log lines kept per job
+JOB_LOG_LINES = 200
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+# Handle passed to a running job so it can report progress
+class Job:
+    def __init__(self, runner, job_id, kind, owner, params):
+        self.id = job_id
+        self.kind = kind
+        self.owner = owner
+        self.params = params
+        self._runner = runner
+
+    # Record progress (0-1) and/or a status line the UI can poll
+    def update(self, progress=None, message=None):
+        if message:
+            print(message)
+        self._runner._update(self.id, progress, message)
+
+
+# Persistent job queue (SQLite) drained by a worker thread pool; jobs outlive Streamlit
+# reruns and reconnects, and each owner gets at most MAX_JOBS_PER_OWNER workers at a time
+class JobRunner:
+    def __init__(self, path=JOBS_PATH, workers=JOB_WORKERS, per_owner=MAX_JOBS_PER_OWNER):
+        self.path = path
+        self.workers = workers
+        self.per_owner = per_owner
+        self._lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._handlers = {}
+        self._running = {}  # job id -> owner
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT NOT NULL DEFAULT '',
+                log TEXT NOT NULL DEFAULT '[]',
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL
+            )
+            """
+        )
+        # Jobs left running by a previous process were interrupted; queue them again
+        self._conn.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+        self._conn.commit()
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True).start()
+
+    # Register the function that runs jobs of a kind: handler(job) -> JSON-serializable result
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+        with self._wake:
+            self._wake.notify()
+
+    # Function to enqueue a job and return its ID
+    def submit(self, kind, params, owner="user"):
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, owner, status, params, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, owner, QUEUED, json.dumps(params), time.time()),
+            )
+            self._conn.commit()
+        with self._wake:
+            self._wake.notify()
+        return job_id
+
+    # Function to read a job's state as a dict (None if unknown)
+    def get(self, job_id):
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        job["params"] = json.loads(job["params"])
+        job["log"] = json.loads(job["log"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["position"] = self._queue_position(job) if job["status"] == QUEUED else 0
+        return job
+
+    # Function to list an owner's most recent job IDs, newest first
+    def recent_jobs(self, owner, limit=10):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE owner = ? ORDER BY created DESC LIMIT ?",
+                (owner, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # Number of queued jobs ahead of this one
+    def _queue_position(self, job):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created < ?",
+                (QUEUED, job["created"]),
+            ).fetchone()[0]
+
+    # Store progress and append a status line
+    def _update(self, job_id, progress=None, message=None):
+        with self._lock:
+            if progress is not None:
+                self._conn.execute(
+                    "UPDATE jobs SET progress = ? WHERE id = ?", (float(progress), job_id)
+                )
+            if message:
+                log = json.loads(
+                    self._conn.execute("SELECT log FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+                )
+                log = (log + [message])[-JOB_LOG_LINES:]
+                self._conn.execute(
+                    "UPDATE jobs SET message = ?, log = ? WHERE id = ?",
+                    (message, json.dumps(log), job_id),
+                )
+            self._conn.commit()
+
+    # Oldest queued job whose owner is under the per-owner limit and whose kind is registered
+    def _next_job(self):
+        if len(self._running) >= self.workers:
+            return None
+        busy = {}
+        for owner in self._running.values():
+            busy[owner] = busy.get(owner, 0) + 1
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, owner, params FROM jobs WHERE status = ? ORDER BY created",
+                (QUEUED,),
+            ).fetchall()
+        for job_id, kind, owner, params in rows:
+            if kind in self._handlers and busy.get(owner, 0) < self.per_owner:
+                return job_id, kind, owner, json.loads(params)
+        return None
+
+    # Dispatcher loop: start queued jobs whenever a worker and the owner's slot are free
+    def _dispatch(self):
+        while True:
+            with self._wake:
+                job = self._next_job()
+                if job is None:
+                    self._wake.wait(timeout=1.0)
+                    continue
+                job_id, kind, owner, params = job
+                self._running[job_id] = owner
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, started = ?, error = NULL WHERE id = ?",
+                    (RUNNING, time.time(), job_id),
+                )
+                self._conn.commit()
+            self._executor.submit(self._run, Job(self, job_id, kind, owner, params))
+
+    # Run one job and record its result or error
+    def _run(self, job):
+        try:
+            result = self._handlers[job.kind](job)
+            status, error, result = DONE, None, json.dumps(result, default=str)
+        except Exception as e:
+            traceback.print_exc()
+            status, error, result = FAILED, str(e), None
+        finally:
+            with self._wake:
+                self._running.pop(job.id, None)
+                self._wake.notify()
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, progress = COALESCE(?, progress) WHERE id = ?",
+                (status, result, error, time.time(), 1.0 if status == DONE else None, job.id),
+            )
+            self._conn.commit()
+
+
+_default_runner = None
+_default_lock = threading.Lock()
+
+
+# Shared process-wide runner used by the Streamlit app
+def get_job_runner():
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = JobRunner()
+        return _default_runner
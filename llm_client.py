@@ -0,0 +1,340 @@
+# Standard Libraries
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+
+# Third-Party Libraries
+import requests
+from requests.adapters import HTTPAdapter
+
+# Local Modules
+from tracing import trace_span
+
+# Endpoint and limits (override via environment variables; point OPENAI_BASE_URL at a
+# local fake server to exercise retries and rate limiting offline)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_TIMEOUT = (10, float(os.getenv("LLM_TIMEOUT", 120)))  # (connect, read) seconds
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_RETRY_BUDGET = int(os.getenv("LLM_RETRY_BUDGET", 50))  # retries allowed per run
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# Responses worth retrying: rate limits, server errors and timeouts
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+# Parse OpenAI reset durations like "1s", "250ms" or "6m0s" into seconds
+def parse_duration(value):
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    return sum(float(amount) * units[unit] for amount, unit in parts) if parts else None
+
+
+# Process-wide concurrency limit that halves on 429s and creeps back up on success (AIMD)
+class AdaptiveGovernor:
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+
+    # Block until a slot is free and no rate-limit pause is active; returns seconds waited
+    def acquire(self):
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < max(1, int(self.limit)):
+                    self.in_flight += 1
+                    return time.monotonic() - start
+                self._cond.wait(timeout=pause if pause > 0 else 1.0)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    # Halve the limit and pause every caller until the server's retry-after has passed
+    def on_rate_limit(self, retry_after=None):
+        with self._cond:
+            self.limit = max(1.0, self.limit / 2)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    # Pause ahead of time when the rate-limit headers say the window is exhausted
+    def on_headers(self, headers):
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is not None and remaining.strip() == "0":
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    with self._cond:
+                        self.paused_until = max(self.paused_until, time.monotonic() + reset)
+
+
+# Retries left for one run; shared by every call the run makes
+class RetryBudget:
+    def __init__(self, retries=LLM_RETRY_BUDGET):
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    # Spend one retry; False once the budget is exhausted
+    def take(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+# Thread-safe per-call latency, queue wait, retry and token counters
+class LLMMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = []
+        self.queue_wait = 0.0
+
+    def record(self, latency, queue_wait, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            self.calls += 1
+            self.latencies.append(latency)
+            self.queue_wait += queue_wait
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    # Latency at quantile q (0-1) over successful calls
+    def percentile(self, q):
+        with self._lock:
+            values = sorted(self.latencies)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_p50": round(self.percentile(0.5), 2),
+            "latency_p95": round(self.percentile(0.95), 2),
+            "queue_wait": round(self.queue_wait, 2),
+        }
+
+    # Function to merge several metrics objects into one (e.g. across model stages)
+    @classmethod
+    def combine(cls, metrics_list):
+        combined = cls()
+        for metrics in metrics_list:
+            with metrics._lock:
+                combined.calls += metrics.calls
+                combined.errors += metrics.errors
+                combined.retries += metrics.retries
+                combined.prompt_tokens += metrics.prompt_tokens
+                combined.completion_tokens += metrics.completion_tokens
+                combined.latencies.extend(metrics.latencies)
+                combined.queue_wait += metrics.queue_wait
+        return combined
+
+    def summary(self):
+        return (
+            f"📈 LLM: {self.calls} calls | p50 {self.percentile(0.5):.2f}s, "
+            f"p95 {self.percentile(0.95):.2f}s | tokens {self.prompt_tokens} in / "
+            f"{self.completion_tokens} out | {self.retries} retries, {self.errors} errors | "
+            f"queue wait {self.queue_wait:.1f}s"
+        )
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+# One governor per endpoint and model, shared by every client in the process
+def get_governor(base_url, model):
+    with _governors_lock:
+        key = (base_url, model)
+        if key not in _governors:
+            _governors[key] = AdaptiveGovernor()
+        return _governors[key]
+
+
+# Chat completions client with pooled connections, adaptive concurrency, retries and metrics.
+# Exposes predict/apredict, so it drops in wherever a LangChain chat model was used
+class LLMClient:
+    def __init__(
+        self,
+        model,
+        api_key=None,
+        temperature=0.3,
+        base_url=OPENAI_BASE_URL,
+        timeout=LLM_TIMEOUT,
+        max_retries=LLM_MAX_RETRIES,
+        retry_budget=None,
+        metrics=None,
+        session=None,
+        stage=None,
+    ):
+        self.model_name = model
+        self.stage = stage  # pipeline stage label for trace spans
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.temperature = temperature
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget or RetryBudget()
+        self.metrics = metrics or LLMMetrics()
+        self.governor = get_governor(self.base_url, model)
+        self.session = session or self._new_session()
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_MAX_CONCURRENCY)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    # Function to return a client for one run: same connections and governor, fresh
+    # metrics, and a retry budget (a count, or a RetryBudget shared with other clients)
+    def for_run(self, retry_budget=LLM_RETRY_BUDGET):
+        if not isinstance(retry_budget, RetryBudget):
+            retry_budget = RetryBudget(retry_budget)
+        return LLMClient(
+            self.model_name,
+            api_key=self.api_key,
+            temperature=self.temperature,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            retry_budget=retry_budget,
+            session=self.session,
+            stage=self.stage,
+        )
+
+    # Exponential backoff with jitter, never shorter than the server's retry-after
+    def _backoff(self, attempt, retry_after=None):
+        delay = min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt) * random.uniform(0.5, 1.0)
+        return max(delay, retry_after or 0)
+
+    # Send one request; returns (text, usage) or raises LLMError
+    def _send(self, prompt):
+        try:
+            resp = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json={
+                    "model": self.model_name,
+                    "temperature": self.temperature,
+                    "messages": [{"role": "user", "content": prompt}],
+                },
+                timeout=self.timeout,
+            )
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise LLMError(f"Request failed: {e}") from e
+
+        self.governor.on_headers(resp.headers)
+        if resp.status_code != 200:
+            retry_after = parse_duration(resp.headers.get("retry-after"))
+            raise LLMError(
+                f"HTTP {resp.status_code}: {resp.text[:200]}",
+                status=resp.status_code,
+                retry_after=retry_after,
+            )
+
+        # A 200 with a body that is not a chat completion counts as a transient failure
+        try:
+            body = resp.json()
+            return body["choices"][0]["message"]["content"] or "", body.get("usage") or {}
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Malformed response: {type(e).__name__}: {resp.text[:200]}") from e
+
+    # Function to send a prompt and return the model's text, retrying transient failures.
+    # Each call is one trace span covering every attempt
+    def predict(self, prompt):
+        with trace_span("llm", kind="llm", model=self.model_name, stage=self.stage) as span:
+            return self._predict(prompt, span)
+
+    def _predict(self, prompt, span):
+        attempt = 0
+        total_wait = 0.0
+        while True:
+            queue_wait = self.governor.acquire()
+            total_wait += queue_wait
+            start = time.monotonic()
+            try:
+                text, usage = self._send(prompt)
+            except LLMError as e:
+                error = e
+            else:
+                latency = time.monotonic() - start
+                self.governor.on_success()
+                self.metrics.record(
+                    latency,
+                    queue_wait,
+                    usage.get("prompt_tokens", 0),
+                    usage.get("completion_tokens", 0),
+                )
+                span.set(
+                    prompt_tokens=usage.get("prompt_tokens", 0),
+                    completion_tokens=usage.get("completion_tokens", 0),
+                    queue_wait=round(total_wait, 4),
+                    latency=round(latency, 4),
+                    retries=attempt,
+                )
+                return text
+            finally:
+                self.governor.release()
+
+            span.set(queue_wait=round(total_wait, 4), retries=attempt, status_code=error.status)
+            if error.status == 429:
+                self.governor.on_rate_limit(error.retry_after)
+            retryable = error.status is None or error.status in RETRY_STATUSES
+            if not retryable or attempt >= self.max_retries or not self.retry_budget.take():
+                self.metrics.record_error()
+                raise error
+
+            self.metrics.record_retry()
+            delay = self._backoff(attempt, error.retry_after)
+            print(f"🔁 LLM call failed ({error}); retry {attempt + 1} in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    # Async variant; the blocking call runs in a worker thread so the governor stays process-wide
+    async def apredict(self, prompt):
+        return await asyncio.to_thread(self.predict, prompt)
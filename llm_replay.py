@@ -0,0 +1,226 @@
+# Standard Libraries
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+# Local Modules
+from llm_client import LLMError, LLMMetrics, LLM_RETRY_BUDGET
+from model_routing import ModelRouter
+from mock_llm import model_latency
+from prompt_prefix import count_tokens
+from summary_cache import hash_text, make_key
+from tracing import trace_span
+
+# Default fixture file (override via environment variable)
+FIXTURES_PATH = os.getenv("LLM_FIXTURES_PATH", os.path.join("benchmarks", "fixtures", "llm.jsonl"))
+
+
+# Prompt -> response pairs in a JSON lines file; path=None keeps them in memory only
+class FixtureStore:
+    def __init__(self, path=FIXTURES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.records = {}  # (model, prompt hash) -> record
+        self.by_prompt = {}  # prompt hash -> latest record from any model
+
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def _index(self, record):
+        self.records[(record["model"], record["prompt_hash"])] = record
+        self.by_prompt[record["prompt_hash"]] = record
+
+    # Recorded reply for a prompt: same model first, then the same prompt from any model
+    def get(self, model, prompt):
+        prompt_hash = hash_text(prompt)
+        with self._lock:
+            return self.records.get((model, prompt_hash)) or self.by_prompt.get(prompt_hash)
+
+    # Function to record one call and append it to the fixture file
+    def add(self, model, prompt, response, latency=0.0):
+        record = {
+            "model": model,
+            "prompt_hash": hash_text(prompt),
+            "prompt": prompt,
+            "response": response,
+            "latency": round(latency, 3),
+            "prompt_tokens": count_tokens(prompt),
+            "completion_tokens": count_tokens(response),
+        }
+        with self._lock:
+            self._index(record)
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    # Recorded responses whose prompt contains marker
+    def responses(self, marker=""):
+        with self._lock:
+            return [r["response"] for r in self.records.values() if marker in r["prompt"]]
+
+    def __len__(self):
+        return len(self.records)
+
+
+# Wraps a live client and records every successful call as a fixture
+class RecordingLLM:
+    def __init__(self, llm, store):
+        self.llm = llm
+        self.store = store
+
+    @property
+    def model_name(self):
+        return getattr(self.llm, "model_name", "")
+
+    @property
+    def metrics(self):
+        return getattr(self.llm, "metrics", None)
+
+    def for_run(self, retry_budget=LLM_RETRY_BUDGET):
+        llm = self.llm.for_run(retry_budget) if hasattr(self.llm, "for_run") else self.llm
+        return RecordingLLM(llm, self.store)
+
+    def predict(self, prompt):
+        start = time.monotonic()
+        response = self.llm.predict(prompt)
+        self.store.add(self.model_name, prompt, response, time.monotonic() - start)
+        return response
+
+    async def apredict(self, prompt):
+        return await asyncio.to_thread(self.predict, prompt)
+
+
+# Function to record every call of a client or of each stage of a ModelRouter
+def record_llm(llm, path=FIXTURES_PATH):
+    store = path if isinstance(path, FixtureStore) else FixtureStore(path)
+    if isinstance(llm, ModelRouter):
+        clients = {stage: RecordingLLM(client, store) for stage, client in llm.clients.items()}
+        return ModelRouter(llm.routing, clients=clients)
+    return RecordingLLM(llm, store)
+
+
+# Serves recorded replies offline, with synthetic latency and injected errors.
+# latency: None replays the recorded latency, a number fixes it (seconds), both times latency_scale.
+# Errors are drawn per prompt and attempt from seed, so the same calls fail on every run
+# whatever order the threads make them in. Prompts without a fixture go to fallback(prompt)
+# when given, otherwise they raise LLMError
+class ReplayLLM:
+    def __init__(
+        self,
+        store,
+        model="gpt-4.1-2025-04-14",
+        latency=None,
+        latency_scale=1.0,
+        error_rate=0.0,
+        error_status=429,
+        max_retries=0,
+        seed=0,
+        fallback=None,
+        metrics=None,
+        stage=None,
+    ):
+        self.store = store
+        self.model_name = model
+        self.stage = stage
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_retries = max_retries
+        self.seed = seed
+        self.fallback = fallback
+        self.metrics = metrics or LLMMetrics()
+        self.misses = 0
+
+    def for_run(self, retry_budget=None):
+        return ReplayLLM(
+            self.store,
+            self.model_name,
+            latency=self.latency,
+            latency_scale=self.latency_scale,
+            error_rate=self.error_rate,
+            error_status=self.error_status,
+            max_retries=self.max_retries,
+            seed=self.seed,
+            fallback=self.fallback,
+            stage=self.stage,
+        )
+
+    # Whether attempt n of this prompt fails
+    def _fails(self, prompt, attempt):
+        if self.error_rate <= 0:
+            return False
+        draw = random.Random(make_key(self.seed, hash_text(prompt), attempt)).random()
+        return draw < self.error_rate
+
+    # Seconds to wait for a reply of the given size
+    def _delay(self, record, completion_tokens):
+        if self.latency is not None:
+            delay = self.latency
+        elif record is not None:
+            delay = record["latency"]
+        else:
+            first_token, per_token = model_latency(self.model_name)
+            delay = first_token + per_token * completion_tokens
+        return delay * self.latency_scale
+
+    # Function to return the recorded reply for a prompt, failing where errors are injected
+    def predict(self, prompt):
+        with trace_span("llm", kind="llm", model=self.model_name, stage=self.stage) as span:
+            return self._predict(prompt, span)
+
+    def _predict(self, prompt, span):
+        attempt = 0
+        while self._fails(prompt, attempt):
+            span.set(retries=attempt)
+            time.sleep(self._delay(None, 0))
+            if attempt >= self.max_retries:
+                self.metrics.record_error()
+                raise LLMError(f"Injected HTTP {self.error_status}", status=self.error_status)
+            self.metrics.record_retry()
+            attempt += 1
+
+        record = self.store.get(self.model_name, prompt)
+        if record is not None:
+            response = record["response"]
+        elif self.fallback is not None:
+            self.misses += 1
+            response = self.fallback(prompt)
+        else:
+            self.misses += 1
+            self.metrics.record_error()
+            raise LLMError(f"No fixture for prompt {hash_text(prompt)[:12]} on {self.model_name}")
+
+        completion_tokens = count_tokens(response)
+        delay = self._delay(record, completion_tokens)
+        if delay > 0:
+            time.sleep(delay)
+        prompt_tokens = count_tokens(prompt)
+        self.metrics.record(delay, 0.0, prompt_tokens, completion_tokens)
+        span.set(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            queue_wait=0.0,
+            latency=round(delay, 4),
+            retries=attempt,
+            replayed=record is not None,
+        )
+        return response
+
+    async def apredict(self, prompt):
+        return await asyncio.to_thread(self.predict, prompt)
+
+
+# Function to build a ModelRouter whose stages all replay from one fixture store
+def replay_router(store, routing=None, **replay_kwargs):
+    return ModelRouter(routing, client_factory=lambda model: ReplayLLM(store, model, **replay_kwargs))
@@ -0,0 +1,194 @@
+# Standard Libraries
+import asyncio
+import json
+import os
+import re
+import time
+
+# Local Modules
+from llm_client import LLMMetrics
+from prompt_prefix import count_tokens
+from asset_limits import truncate_to_limit
+from tracing import trace_span
+
+# Synthetic latency per model: (seconds to first token, seconds per output token),
+# matched on the model name prefix
+MOCK_LATENCY = {
+    "gpt-4.1-nano": (0.2, 0.004),
+    "gpt-4.1-mini": (0.3, 0.008),
+    "gpt-4.1": (0.5, 0.02),
+    "gpt-4o-mini": (0.3, 0.008),
+    "gpt-4o": (0.5, 0.02),
+}
+
+# Multiplier on every synthetic delay (0 disables sleeping; override via environment variable)
+MOCK_LATENCY_SCALE = float(os.getenv("MOCK_LATENCY_SCALE", 0.05))
+
+# Ad templates filled with the group's keywords
+HEADLINE_TEMPLATES = [
+    "{kw}",
+    "Best {kw}",
+    "{kw} Experts",
+    "Get {kw} Today",
+    "Trusted {kw}",
+    "Affordable {kw}",
+    "{kw} Near You",
+    "Book {kw} Now",
+    "Top Rated {kw}",
+    "{kw} Made Easy",
+]
+DESCRIPTION_TEMPLATES = [
+    "Discover {kw} built around your goals. Get started today.",
+    "Save time with {kw} from a team that answers fast.",
+    "Compare {kw} options and choose the plan that fits you.",
+    "Join customers who switched to our {kw}. Book a call now.",
+]
+CALLOUTS = [
+    "Free Consultation",
+    "24/7 Support",
+    "Top Rated",
+    "Fast Setup",
+    "No Hidden Fees",
+    "Local Experts",
+    "Flexible Plans",
+    "Cancel Anytime",
+]
+
+
+# (first token, per token) delay for a model
+def model_latency(model):
+    for prefix in sorted(MOCK_LATENCY, key=len, reverse=True):
+        if (model or "").startswith(prefix):
+            return MOCK_LATENCY[prefix]
+    return MOCK_LATENCY["gpt-4.1"]
+
+
+# Text after the last "CONTENT:" marker of a summary prompt
+def _content(prompt):
+    return prompt.rsplit("CONTENT:", 1)[-1].strip()
+
+
+# Extractive summary: leading sentences up to the word limit named in the prompt
+def mock_summary(prompt):
+    match = re.search(r"into (?:one summary of )?(\d+) words", prompt)
+    limit = int(match.group(1)) if match else 150
+    words = []
+    for sentence in re.split(r"(?<=[.!?])\s+", _content(prompt)):
+        sentence_words = sentence.split()
+        if words and len(words) + len(sentence_words) > limit:
+            break
+        words.extend(sentence_words[: limit - len(words)])
+    return " ".join(words)
+
+
+# Deterministic ad for one keyword list; long keywords yield over-limit assets on purpose
+def mock_ad(keywords):
+    keywords = [kw.strip() for kw in keywords if kw.strip()] or ["Our Services"]
+    main = keywords[0].title()
+    return {
+        "adGroupName": main,
+        "path1": main.split()[0][:15].lower(),
+        "path2": "offers",
+        "headlines": [
+            template.format(kw=keywords[i % len(keywords)].title())
+            for i, template in enumerate(HEADLINE_TEMPLATES)
+        ],
+        "descriptions": [
+            template.format(kw=keywords[i % len(keywords)].lower())
+            for i, template in enumerate(DESCRIPTION_TEMPLATES)
+        ],
+        "callouts": CALLOUTS,
+        "sitelinks": [
+            {
+                "headline": f"{name} {main}"[:25],
+                "description1": f"Learn about our {name.lower()}",
+                "description2": "Talk to a specialist today",
+            }
+            for name in ("About", "Pricing", "Reviews", "Contact")
+        ],
+        "structuredSnippet": {
+            "snippetType": "Service Catalogue",
+            "values": [kw.title() for kw in (keywords * 4)[:4]],
+        },
+        "callExtension": "Call For A Free Quote",
+        "locationExtension": "Serving customers nationwide",
+        "promotionalExtension": "10% Off First Order",
+        "priceExtension": "Plans From $49/mo",
+    }
+
+
+# Repair reply: cut over-length fields to their limit, leave other problems unfixed
+def mock_repair(prompt):
+    fixes = {}
+    for path, problem, value in re.findall(
+        r'^- "([^"]+)" (.+?)\. Current value: (.*)$', prompt, flags=re.MULTILINE
+    ):
+        limit = re.search(r"max (\d+)", problem)
+        if limit:
+            fixes[path] = truncate_to_limit(json.loads(value), int(limit.group(1)))
+    return fixes
+
+
+# Shorten reply: every listed asset cut to its limit at a word boundary
+def mock_shorten(prompt):
+    return {
+        asset_id: truncate_to_limit(json.loads(value), int(limit))
+        for asset_id, limit, value in re.findall(
+            r'^- id "(\d+)": [^,]+, max (\d+) characters, .*?: (".*")$', prompt, flags=re.MULTILINE
+        )
+    }
+
+
+# Function to build the mock reply for any pipeline prompt
+def mock_response(prompt):
+    if "🛠️ REPAIR:" in prompt:
+        return json.dumps(mock_repair(prompt))
+    if "TARGET KEYWORD GROUPS:" in prompt:
+        groups = re.findall(r"^Group (\d+):\n(.*)$", prompt, flags=re.MULTILINE)
+        return json.dumps(
+            [{**mock_ad(keywords.split(",")), "groupId": int(n)} for n, keywords in groups]
+        )
+    if "🔑 TARGET KEYWORDS:" in prompt:
+        keywords = prompt.rsplit("drift to unrelated topics:", 1)[-1].strip()
+        return json.dumps(mock_ad(keywords.split(",")))
+    if "Rewrite each ad asset" in prompt:
+        return json.dumps(mock_shorten(prompt))
+    if "CONTENT:" in prompt:
+        return mock_summary(prompt)
+    # Chatbot: cite the first retrieved passage
+    passage = re.search(r"^\[1\][^\n]*\n(.+)$", prompt, flags=re.MULTILINE)
+    return f"{passage.group(1)[:300]} [1]" if passage else "I couldn't find that in the documents."
+
+
+# Offline stand-in for LLMClient: deterministic replies, model-dependent synthetic latency
+# and the same metrics, so routings can be benchmarked without the API
+class MockLLM:
+    def __init__(self, model="gpt-4.1-2025-04-14", latency_scale=None, metrics=None, stage=None):
+        self.model_name = model
+        self.stage = stage
+        self.latency_scale = MOCK_LATENCY_SCALE if latency_scale is None else latency_scale
+        self.metrics = metrics or LLMMetrics()
+
+    def for_run(self, retry_budget=None):
+        return MockLLM(self.model_name, self.latency_scale, stage=self.stage)
+
+    def predict(self, prompt):
+        text = mock_response(prompt)
+        prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(text)
+        first_token, per_token = model_latency(self.model_name)
+        latency = (first_token + per_token * completion_tokens) * self.latency_scale
+        with trace_span("llm", kind="llm", model=self.model_name, stage=self.stage) as span:
+            if latency > 0:
+                time.sleep(latency)
+            span.set(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                queue_wait=0.0,
+                latency=round(latency, 4),
+                retries=0,
+            )
+        self.metrics.record(latency, 0.0, prompt_tokens, completion_tokens)
+        return text
+
+    async def apredict(self, prompt):
+        return await asyncio.to_thread(self.predict, prompt)
@@ -0,0 +1,149 @@
+# Standard Libraries
+import os
+
+# Local Modules
+from llm_client import LLMClient, LLMMetrics, RetryBudget, LLM_RETRY_BUDGET
+
+# Pipeline stages that make LLM calls
+STAGES = ("map", "reduce", "ads", "chatbot", "repair")
+
+# Flagship model for ad copy and final summaries; a cheaper tier for high-volume stages
+FLAGSHIP_MODEL = "gpt-4.1-2025-04-14"
+MINI_MODEL = "gpt-4.1-mini-2025-04-14"
+DEFAULT_ROUTING = {
+    "map": MINI_MODEL,
+    "reduce": FLAGSHIP_MODEL,
+    "ads": FLAGSHIP_MODEL,
+    "chatbot": FLAGSHIP_MODEL,
+    "repair": MINI_MODEL,
+}
+
+# List prices in USD per 1M (input, output) tokens, matched on the model name prefix
+MODEL_PRICES = {
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+# Price used for models missing from the table (override via environment variables)
+INPUT_PRICE_PER_1M = float(os.getenv("INPUT_PRICE_PER_1M", 2.00))
+OUTPUT_PRICE_PER_1M = float(os.getenv("OUTPUT_PRICE_PER_1M", 8.00))
+
+
+# (input, output) USD per 1M tokens for a model
+def model_price(model):
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if (model or "").startswith(prefix):
+            return MODEL_PRICES[prefix]
+    return INPUT_PRICE_PER_1M, OUTPUT_PRICE_PER_1M
+
+
+# USD cost of the given token counts on a model
+def token_cost(model, input_tokens, output_tokens):
+    input_price, output_price = model_price(model)
+    return (input_tokens * input_price + output_tokens * output_price) / 1e6
+
+
+# Function to build a stage -> model routing from defaults, a dict, or a
+# "map=gpt-4.1-mini,ads=gpt-4.1" string (MODEL_ROUTING environment variable by default)
+def load_routing(spec=None):
+    spec = os.getenv("MODEL_ROUTING", "") if spec is None else spec
+    if isinstance(spec, str):
+        spec = dict(
+            item.split("=", 1) for item in spec.replace(";", ",").split(",") if "=" in item
+        )
+    routing = dict(DEFAULT_ROUTING)
+    for stage, model in spec.items():
+        stage = stage.strip()
+        if stage not in STAGES:
+            raise ValueError(f"❌ Unknown model routing stage '{stage}'. Stages: {', '.join(STAGES)}")
+        routing[stage] = model.strip()
+    return routing
+
+
+# Model to use for a stage: a router hands out its stage client, a plain model is used as is
+def for_stage(llm, stage):
+    return llm.for_stage(stage) if hasattr(llm, "for_stage") else llm
+
+
+# Routes each pipeline stage to its own model client; stages keep separate metrics
+# so cost and latency can be reported per stage
+class ModelRouter:
+    def __init__(self, routing=None, client_factory=None, clients=None, **client_kwargs):
+        self.routing = load_routing(routing)
+        if clients is None:
+            factory = client_factory or (lambda model: LLMClient(model, **client_kwargs))
+            clients = {stage: factory(model) for stage, model in self.routing.items()}
+        self.clients = clients
+
+        # Label each client's trace spans with the stage it serves
+        for stage, client in clients.items():
+            if getattr(client, "stage", "") is None:
+                client.stage = stage
+
+    # Calls that name no stage are ad-generation calls
+    @property
+    def model_name(self):
+        return self.routing["ads"]
+
+    def for_stage(self, stage):
+        return self.clients[stage]
+
+    def predict(self, prompt):
+        return self.clients["ads"].predict(prompt)
+
+    async def apredict(self, prompt):
+        return await self.clients["ads"].apredict(prompt)
+
+    # Function to return a router for one run: per-stage clients with fresh metrics and
+    # one retry budget shared by every stage
+    def for_run(self, retry_budget=LLM_RETRY_BUDGET):
+        budget = RetryBudget(retry_budget)
+        return ModelRouter(
+            self.routing,
+            clients={
+                stage: client.for_run(budget) if hasattr(client, "for_run") else client
+                for stage, client in self.clients.items()
+            },
+        )
+
+    # Metrics across every stage
+    @property
+    def metrics(self):
+        return LLMMetrics.combine(
+            [client.metrics for client in self.clients.values() if hasattr(client, "metrics")]
+        )
+
+    # Function to report model, calls, tokens, cost and latency for each stage
+    def stage_report(self):
+        rows = []
+        for stage, client in self.clients.items():
+            metrics = getattr(client, "metrics", None)
+            if metrics is None:
+                continue
+            model = self.routing[stage]
+            rows.append(
+                {
+                    "stage": stage,
+                    "model": model,
+                    "calls": metrics.calls,
+                    "prompt_tokens": metrics.prompt_tokens,
+                    "completion_tokens": metrics.completion_tokens,
+                    "cost": round(token_cost(model, metrics.prompt_tokens, metrics.completion_tokens), 4),
+                    "latency_p50": round(metrics.percentile(0.5), 2),
+                    "latency_total": round(sum(metrics.latencies), 2),
+                }
+            )
+        return rows
+
+    def stage_summary(self):
+        lines = ["💵 Cost and latency by stage:"]
+        for row in self.stage_report():
+            lines.append(
+                f"  {row['stage']:<8} {row['model']:<26} {row['calls']:>5} calls | "
+                f"{row['prompt_tokens']:>8} in / {row['completion_tokens']:>7} out | "
+                f"${row['cost']:.4f} | p50 {row['latency_p50']}s, total {row['latency_total']}s"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,140 @@
+# Standard Libraries
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Third-Party Libraries
+import fitz  # PyMuPDF
+
+# Local Modules (kept light: worker processes import this module)
+from summary_cache import SummaryCache, make_key
+
+# Process pool settings for large documents
+PDF_WORKERS = os.cpu_count() or 1
+PDF_PARALLEL_MIN_PAGES = 40  # smaller PDFs are extracted in-process
+PDF_PAGES_PER_SHARD = 10
+HASH_BLOCK_BYTES = 1024 * 1024
+
+# Per-page text cache keyed by document hash and page number
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join(".cache", "pages.sqlite3"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+
+
+# Open a PDF without copying it: on-disk files by path, in-memory buffers by view
+def _open_pdf(pdf_bytes):
+    path = getattr(pdf_bytes, "name", None)
+    if isinstance(path, str) and os.path.isfile(path):
+        return fitz.open(path, filetype="pdf")
+    if isinstance(pdf_bytes, io.BytesIO):
+        return fitz.open(stream=pdf_bytes.getbuffer(), filetype="pdf")
+    pdf_bytes.seek(0)
+    return fitz.open(stream=pdf_bytes.read(), filetype="pdf")
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = SummaryCache(PAGE_CACHE_PATH, PAGE_CACHE_MAX_BYTES)
+        return _page_cache
+
+
+def hash_file(file_obj):
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for block in iter(lambda: file_obj.read(HASH_BLOCK_BYTES), b""):
+        digest.update(block)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+# Runs in a worker process: each worker opens the document itself
+def _extract_page_range(path, start, stop):
+    with fitz.open(path, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+# Split sorted page numbers into contiguous shards of at most size pages
+def _page_shards(page_numbers, size):
+    shards = []
+    for number in page_numbers:
+        if shards and number == shards[-1][1] and shards[-1][1] - shards[-1][0] < size:
+            shards[-1][1] += 1
+        else:
+            shards.append([number, number + 1])
+    return shards
+
+
+# Lazily yield (page_number, text) in page order, reusing cached page text
+def iter_pdf_pages(pdf_bytes, workers=PDF_WORKERS, use_cache=True):
+    cache = get_page_cache() if use_cache else None
+    doc_hash = hash_file(pdf_bytes)
+    with _open_pdf(pdf_bytes) as doc:
+        page_count = doc.page_count
+
+    keys = [make_key("page", doc_hash, number) for number in range(page_count)]
+    cached = {}
+    if cache:
+        for number, key in enumerate(keys):
+            text = cache.get(key)
+            if text is not None:
+                cached[number] = text
+    missing = [number for number in range(page_count) if number not in cached]
+
+    # Small or fully cached documents: extract in-process, one page at a time
+    if len(missing) < PDF_PARALLEL_MIN_PAGES or workers <= 1:
+        doc = _open_pdf(pdf_bytes) if missing else None
+        try:
+            for number in range(page_count):
+                if number not in cached:
+                    cached[number] = doc[number].get_text()
+                    if cache:
+                        cache.set(keys[number], cached[number])
+                yield number + 1, cached.pop(number)
+        finally:
+            if doc is not None:
+                doc.close()
+        return
+
+    # Workers need a path; in-memory downloads are written to a temp file first
+    path = getattr(pdf_bytes, "name", None)
+    temp = None
+    if not (isinstance(path, str) and os.path.isfile(path)):
+        temp = tempfile.NamedTemporaryFile(prefix="ads_pdf_", suffix=".pdf")
+        pdf_bytes.seek(0)
+        shutil.copyfileobj(pdf_bytes, temp)
+        temp.flush()
+        pdf_bytes.seek(0)
+        path = temp.name
+
+    print(f"📄 Extracting {len(missing)}/{page_count} PDF pages on {workers} processes")
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                start: pool.submit(_extract_page_range, path, start, stop)
+                for start, stop in _page_shards(missing, PDF_PAGES_PER_SHARD)
+            }
+            number = 0
+            while number < page_count:
+                if number in futures:
+                    for text in futures.pop(number).result():
+                        if cache:
+                            cache.set(keys[number], text)
+                        yield number + 1, text
+                        number += 1
+                else:
+                    yield number + 1, cached.pop(number)
+                    number += 1
+    finally:
+        if temp is not None:
+            temp.close()
@@ -0,0 +1,58 @@
+# Standard Libraries
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Local Modules
+from tracing import trace_span
+
+# Stages allowed to run at once (each stage may fan out further on its own)
+PIPELINE_WORKERS = 8
+
+
+# DAG executor: each stage starts as soon as the stages it depends on have finished
+class Pipeline:
+    def __init__(self):
+        self.stages = {}  # name -> (func, deps)
+        self.results = {}
+
+    # Function to add a stage; func receives the results of deps as positional arguments, in order
+    def add(self, name, func, deps=()):
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"❌ Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = (func, tuple(deps))
+        return name
+
+    # Run one stage (as a trace span when the run is traced)
+    def _run_stage(self, name):
+        func, deps = self.stages[name]
+        args = [self.results[dep] for dep in deps]
+        with trace_span(name, kind="stage"):
+            return func(*args)
+
+    # Function to run every stage, overlapping independent ones; returns the results by name
+    def run(self, max_workers=PIPELINE_WORKERS):
+        remaining = dict(self.stages)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as pool:
+            running = {}
+            try:
+                while remaining or running:
+                    # Start every stage whose inputs are ready
+                    for name, (_, deps) in list(remaining.items()):
+                        if all(dep in self.results for dep in deps):
+                            context = contextvars.copy_context()
+                            running[pool.submit(context.run, self._run_stage, name)] = name
+                            del remaining[name]
+
+                    if not running:
+                        raise RuntimeError(f"❌ Stages can never start: {sorted(remaining)}")
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        self.results[name] = future.result()
+            finally:
+                # On failure, drop stages that have not started yet
+                for future in running:
+                    future.cancel()
+        return self.results
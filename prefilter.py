@@ -0,0 +1,111 @@
+# Standard Libraries
+import math
+import re
+
+# Third-Party Libraries
+import numpy as np
+
+# Local Modules
+from chunking import CHUNK_TOKENS, chunk_text
+from prompt_prefix import count_tokens
+from retrieval import BM25Index, tokenize
+
+# Share of chunks kept when the pre-filter is on
+DEFAULT_KEEP_FRACTION = 0.6
+
+# Lines (speaker turns, paragraphs) of a low-relevance chunk
+LINE_BREAK = re.compile(r"\n+")
+
+# Terms that signal content useful for ad copy, used alongside the sheet's keywords
+MARKETING_TERMS = [
+    "offer", "offers", "discount", "sale", "price", "pricing", "cost", "free",
+    "trial", "guarantee", "warranty", "save", "savings", "deal", "promo",
+    "promotion", "customer", "customers", "client", "clients", "service",
+    "services", "product", "products", "benefit", "benefits", "quality",
+    "fast", "delivery", "shipping", "call", "book", "booking", "appointment",
+    "location", "locations", "area", "city", "hours", "support", "certified",
+    "licensed", "award", "rated", "reviews", "best", "premium", "brand",
+    "unique", "value", "results", "experience", "years", "team", "website",
+    "phone", "contact", "audience", "target", "competitor", "goal", "goals",
+]
+
+
+# Build the query vocabulary from keyword groups (dict or list of lists) and marketing terms
+def relevance_terms(keyword_groups=None, extra_terms=MARKETING_TERMS):
+    terms = set(extra_terms or [])
+    groups = keyword_groups.values() if isinstance(keyword_groups, dict) else (keyword_groups or [])
+    for keywords in groups:
+        for keyword in keywords:
+            terms.update(tokenize(str(keyword)))
+    return sorted(term for term in terms if len(term) > 2)
+
+
+# Function to score chunks against the query terms with BM25
+def score_chunks(chunks, terms):
+    if not chunks or not terms:
+        return np.zeros(len(chunks))
+    return BM25Index(chunks).scores(terms)
+
+
+# Function to condense low-relevance chunks into a few merged chunks: only their lines that
+# mention a query term survive, packed in document order up to max_tokens per chunk.
+# Returns [(index of the first source chunk, merged text)]
+def merge_low_relevance(chunks, indices, terms, max_tokens=CHUNK_TOKENS):
+    terms = set(terms)
+    excerpts = []
+    for i in indices:
+        lines = [line for line in LINE_BREAK.split(chunks[i]) if terms & set(tokenize(line))]
+        if lines:
+            excerpts.append((int(i), "\n".join(lines)))
+    if not excerpts:
+        return []
+
+    # Pack the excerpts, remembering which source chunk each merged chunk starts in
+    merged = []
+    text = ""
+    starts = []
+    for i, excerpt in excerpts:
+        starts.append((len(text), i))
+        text += excerpt + "\n\n"
+    for piece in chunk_text(text, max_tokens=max_tokens):
+        first = max(i for offset, i in starts if offset <= piece["start"])
+        merged.append((first, piece["text"]))
+    return merged
+
+
+# Function to keep the most ad-relevant chunks (in original order) and report the savings.
+# With merge on, the low-relevance rest is condensed into merged chunks instead of dropped
+def prefilter_chunks(chunks, keyword_groups=None, keep_fraction=DEFAULT_KEEP_FRACTION, merge=False):
+    total = len(chunks)
+    keep_count = min(total, max(1, math.ceil(total * keep_fraction))) if total else 0
+    terms = relevance_terms(keyword_groups)
+    scores = score_chunks(chunks, terms)
+
+    # Highest scores win; ties keep the earlier chunk
+    order = np.argsort(-scores, kind="stable")
+    kept = np.sort(order[:keep_count])
+    dropped = np.sort(order[keep_count:])
+
+    selected = [(int(i), chunks[i]) for i in kept]
+    merged = merge_low_relevance(chunks, dropped, terms) if merge else []
+    selected = [text for _, text in sorted(selected + merged, key=lambda item: item[0])]
+
+    report = {
+        "chunks": total,
+        "kept": int(len(kept)),
+        "merged": len(merged),
+        "calls_saved": int(len(dropped)) - len(merged),
+        "tokens_saved": int(
+            sum(count_tokens(chunks[i]) for i in dropped) - sum(count_tokens(text) for _, text in merged)
+        ),
+    }
+    return selected, report
+
+
+# One-line description of a pre-filter report, for the console and the job log
+def prefilter_summary(report):
+    merged = f", {report['merged']} merged" if report.get("merged") else ""
+    return (
+        f"Pre-filter kept {report['kept']}/{report['chunks']} chunks{merged} | "
+        f"saved {report['calls_saved']} calls, ~{report['tokens_saved']} tokens"
+    )
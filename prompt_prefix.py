@@ -0,0 +1,96 @@
+# Standard Libraries
+import hashlib
+import threading
+
+# Optional tokenizer; falls back to a character estimate when tiktoken is missing
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+# Load the tokenizer once; tiktoken downloads its tables, so it may be unavailable offline
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            if tiktoken is not None:
+                for name in ("o200k_base", "cl100k_base"):
+                    try:
+                        _encoding = tiktoken.get_encoding(name)
+                        break
+                    except Exception:
+                        continue
+            _encoding_loaded = True
+    return _encoding
+
+
+# Count tokens the way the OpenAI models do (approximate without tiktoken)
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# Normalize text so the same inputs always produce byte-identical prompts
+def canonicalize(text):
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    lines = [line.rstrip() for line in text.split("\n")]
+    return "\n".join(lines).strip()
+
+
+# Frozen shared prompt prefix: everything except the per-request suffix
+class SharedPrefix:
+    def __init__(self, text):
+        self.text = text
+        self.hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self.token_count = count_tokens(text)
+
+    # Append a per-request block to the frozen prefix
+    def render(self, suffix):
+        return self.text + suffix
+
+
+# Thread-safe counters showing how often prompts reuse a prefix already sent to the same
+# model (provider prompt caches are per model, so another model's copy does not count)
+class PrefixStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self.prompts = 0
+        self.reused = 0
+        self.prefix_tokens = 0
+        self.reused_prefix_tokens = 0
+        self.suffix_tokens = 0
+
+    # Record one prompt sent to model with the given prefix and suffix
+    def record(self, prefix, suffix, model=""):
+        suffix_tokens = count_tokens(suffix)
+        key = (model, prefix.hash)
+        with self._lock:
+            self.prompts += 1
+            self.prefix_tokens += prefix.token_count
+            self.suffix_tokens += suffix_tokens
+            if key in self._seen:
+                self.reused += 1
+                self.reused_prefix_tokens += prefix.token_count
+            else:
+                self._seen.add(key)
+
+    @property
+    def reuse_rate(self):
+        return self.reused / self.prompts if self.prompts else 0.0
+
+    def summary(self):
+        return (
+            f"🧩 Prompt prefix reuse: {self.reused}/{self.prompts} prompts "
+            f"({self.reuse_rate:.1%}) | prefix tokens {self.prefix_tokens} "
+            f"({self.reused_prefix_tokens} cacheable) | suffix tokens {self.suffix_tokens}"
+        )
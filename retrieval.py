@@ -0,0 +1,107 @@
+# Standard Libraries
+import re
+
+# Third-Party Libraries
+import numpy as np
+
+# Local Modules
+from chunking import chunk_text
+from summary_cache import make_key
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Passage size used for retrieval (smaller than summary chunks so answers cite a precise spot)
+PASSAGE_TOKENS = 400
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+# Lowercase word tokens used for scoring
+def tokenize(text):
+    return _WORD.findall(text.lower())
+
+
+# BM25 index over a fixed list of texts, precomputed as a dense passage x term weight matrix
+class BM25Index:
+    def __init__(self, texts):
+        self.size = len(texts)
+        self.vocabulary = {}
+        rows = []
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for i, text in enumerate(texts):
+            words = tokenize(text)
+            lengths[i] = len(words)
+            rows.append([self.vocabulary.setdefault(word, len(self.vocabulary)) for word in words])
+
+        tf = np.zeros((self.size, len(self.vocabulary)), dtype=np.float32)
+        for i, columns in enumerate(rows):
+            if columns:
+                np.add.at(tf[i], columns, 1)
+
+        df = (tf > 0).sum(axis=0)
+        self.idf = np.log((self.size - df + 0.5) / (df + 0.5) + 1.0).astype(np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(float(lengths.mean()) if self.size else 0.0, 1.0))
+        self.weights = tf * (BM25_K1 + 1) / (tf + norm[:, None])
+
+    # Score every text against the query terms (terms outside the vocabulary are ignored)
+    def scores(self, terms):
+        columns = sorted({self.vocabulary[term] for term in terms if term in self.vocabulary})
+        if not columns:
+            return np.zeros(self.size, dtype=np.float32)
+        return self.weights[:, columns] @ self.idf[columns]
+
+    # Indexes of the top_k best-scoring texts with a positive score, best first
+    def top(self, terms, top_k):
+        scores = self.scores(terms)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(int(i), float(scores[i])) for i in order if scores[i] > 0]
+
+
+# Searchable passages from the client documents, each tagged with its source and position
+class RetrievalIndex:
+    def __init__(self, passages):
+        self.passages = passages
+        self.hash = make_key(*((passage["source"], passage["text"]) for passage in passages))
+        self._bm25 = BM25Index([passage["text"] for passage in passages])
+
+    # Function to build the index from {source: chunks or plain text}
+    @classmethod
+    def from_documents(cls, documents, passage_tokens=PASSAGE_TOKENS):
+        passages = []
+        for source, content in documents.items():
+            if not content:
+                continue
+            chunks = chunk_text(content) if isinstance(content, str) else content
+            for chunk_number, chunk in enumerate(chunks, start=1):
+                pieces = chunk_text(chunk["text"], max_tokens=passage_tokens)
+                for piece_number, piece in enumerate(pieces, start=1):
+                    passages.append(
+                        {
+                            "source": source,
+                            "chunk": chunk_number,
+                            "part": piece_number,
+                            "page": chunk.get("page"),
+                            "text": piece["text"],
+                        }
+                    )
+        return cls(passages)
+
+    # Function to return the top_k passages for a question, best first
+    def search(self, question, top_k):
+        terms = [term for term in tokenize(question) if len(term) > 2]
+        return [
+            dict(self.passages[i], score=score) for i, score in self._bm25.top(terms, top_k)
+        ]
+
+    def __len__(self):
+        return len(self.passages)
+
+
+# Human-readable citation for a passage, e.g. "Zoom Transcript, chunk 3.2, p. 4"
+def cite(passage):
+    label = f"{passage['source']}, chunk {passage['chunk']}.{passage['part']}"
+    if passage.get("page"):
+        label += f", p. {passage['page']}"
+    return label
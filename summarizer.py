@@ -1,61 +1,416 @@
+import os
 import time
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-# Standard Libraries
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+# Local Modules
+from chunking import CHUNK_TOKENS, chunk_text
+from concurrency import imap_concurrent, map_concurrent
+from model_routing import for_stage, token_cost
+from prefilter import prefilter_chunks, prefilter_summary
+from prompt_prefix import count_tokens
+from summary_cache import get_summary_cache, hash_text, make_key
+from tracing import count
 
+# Concurrency settings for the chunk summaries (map stage)
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 2.0
 
-# Function to summarize text using the provided language model
-def summarize_text(llm, text, title):
-    
-    # Split the text into manageable chunks
-    print(f"\n🔍 Summarizing: {title}")
-    chunks = splitter.split_text(text)
-    chunk_summaries = []
+# Bump whenever the summary prompts change so cached summaries are invalidated
+PROMPT_VERSION = "1"
 
-    # Iterate through each chunk and summarize it
-    total_chunks = len(chunks)
-    total_start = time.time()
+# Expected reply sizes for the pre-run estimate
+CHUNK_SUMMARY_TOKENS = 200  # ~150 words
+REDUCE_SUMMARY_TOKENS = 330  # ~250 words
+FINAL_SUMMARY_TOKENS = 550  # ~400 words
 
-    # Print the total number of chunks
-    for i, chunk in enumerate(chunks, start=1):
-        start_time = time.time()
-        print(f"  📦 Chunk {i}/{total_chunks} | {len(chunk)} chars")
+# Tree reduce: summaries are merged in groups that fit this many input tokens
+REDUCE_INPUT_TOKENS = int(os.getenv("REDUCE_INPUT_TOKENS", 8000))
+MAX_REDUCE_LEVELS = 6
 
-        # Prepare the prompt for summarization
-        prompt = f"""
+
+# Prompt for summarizing one chunk
+def chunk_prompt(title, chunk):
+    return f"""
 You are a Google Ads strategist. Summarize this part of the document titled '{title}' into 150 words or fewer.
 
 CONTENT:
 {chunk}
 """
+
+
+# Prompt for combining the chunk summaries
+def final_prompt(title, joined_summaries):
+    return f"""
+You are a Google Ads strategist. Summarize the following summaries of the document titled '{title}' into 400 words or fewer.
+
+CONTENT:
+{joined_summaries}
+"""
+
+
+# Prompt for merging a group of summaries at an intermediate reduce level
+def reduce_prompt(title, joined_summaries):
+    return f"""
+You are a Google Ads strategist. Merge the following partial summaries of the document titled '{title}' into one summary of 250 words or fewer. Keep concrete facts such as offers, prices, locations, contact details and product features.
+
+CONTENT:
+{joined_summaries}
+"""
+
+
+# Split summaries into consecutive groups whose combined tokens fit the reduce budget
+# (size gives an item's tokens, so the estimate can plan with token counts alone)
+def _reduce_groups(summaries, budget=REDUCE_INPUT_TOKENS, size=count_tokens):
+    groups = []
+    current = []
+    current_tokens = 0
+    for summary in summaries:
+        tokens = size(summary)
+        if current and (current_tokens + tokens > budget):
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+# Function to estimate calls, tokens and cost for summarizing the given chunks: map calls
+# priced on map_model, then the tree reduce levels and the final combine on reduce_model.
+# The reduce is planned the way reduce_summaries runs it, from expected summary sizes
+def estimate_summary_plan(chunks, title, total_chunks=None, map_model="", reduce_model=""):
+    total_chunks = len(chunks) if total_chunks is None else total_chunks
+    preamble = count_tokens(chunk_prompt(title, ""))
+    map_input = sum(count_tokens(chunk) for chunk in chunks) + preamble * len(chunks)
+    map_output = CHUNK_SUMMARY_TOKENS * len(chunks)
+
+    reduce_preamble = count_tokens(reduce_prompt(title, ""))
+    reduce_calls = reduce_input = reduce_output = levels = 0
+    sizes = [CHUNK_SUMMARY_TOKENS] * total_chunks
+    while len(sizes) > 1 and sum(sizes) > REDUCE_INPUT_TOKENS and levels < MAX_REDUCE_LEVELS:
+        levels += 1
+        next_level = []
+        for group in _reduce_groups(sizes, size=lambda tokens: tokens):
+            if len(group) == 1:
+                next_level.extend(group)
+                continue
+            reduce_calls += 1
+            reduce_input += reduce_preamble + sum(group)
+            reduce_output += REDUCE_SUMMARY_TOKENS
+            next_level.append(REDUCE_SUMMARY_TOKENS)
+        if len(next_level) >= len(sizes):
+            break
+        sizes = next_level
+
+    combine_input = count_tokens(final_prompt(title, "")) + sum(sizes)
+    input_tokens = map_input + reduce_input + combine_input
+    output_tokens = map_output + reduce_output + FINAL_SUMMARY_TOKENS
+    cost = token_cost(map_model, map_input, map_output) + token_cost(
+        reduce_model, reduce_input + combine_input, reduce_output + FINAL_SUMMARY_TOKENS
+    )
+    return {
+        "calls": len(chunks) + reduce_calls + 1,
+        "reduce_calls": reduce_calls,
+        "reduce_levels": levels,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost": round(cost, 4),
+    }
+
+
+# Model name used to key cached summaries
+def _model_name(llm):
+    return getattr(llm, "model_name", None) or getattr(llm, "model", "") or ""
+
+
+# Function to summarize a list of chunks concurrently and combine the results
+def summarize_chunks(
+    llm,
+    chunks,
+    title,
+    max_workers=MAX_WORKERS,
+    requests_per_second=REQUESTS_PER_SECOND,
+    on_progress=None,
+    use_cache=True,
+    max_cost=None,
+    keep_fraction=None,
+    keyword_groups=None,
+    merge_filtered=False,
+    report=None,
+):
+    # Accept extraction chunks ({"text", "start", "end", "page", ...}) or plain strings
+    texts = (chunk["text"] if isinstance(chunk, dict) else chunk for chunk in chunks)
+
+    # A list is planned and priced before any call. Any other iterable (e.g. a PDF whose later
+    # pages are still being extracted) streams into the map stage as each chunk fills, unless
+    # the pre-filter or a cost cap needs the whole document first
+    prefilter = keep_fraction is not None and keep_fraction < 1
+    streaming = not isinstance(chunks, (list, tuple)) and not prefilter and max_cost is None
+    chunks = [] if streaming else list(texts)
+
+    # Optional local pre-filter: drop (or merge) low-relevance chunks before any LLM call
+    if prefilter and chunks:
+        chunks, filter_report = prefilter_chunks(chunks, keyword_groups, keep_fraction, merge=merge_filtered)
+        print(f"  🧹 {prefilter_summary(filter_report)}")
+        if report is not None:
+            report["prefilter"] = filter_report
+    total_start = time.time()
+    cache = get_summary_cache() if use_cache else None
+    map_llm = for_stage(llm, "map")
+    reduce_llm = for_stage(llm, "reduce")
+    model = _model_name(map_llm)
+    reduce_model = _model_name(reduce_llm)
+
+    def chunk_key(chunk):
+        return make_key("chunk", model, PROMPT_VERSION, title, hash_text(chunk))
+
+    def document_key():
+        return make_key(
+            "document", model, reduce_model, PROMPT_VERSION, title, hash_text("\n\n".join(chunks))
+        )
+
+    # Cached summary of this exact document text, if it was summarized before
+    def cached_document():
+        if not cache:
+            return None
+        summary = cache.get(document_key())
+        if summary is not None:
+            total_chunks = len(chunks)
+            print(f"  💾 Cache hit for {title}")
+            count("cache_hits")
+            if on_progress:
+                on_progress(total_chunks, total_chunks)
+            if report is not None:
+                report.update(chunks=total_chunks, summarized=total_chunks, complete=True)
+        return summary
+
+    # Report the call count and token spend of mapping the given chunks and reducing the rest
+    def report_plan(mapped):
+        plan = estimate_summary_plan(
+            [chunks[i] for i in mapped], title, len(chunks), map_model=model, reduce_model=reduce_model
+        )
+        print(
+            f"  📐 Plan: {plan['calls']} LLM calls ({plan['reduce_calls']} reduce over "
+            f"{plan['reduce_levels']} levels) | ~{plan['input_tokens']} input + "
+            f"~{plan['output_tokens']} output tokens | ~${plan['cost']}"
+        )
+        return plan
+
+    if streaming:
+        chunk_keys = []
+        results = []
+        mapped = []
+        cached = {"count": 0}
+
+        # Read chunks as extraction yields them; only chunks missing from the cache reach the LLM
+        def read_pending():
+            for text in texts:
+                chunks.append(text)
+                chunk_keys.append(chunk_key(text))
+                results.append(cache.get(chunk_keys[-1]) if cache else None)
+                if results[-1] is None:
+                    mapped.append(len(chunks) - 1)
+                    yield len(chunks) - 1
+                else:
+                    cached["count"] += 1
+                    count("cache_hits")
+
+        pending = read_pending()
+        print("  🚰 Streaming chunks into the map stage as they are extracted")
+    else:
+        total_chunks = len(chunks)
+
+        # Return the cached document summary if this exact text was summarized before
+        cached_summary = cached_document()
+        if cached_summary is not None:
+            return cached_summary
+
+        # Only chunks that changed since the last run reach the LLM
+        chunk_keys = [chunk_key(chunk) for chunk in chunks]
+        results = [cache.get(key) if cache else None for key in chunk_keys]
+        pending = [i for i, summary in enumerate(results) if summary is None]
+        cached = {"count": total_chunks - len(pending)}
+        if cached["count"]:
+            print(f"  💾 {cached['count']}/{total_chunks} chunk summaries loaded from cache")
+            count("cache_hits", cached["count"])
+
+        # Report the expected call count and token spend before running
+        plan = report_plan(pending)
+        if max_cost is not None and plan["cost"] > max_cost:
+            raise ValueError(
+                f"❌ Summarizing '{title}' is estimated at ${plan['cost']}, over the ${max_cost} budget"
+            )
+
+    # Summarize a single chunk, returning None if the call fails
+    def summarize_chunk(index):
+        chunk = chunks[index]
+        start_time = time.time()
+        print(f"  📦 Chunk {index + 1}/{len(chunks)} | {len(chunk)} chars")
+
         # Call the language model to summarize the chunk
         try:
-            summary = llm.predict(prompt)
-            chunk_summaries.append(summary)
-            print(f"     ✅ Done in {round(time.time() - start_time, 2)}s")
+            summary = map_llm.predict(chunk_prompt(title, chunk))
+            if cache:
+                cache.set(chunk_keys[index], summary)
+            print(f"     ✅ Chunk {index + 1} done in {round(time.time() - start_time, 2)}s")
+            return index, summary
         except Exception as e:
-            print(f"     ❌ Error in chunk {i}: {e}")
-        time.sleep(0.5)
+            print(f"     ❌ Error in chunk {index + 1}: {e}")
+            return index, None
+
+    # Map stage: results are stored back in the original chunk order and progress is
+    # reported as chunks finish (against the chunks read so far when streaming)
+    stream = imap_concurrent(
+        summarize_chunk, pending, max_workers=max_workers, rate_limit=requests_per_second
+    )
+    for done, (_, (index, summary)) in enumerate(stream, start=1):
+        results[index] = summary
+        if on_progress:
+            on_progress(cached["count"] + done, len(chunks))
+    total_chunks = len(chunks)
+    doc_key = document_key()
+
+    # A streamed document is only known in full now: skip the reduce when its summary is
+    # cached, otherwise report what the run costs
+    if streaming:
+        cached_summary = cached_document()
+        if cached_summary is not None:
+            return cached_summary
+        report_plan(mapped)
+    chunk_summaries = [summary for summary in results if summary is not None]
 
     # Combine all chunk summaries into a final summary
+    combined, combined_ok = _reduce_summaries(
+        reduce_llm,
+        chunk_summaries,
+        title,
+        cache=cache,
+        max_workers=max_workers,
+        requests_per_second=requests_per_second,
+    )
+
+    # Only cache complete summaries so failed chunks are retried next run
+    complete = combined_ok and len(chunk_summaries) == total_chunks
+    if cache and complete:
+        cache.set(doc_key, combined)
+    if report is not None:
+        report.update(chunks=total_chunks, summarized=len(chunk_summaries), complete=complete)
+
+    print(f"✅ {title} summarization done in {round(time.time() - total_start, 2)} seconds\n")
+    return combined
+
+
+# Function to combine summaries with a multi-level tree reduce, checkpointing each level
+def reduce_summaries(
+    llm,
+    summaries,
+    title,
+    cache=None,
+    max_workers=MAX_WORKERS,
+    requests_per_second=REQUESTS_PER_SECOND,
+):
+    return _reduce_summaries(llm, summaries, title, cache, max_workers, requests_per_second)[0]
+
+
+# Reduce summaries and report whether the final combine call succeeded
+def _reduce_summaries(
+    llm,
+    summaries,
+    title,
+    cache=None,
+    max_workers=MAX_WORKERS,
+    requests_per_second=REQUESTS_PER_SECOND,
+):
+    llm = for_stage(llm, "reduce")
+    model = _model_name(llm)
+    level = 0
+
+    # Merge in fan-in groups (in parallel) until everything fits one final prompt
+    while len(summaries) > 1 and sum(count_tokens(x) for x in summaries) > REDUCE_INPUT_TOKENS:
+        if level >= MAX_REDUCE_LEVELS:
+            break
+        level += 1
+        groups = _reduce_groups(summaries)
+        print(f"\n🌲 Reduce level {level}: {len(summaries)} summaries → {len(groups)} groups")
+
+        # Merge one group, reusing a checkpointed result from an earlier run if present
+        def merge(group):
+            key = make_key("reduce", model, PROMPT_VERSION, title, hash_text("\n\n".join(group)))
+            if cache:
+                cached = cache.get(key)
+                if cached is not None:
+                    count("cache_hits")
+                    return cached
+            if len(group) == 1:
+                return group[0]
+            try:
+                merged = llm.predict(reduce_prompt(title, "\n\n".join(group)))
+                if cache:
+                    cache.set(key, merged)
+                return merged
+            except Exception as e:
+                print(f"     ❌ Error merging summaries at level {level}: {e}")
+                return None
+
+        merged = map_concurrent(
+            merge, groups, max_workers=max_workers, rate_limit=requests_per_second
+        )
+
+        # A failed group keeps its inputs, so nothing already summarized is lost
+        next_level = []
+        for group, result in zip(groups, merged):
+            next_level.extend([result] if result is not None else group)
+        if len(next_level) >= len(summaries):
+            print("     ⚠️ Reduce made no progress; combining what we have")
+            summaries = next_level
+            break
+        summaries = next_level
+
     final_start = time.time()
-    print(f"\n🧠 Combining {len(chunk_summaries)} summaries...")
-    
-    # Prepare the final prompt for summarization
-    final_prompt = f"""
-You are a Google Ads strategist. Summarize the following summaries of the document titled '{title}' into 400 words or fewer.
+    print(f"\n🧠 Combining {len(summaries)} summaries...")
 
-CONTENT:
-{"\n\n".join(chunk_summaries)}
-"""
-    # Call the language model to summarize the final prompt
+    # Call the language model to summarize the combined summaries
     try:
-        combined = llm.predict(final_prompt)
+        combined = llm.predict(final_prompt(title, "\n\n".join(summaries)))
         print(f"     ✅ Final summary complete in {round(time.time() - final_start, 2)}s")
+        return combined, bool(combined)
     except Exception as e:
+        # Keep the summaries we already paid for instead of discarding them
         print(f"     ❌ Error in final summary: {e}")
-        combined = ""
+        print(f"     ⚠️ Falling back to the {len(summaries)} uncombined summaries")
+        return "\n\n".join(summaries), False
 
-    print(f"✅ {title} summarization done in {round(time.time() - total_start, 2)} seconds\n")
-    return combined
\ No newline at end of file
+
+# Function to summarize text using the provided language model
+def summarize_text(
+    llm,
+    text,
+    title,
+    max_workers=MAX_WORKERS,
+    requests_per_second=REQUESTS_PER_SECOND,
+    on_progress=None,
+    use_cache=True,
+    chunk_tokens=CHUNK_TOKENS,
+    max_cost=None,
+    keep_fraction=None,
+    keyword_groups=None,
+    merge_filtered=False,
+):
+
+    # Split the text into token-sized chunks
+    print(f"\n🔍 Summarizing: {title}")
+    chunks = chunk_text(text, max_tokens=chunk_tokens)
+    return summarize_chunks(
+        llm,
+        chunks,
+        title,
+        max_workers=max_workers,
+        requests_per_second=requests_per_second,
+        on_progress=on_progress,
+        use_cache=use_cache,
+        max_cost=max_cost,
+        keep_fraction=keep_fraction,
+        keyword_groups=keyword_groups,
+        merge_filtered=merge_filtered,
+    )
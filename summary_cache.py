@@ -0,0 +1,115 @@
+# Standard Libraries
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Cache location and size budget (override via environment variables)
+CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", os.path.join(".cache", "summaries.sqlite3"))
+MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+
+# Build a content-addressed cache key from its parts
+def make_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+# Hash a document's extracted text
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Persistent on-disk summary cache with size-based LRU eviction
+class SummaryCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    # Return the cached summary for key (or None) and mark it recently used
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE summaries SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    # Store a summary and evict least recently used entries over the size budget
+    def set(self, key, value):
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    # Total size of all cached summaries in bytes
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM summaries"
+            ).fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries")
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM summaries"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM summaries ORDER BY accessed ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+            total -= size
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+# Shared cache instance used by summarizer and the Streamlit app
+def get_summary_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SummaryCache()
+        return _default_cache
@@ -0,0 +1,114 @@
+# Standard Libraries
+import json
+
+# Local Modules
+from ad_generator import generate_ads
+from mock_llm import MockLLM
+from model_routing import ModelRouter
+from prompt_prefix import PrefixStats
+
+RULES = "Write clear, benefit-led ads. Never promise prices that are not in the offers."
+
+
+# MockLLM that keeps every prompt it is sent
+class RecordingMock(MockLLM):
+    def __init__(self, model="gpt-4.1-2025-04-14"):
+        super().__init__(model, latency_scale=0)
+        self.prompts = []
+
+    def predict(self, prompt):
+        self.prompts.append(prompt)
+        return super().predict(prompt)
+
+
+def test_repair_calls_skip_shared_prefix_and_stats():
+    clients = {stage: RecordingMock() for stage in ("map", "reduce", "ads", "chatbot", "repair")}
+    router = ModelRouter(clients=clients)
+    stats = PrefixStats()
+    # Long keywords make the mock overflow the headline limit, so every ad needs a repair
+    groups = {"Drains": ["emergency blocked drain cleaning specialists"], "Boilers": ["boiler"]}
+
+    rows = generate_ads(router, groups, RULES, prefix_stats=stats, max_workers=1, batch_size=1)
+
+    assert len(rows) == 2
+    repairs = clients["repair"].prompts
+    assert repairs and all("🛠️ REPAIR:" in prompt for prompt in repairs)
+    assert all(RULES not in prompt for prompt in repairs)
+    assert stats.prompts == len(clients["ads"].prompts)
+
+
+# Ads client whose replies null out some fields; repair calls fail
+class NullFieldsMock(RecordingMock):
+    def __init__(self, nulls):
+        super().__init__()
+        self.nulls = nulls
+
+    def predict(self, prompt):
+        if "🛠️ REPAIR:" in prompt:
+            self.prompts.append(prompt)
+            raise RuntimeError("repair model unavailable")
+        ad = json.loads(super().predict(prompt))
+        return json.dumps({**ad, **dict.fromkeys(self.nulls)})
+
+
+def _router(ads, repair=None):
+    clients = {stage: RecordingMock() for stage in ("map", "reduce", "chatbot")}
+    return ModelRouter(clients={**clients, "ads": ads, "repair": repair or ads})
+
+
+def test_null_optional_field_becomes_empty_cell():
+    ads = NullFieldsMock(["path1"])
+    rows = generate_ads(_router(ads), {"Boilers": ["boiler"]}, RULES, requests_per_second=None)
+
+    assert len(rows) == 1
+    assert rows[0]["Path 1"] == ""
+    assert rows[0]["Headline 1"]
+
+
+def test_null_required_fields_after_failed_repair_keep_the_group():
+    nulls = ["callExtension", "sitelinks", "structuredSnippet", "adGroupName"]
+    ads = NullFieldsMock(nulls)
+    rows = generate_ads(_router(ads), {"Boilers": ["boiler"]}, RULES, requests_per_second=None)
+
+    assert len(rows) == 1
+    assert rows[0]["Call Extension"] == "" and rows[0]["Sitelink Headline 1"] == ""
+    assert rows[0]["Ad group"] == "AdGroup_1"
+    assert any("🛠️ REPAIR:" in prompt for prompt in ads.prompts)
+
+
+GROUPS = {f"Group {n}": [f"service {n}"] for n in range(1, 6)}
+
+
+def _ads_requests(prompts):
+    return [prompt for prompt in prompts if "🛠️ REPAIR:" not in prompt]
+
+
+def test_batch_size_splits_groups_into_requests():
+    ads = RecordingMock()
+    rows = generate_ads(_router(ads, RecordingMock()), GROUPS, RULES, batch_size=2, requests_per_second=None)
+
+    requests = _ads_requests(ads.prompts)
+    assert len(rows) == 5
+    assert len(requests) == 3
+    assert sum("TARGET KEYWORD GROUPS:" in prompt for prompt in requests) == 2
+
+
+# Ads client whose batched replies leave out the last group
+class IncompleteBatchMock(RecordingMock):
+    def predict(self, prompt):
+        reply = super().predict(prompt)
+        if "TARGET KEYWORD GROUPS:" in prompt:
+            return json.dumps(json.loads(reply)[:-1])
+        return reply
+
+
+def test_group_missing_from_batch_reply_is_retried_alone():
+    ads = IncompleteBatchMock()
+    groups = dict(list(GROUPS.items())[:3])
+    rows = generate_ads(_router(ads, RecordingMock()), groups, RULES, batch_size=3, requests_per_second=None)
+
+    requests = _ads_requests(ads.prompts)
+    assert len(rows) == 3
+    assert len(requests) == 2
+    assert "TARGET KEYWORD GROUPS:" in requests[0]
+    assert "service 3" in requests[1] and "service 1" not in requests[1]
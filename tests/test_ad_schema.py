@@ -0,0 +1,51 @@
+# Local Modules
+from ad_schema import parse_json_tolerant, set_path
+
+
+def test_parses_plain_object():
+    assert parse_json_tolerant('{"a": 1}') == {"a": 1}
+
+
+def test_skips_brackets_in_chatter():
+    text = 'Here are [2] ads: [{"a":1},{"a":2}]'
+    assert parse_json_tolerant(text) == [{"a": 1}, {"a": 2}]
+
+
+def test_skips_chatter_object_after_non_object():
+    text = 'Step [1] done. Result: {"headline": "Fast Repairs"} Hope this helps!'
+    assert parse_json_tolerant(text) == {"headline": "Fast Repairs"}
+
+
+def test_strips_code_fences():
+    text = '```json\n{"headlines": ["A", "B"],}\n```'
+    assert parse_json_tolerant(text) == {"headlines": ["A", "B"]}
+
+
+def test_recovers_truncated_output():
+    text = '{"headlines": ["Fast Repairs", "Same Day Serv'
+    assert parse_json_tolerant(text) == {"headlines": ["Fast Repairs", "Same Day Serv"]}
+
+
+def test_recovers_truncated_batch_to_last_complete_ad():
+    text = '[{"groupId": 1, "a": 1}, {"groupId": 2, "a": '
+    assert parse_json_tolerant(text)[0] == {"groupId": 1, "a": 1}
+
+
+def test_falls_back_to_first_value_without_objects():
+    assert parse_json_tolerant("values: [1, 2, 3]") == [1, 2, 3]
+
+
+def test_raises_without_json():
+    try:
+        parse_json_tolerant("no json here")
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+def test_set_path_pads_lists_with_distinct_containers():
+    ad = {"sitelinks": []}
+    set_path(ad, "sitelinks[2].headline", "X")
+    assert ad["sitelinks"] == [{}, {}, {"headline": "X"}]
+    ad["sitelinks"][0]["headline"] = "Y"
+    assert ad["sitelinks"][1] == {}
@@ -0,0 +1,41 @@
+# Standard Libraries
+import csv
+
+# Local Modules
+from ad_writer import AdRowWriter
+
+
+def _row(name):
+    return {"Ad Group": name, "Headline 1": f"{name} headline"}
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_finalize_writes_sheet_order_not_completion_order(tmp_path):
+    output = str(tmp_path / "ads.csv")
+    writer = AdRowWriter(output, run_key="run")
+    for position, name in [(2, "C"), (0, "A"), (1, "B")]:
+        writer.write(name, _row(name), position)
+    writer.finalize()
+
+    rows = _read_csv(output)
+    assert [row["Ad Group"] for row in rows] == ["A", "B", "C"]
+    assert list(rows[0]) == ["Ad Group", "Headline 1"]
+
+
+def test_resumed_run_keeps_sheet_order(tmp_path):
+    output = str(tmp_path / "ads.csv")
+    first = AdRowWriter(output, run_key="run")
+    first.write("C", _row("C"), 2)
+    first.close()
+
+    second = AdRowWriter(output, run_key="run")
+    assert second.completed_groups == {"C"}
+    second.write("B", _row("B"), 1)
+    second.write("A", _row("A"), 0)
+    second.finalize()
+
+    assert [row["Ad Group"] for row in _read_csv(output)] == ["A", "B", "C"]
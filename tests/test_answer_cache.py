@@ -0,0 +1,52 @@
+# Local Modules
+from answer_cache import AnswerCache
+
+
+def test_paraphrase_reuses_answer():
+    cache = AnswerCache()
+    cache.set("What is the sale?", "docs", ("20% off", "Offers"))
+    assert cache.get("what's the sale", "docs") == ("20% off", "Offers")
+
+
+def test_different_question_word_misses():
+    cache = AnswerCache()
+    cache.set("What is the sale?", "docs", ("20% off", "Offers"))
+    assert cache.get("When is the sale?", "docs") is None
+    assert cache.get("Where is the sale?", "docs") is None
+
+
+def test_long_questions_with_different_question_words_miss():
+    cache = AnswerCache()
+    cache.set("What emergency plumbing services do you offer in Boston on weekends?", "docs", ("a", "Website"))
+    assert cache.get("Why emergency plumbing services do you offer in Boston on weekends?", "docs") is None
+
+
+def test_other_documents_miss():
+    cache = AnswerCache()
+    cache.set("What is the sale?", "docs", ("20% off", "Offers"))
+    assert cache.get("What is the sale?", "other docs") is None
+
+
+def test_different_city_misses():
+    cache = AnswerCache()
+    cache.set("What is the price in Boston?", "docs", ("$99", "Pricing"))
+    assert cache.get("What is the price in Denver?", "docs") is None
+
+
+def test_different_customer_type_misses():
+    cache = AnswerCache()
+    cache.set("What discounts do you offer for new customers?", "docs", ("10% off", "Offers"))
+    assert cache.get("What discounts do you offer for existing customers?", "docs") is None
+
+
+def test_negated_question_misses():
+    cache = AnswerCache()
+    cache.set("Do you offer weekend service?", "docs", ("Yes", "Hours"))
+    assert cache.get("Do you not offer weekend service?", "docs") is None
+    assert cache.get("Don't you offer weekend service?", "docs") is None
+
+
+def test_plural_and_stopword_paraphrase_reuses_answer():
+    cache = AnswerCache()
+    cache.set("Do you offer weekend services?", "docs", ("Yes", "Hours"))
+    assert cache.get("do you offer a weekend service", "docs") == ("Yes", "Hours")
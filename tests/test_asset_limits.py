@@ -0,0 +1,39 @@
+# Third-Party Libraries
+import pandas as pd
+
+# Local Modules
+from ad_writer import read_output, write_output
+from asset_limits import find_violations
+
+
+def _ads():
+    return pd.DataFrame(
+        [
+            {"Headline 1": "Fast Fix", "Path 1": "plumbing", "Call Extension": "Call Now", "Description 1": "Great"},
+            {"Headline 1": "fast fix!", "Path 1": "plumbing", "Call Extension": "Call Now", "Description 1": "Other"},
+        ]
+    )
+
+
+def test_cross_group_dedupe_only_flags_headlines_and_descriptions():
+    violations = find_violations(_ads())
+    assert list(violations["column"]) == ["Headline 1"]
+    assert violations.loc[0, "row"] == 1
+
+
+def test_cross_group_families_are_configurable():
+    violations = find_violations(_ads(), cross_group_families=("headline", "path"))
+    assert sorted(violations["column"]) == ["Headline 1", "Path 1"]
+
+
+def test_duplicates_within_one_ad_are_still_flagged():
+    df = pd.DataFrame([{"Callout 1": "Free Quote", "Callout 2": "free quote"}, {"Callout 1": "Free Quote"}])
+    violations = find_violations(df)
+    assert list(zip(violations["row"], violations["column"])) == [(0, "Callout 2")]
+
+
+def test_output_round_trips_in_its_own_format(tmp_path):
+    for name in ("ads.csv", "ads.xlsx"):
+        path = str(tmp_path / name)
+        write_output(_ads(), path)
+        assert read_output(path).equals(_ads())
@@ -0,0 +1,36 @@
+# Standard Libraries
+import time
+
+# Local Modules
+from chatbot import FALLBACK_ANSWER, answer_question_concurrent
+
+
+# Answers from the document text after a per-document delay
+class SlowLLM:
+    def __init__(self, delays):
+        self.delays = delays
+
+    def predict(self, prompt):
+        for marker, (delay, answer) in self.delays.items():
+            if marker in prompt:
+                time.sleep(delay)
+                return answer
+        return FALLBACK_ANSWER
+
+
+def test_slow_low_priority_source_does_not_delay_answer():
+    llm = SlowLLM({"FAST DOC": (0.1, "Opens at 9am."), "SLOW DOC": (3.0, "Never mind.")})
+    start = time.monotonic()
+    answer, source = answer_question_concurrent(
+        llm, "When do you open?", {"Website": "FAST DOC", "Transcript": "SLOW DOC"}
+    )
+    assert (answer, source) == ("Opens at 9am.", "Website")
+    assert time.monotonic() - start < 1.0
+
+
+def test_falls_through_to_lower_priority_source():
+    llm = SlowLLM({"FIRST": (0.05, FALLBACK_ANSWER), "SECOND": (0.1, "Yes, on weekends.")})
+    answer, source = answer_question_concurrent(
+        llm, "Open on weekends?", {"Website": "FIRST", "Offers": "SECOND"}
+    )
+    assert (answer, source) == ("Yes, on weekends.", "Offers")
@@ -0,0 +1,36 @@
+# Local Modules
+from chunking import ChunkStream, chunk_pages, chunk_text
+
+
+def test_chunk_pages_yields_before_reading_every_page():
+    read = []
+
+    def pages():
+        for number in range(1, 6):
+            read.append(number)
+            yield number, f"Page {number} paragraph. " * 40
+
+    first = next(chunk_pages(pages(), max_tokens=200))
+    assert first["page"] == 1
+    assert len(read) < 5
+
+
+def test_chunks_keep_offsets_and_pages():
+    pages = [(1, "Alpha one.\n\nAlpha two."), (2, "Beta one.")]
+    text = "Alpha one.\n\nAlpha two.\n\nBeta one."
+    chunks = list(chunk_pages(pages, max_tokens=4))
+    assert [text[c["start"] : c["end"]] for c in chunks] == [c["text"] for c in chunks]
+    assert chunks[0]["page"] == 1 and chunks[-1]["page"] == 2
+
+
+def test_chunk_text_returns_a_list():
+    assert chunk_text("") == []
+    assert isinstance(chunk_text("Hello there."), list)
+
+
+def test_chunk_stream_replays_and_reports_completion():
+    completed = []
+    stream = ChunkStream(iter(["a", "b"]), on_complete=completed.append)
+    assert list(stream) == ["a", "b"]
+    assert list(stream) == ["a", "b"]
+    assert completed == [["a", "b"]]
@@ -0,0 +1,81 @@
+# Standard Libraries
+import functools
+import io
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Third-Party Libraries
+import pytest
+
+# Local Modules
+import file_utils
+
+
+# Static file server that tags responses with an ETag and answers 304 when it matches
+class _ETagHandler(SimpleHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        super().do_GET()
+
+    def end_headers(self):
+        self.send_header("ETag", '"v1"')
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def served_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_utils, "DOWNLOAD_CACHE_DIR", str(tmp_path / "cache"))
+    (tmp_path / "doc.bin").write_bytes(b"x" * 5000)
+    _ETagHandler.hits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_ETagHandler, directory=str(tmp_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/doc.bin"
+    server.shutdown()
+    server.server_close()
+
+
+def test_not_modified_is_served_from_a_spooled_copy(served_file):
+    first = file_utils.download_google_file_as_bytes(served_file)
+    second = file_utils.download_google_file_as_bytes(served_file)
+
+    assert _ETagHandler.hits == [None, '"v1"']
+    assert isinstance(second, io.BytesIO)
+    assert second.read() == first.read() == b"x" * 5000
+
+
+def test_cache_can_be_bypassed(served_file):
+    file_utils.download_google_file_as_bytes(served_file)
+    file_utils.download_google_file_as_bytes(served_file, use_cache=False)
+    assert _ETagHandler.hits == [None, None]
+
+
+
+def test_cache_evicts_least_recently_used_copies_over_the_size_cap(served_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(file_utils, "DOWNLOAD_CACHE_MAX_BYTES", 12000)
+    root = served_file.rsplit("/", 1)[0]
+    for name in ("b.bin", "c.bin"):
+        (tmp_path / name).write_bytes(b"y" * 5000)
+
+    def cached(url):
+        return file_utils._load_cached(url)[0] is not None
+
+    file_utils.download_google_file_as_bytes(served_file)
+    file_utils.download_google_file_as_bytes(f"{root}/b.bin")
+    # A 304 hit marks the first file as recently used
+    time.sleep(0.01)
+    file_utils.download_google_file_as_bytes(served_file)
+    file_utils.download_google_file_as_bytes(f"{root}/c.bin")
+
+    assert cached(served_file) and cached(f"{root}/c.bin")
+    assert not cached(f"{root}/b.bin")
+    assert sum(f.stat().st_size for f in (tmp_path / "cache").glob("*.bin")) <= 12000
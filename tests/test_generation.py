@@ -0,0 +1,86 @@
+# Standard Libraries
+import io
+
+# Third-Party Libraries
+import pandas as pd
+from docx import Document
+
+# Local Modules
+import generation
+import summary_cache
+from checkpoints import CheckpointStore
+from mock_llm import MockLLM
+from summary_cache import SummaryCache
+
+SHEET_NAME = "Keywords"
+KEYWORD_GROUPS = {
+    "Boilers": ["boiler repair", "boiler service"],
+    "Drains": ["blocked drain", "drain cleaning"],
+    "Heating": ["central heating", "radiator repair"],
+}
+
+
+def _docx(text):
+    buffer = io.BytesIO()
+    doc = Document()
+    doc.add_paragraph(text)
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _xlsx(groups):
+    buffer = io.BytesIO()
+    pd.DataFrame(groups).to_excel(buffer, sheet_name=SHEET_NAME, index=False)
+    return buffer.getvalue()
+
+
+# MockLLM that keeps the keywords of every ad request and can fail chosen groups
+class AdsMock(MockLLM):
+    def __init__(self, failing=()):
+        super().__init__(latency_scale=0)
+        self.failing = failing
+        self.ad_keywords = []
+        self.summary_calls = 0
+
+    # Keep recording on this instance when the pipeline asks for a per-run client
+    def for_run(self, retry_budget=None):
+        return self
+
+    def predict(self, prompt):
+        if "🔑 TARGET KEYWORDS:" in prompt:
+            keywords = prompt.rsplit("drift to unrelated topics:", 1)[-1].strip()
+            self.ad_keywords.append(keywords)
+            if any(word in keywords for word in self.failing):
+                raise RuntimeError("ads model unavailable")
+        elif "CONTENT:" in prompt:
+            self.summary_calls += 1
+        return super().predict(prompt)
+
+
+def test_resumed_run_only_regenerates_failed_groups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    files = {
+        "rules": _docx("Write clear, benefit-led ads for every keyword group."),
+        "website": _docx("Fast boiler, drain and heating repairs across Boston, 24/7."),
+        "sheet": _xlsx(KEYWORD_GROUPS),
+    }
+    monkeypatch.setattr(generation, "download_google_file_as_bytes", lambda url: io.BytesIO(files[url]))
+    monkeypatch.setattr(generation, "get_checkpoint_store", lambda: store)
+    monkeypatch.setattr(summary_cache, "_default_cache", SummaryCache(str(tmp_path / "summaries.sqlite3")))
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+
+    def run(llm):
+        return generation.run_pipeline(
+            llm, "rules", {"website": "website"}, "sheet", SHEET_NAME,
+            str(tmp_path / "ads.csv"), lambda progress=None, message=None: None,
+        )
+
+    first = AdsMock(failing=["drain"])
+    assert run(first)["failed_groups"] == ["Drains"]
+    assert len(first.ad_keywords) == 3
+
+    rerun = AdsMock()
+    result = run(rerun)
+    assert result["failed_groups"] == []
+    assert rerun.ad_keywords == ["blocked drain, drain cleaning"]
+    assert rerun.summary_calls == 0
@@ -0,0 +1,49 @@
+# Standard Libraries
+import threading
+import time
+
+# Local Modules
+from jobs import DONE, QUEUED, RUNNING, JobRunner
+
+
+def _wait_for(runner, job_id, status, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if runner.get(job_id)["status"] == status:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+def test_queue_position_counts_jobs_ahead(tmp_path):
+    runner = JobRunner(str(tmp_path / "jobs.sqlite3"), workers=1)
+    job_ids = [runner.submit("ads", {"n": n}, owner=f"user{n}") for n in range(3)]
+
+    # No handler is registered yet, so every job waits in submission order
+    assert [runner.get(job_id)["position"] for job_id in job_ids] == [0, 1, 2]
+
+    runner.register("ads", lambda job: job.params["n"])
+    for job_id in job_ids:
+        _wait_for(runner, job_id, DONE)
+    assert [runner.get(job_id)["result"] for job_id in job_ids] == [0, 1, 2]
+    assert runner.get(job_ids[-1])["position"] == 0
+
+
+def test_owner_limit_lets_other_owners_run_first(tmp_path):
+    runner = JobRunner(str(tmp_path / "jobs.sqlite3"), workers=2, per_owner=1)
+    release = threading.Event()
+    runner.register("ads", lambda job: release.wait(5))
+
+    first = runner.submit("ads", {}, owner="alice")
+    second = runner.submit("ads", {}, owner="alice")
+    other = runner.submit("ads", {}, owner="bob")
+
+    # Alice's second job waits for her first even though a worker is free; Bob's starts
+    _wait_for(runner, first, RUNNING)
+    _wait_for(runner, other, RUNNING)
+    assert runner.get(second)["status"] == QUEUED
+    assert runner.get(second)["position"] == 0
+
+    release.set()
+    _wait_for(runner, second, DONE)
+    assert runner.get(first)["status"] == DONE
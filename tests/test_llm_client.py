@@ -0,0 +1,145 @@
+# Standard Libraries
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Third-Party Libraries
+import pytest
+
+# Local Modules
+import llm_client
+from llm_client import LLMClient, LLMError, RetryBudget
+
+
+# Fake chat completions endpoint that plays back a script of (status, headers, body) replies
+class FakeOpenAI:
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                fake.requests += 1
+                status, headers, body = fake.script.pop(0) if fake.script else fake.ok()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    @staticmethod
+    def ok(text="hello"):
+        body = {
+            "choices": [{"message": {"content": text}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 1},
+        }
+        return 200, {"Content-Type": "application/json"}, json.dumps(body).encode()
+
+    @staticmethod
+    def error(status, headers=None):
+        return status, headers or {}, b'{"error": {"message": "nope"}}'
+
+
+@pytest.fixture
+def fake_server():
+    servers = []
+
+    def start(script):
+        servers.append(FakeOpenAI(script))
+        return servers[-1]
+
+    yield start
+    for fake in servers:
+        fake.server.shutdown()
+        fake.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(llm_client, "BACKOFF_BASE", 0.01)
+
+
+# A model name per test keeps each client on its own process-wide governor
+def _client(fake, model, **kwargs):
+    return LLMClient(model, api_key="test", base_url=fake.base_url, **kwargs)
+
+
+def test_rate_limit_waits_for_retry_after(fake_server):
+    fake = fake_server([FakeOpenAI.error(429, {"Retry-After": "0.3"}), FakeOpenAI.ok("done")])
+    client = _client(fake, "test-429")
+
+    start = time.monotonic()
+    assert client.predict("hi") == "done"
+    assert time.monotonic() - start >= 0.3
+    assert fake.requests == 2
+    assert client.metrics.retries == 1
+
+
+def test_server_errors_are_retried(fake_server):
+    fake = fake_server([FakeOpenAI.error(500), FakeOpenAI.error(503), FakeOpenAI.ok("done")])
+    client = _client(fake, "test-5xx")
+
+    assert client.predict("hi") == "done"
+    assert fake.requests == 3
+    assert client.metrics.retries == 2
+
+
+def test_client_errors_are_not_retried(fake_server):
+    fake = fake_server([FakeOpenAI.error(400)])
+    client = _client(fake, "test-400")
+
+    with pytest.raises(LLMError) as info:
+        client.predict("hi")
+    assert info.value.status == 400
+    assert fake.requests == 1
+
+
+def test_retry_budget_is_shared_and_exhausted(fake_server):
+    fake = fake_server([FakeOpenAI.error(500)] * 10)
+    budget = RetryBudget(2)
+    client = _client(fake, "test-budget", retry_budget=budget)
+
+    with pytest.raises(LLMError) as info:
+        client.predict("hi")
+    assert info.value.status == 500
+    assert fake.requests == 3
+    assert budget.remaining == 0
+    assert client.metrics.errors == 1
+
+    # The next call has no retries left and fails on its first error
+    with pytest.raises(LLMError):
+        client.predict("again")
+    assert fake.requests == 4
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"<html>bad gateway</html>", b'{"id": "x"}', b'{"choices": []}'],
+)
+def test_malformed_success_body_raises_llm_error(fake_server, body):
+    fake = fake_server([(200, {"Content-Type": "application/json"}, body)] * 3)
+    client = _client(fake, f"test-malformed-{len(body)}", max_retries=0)
+
+    with pytest.raises(LLMError) as info:
+        client.predict("hi")
+    assert info.value.status is None
+    assert "Malformed response" in str(info.value)
+
+
+def test_malformed_body_is_retried(fake_server):
+    fake = fake_server([(200, {}, b"not json"), FakeOpenAI.ok("done")])
+    client = _client(fake, "test-malformed-retry")
+
+    assert client.predict("hi") == "done"
+    assert fake.requests == 2
@@ -0,0 +1,70 @@
+# Third-Party Libraries
+import pytest
+
+# Local Modules
+from ad_generator import generate_ads
+from llm_client import LLMError
+from llm_replay import FixtureStore, ReplayLLM, record_llm, replay_router
+from mock_llm import MockLLM
+from model_routing import ModelRouter
+
+RULES = "Write clear, benefit-led ads. Never promise prices that are not in the offers."
+GROUPS = {"Boilers": ["boiler repair"], "Drains": ["blocked drain"]}
+
+
+def _mock_router():
+    return ModelRouter(client_factory=lambda model: MockLLM(model, latency_scale=0))
+
+
+def test_recorded_run_replays_identically_from_the_fixture_file(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    recorded = generate_ads(record_llm(_mock_router(), path), GROUPS, RULES, requests_per_second=None)
+
+    # A fresh store reads the fixtures back from disk
+    store = FixtureStore(path)
+    replay = replay_router(store, latency=0)
+    replayed = generate_ads(replay, GROUPS, RULES, requests_per_second=None)
+
+    assert len(store) > 0
+    assert replayed == recorded
+    assert sum(client.misses for client in replay.clients.values()) == 0
+
+
+def test_changed_prompt_misses_the_fixture():
+    store = FixtureStore(path=None)
+    store.add("gpt-4.1", "Summarize the offers page.", "20% off boilers")
+    llm = ReplayLLM(store, "gpt-4.1", latency=0)
+
+    assert llm.predict("Summarize the offers page.") == "20% off boilers"
+    with pytest.raises(LLMError):
+        llm.predict("Summarize the offers page!")
+    assert llm.misses == 1
+
+
+def test_miss_uses_the_fallback_when_given():
+    store = FixtureStore(path=None)
+    llm = ReplayLLM(store, "gpt-4.1", latency=0, fallback=lambda prompt: "live reply")
+
+    assert llm.predict("A prompt nobody recorded") == "live reply"
+    assert llm.misses == 1
+
+
+def test_injected_errors_fail_the_same_prompts_every_run():
+    store = FixtureStore(path=None)
+    prompts = [f"prompt {n}" for n in range(20)]
+    for prompt in prompts:
+        store.add("gpt-4.1", prompt, "ok")
+
+    def failures():
+        llm = ReplayLLM(store, "gpt-4.1", latency=0, error_rate=0.5, seed=7)
+        failed = []
+        for prompt in prompts:
+            try:
+                llm.predict(prompt)
+            except LLMError:
+                failed.append(prompt)
+        return failed
+
+    first = failures()
+    assert 0 < len(first) < len(prompts)
+    assert failures() == first
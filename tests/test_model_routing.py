@@ -0,0 +1,63 @@
+# Third-Party Libraries
+import pytest
+
+# Local Modules
+from mock_llm import MockLLM
+from model_routing import (
+    DEFAULT_ROUTING,
+    FLAGSHIP_MODEL,
+    MINI_MODEL,
+    ModelRouter,
+    for_stage,
+    load_routing,
+)
+from summarizer import summarize_chunks
+
+
+def _router(routing=None):
+    return ModelRouter(routing, client_factory=lambda model: MockLLM(model, latency_scale=0))
+
+
+def test_default_routing_sends_volume_stages_to_the_cheaper_model(monkeypatch):
+    monkeypatch.delenv("MODEL_ROUTING", raising=False)
+    router = _router()
+
+    assert router.routing == DEFAULT_ROUTING
+    assert for_stage(router, "map").model_name == MINI_MODEL
+    assert for_stage(router, "ads").model_name == FLAGSHIP_MODEL
+    assert router.model_name == FLAGSHIP_MODEL
+
+
+def test_model_routing_env_overrides_only_the_named_stages(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTING", "map=gpt-4.1-nano; ads = gpt-4o")
+    router = _router()
+
+    assert for_stage(router, "map").model_name == "gpt-4.1-nano"
+    assert for_stage(router, "ads").model_name == "gpt-4o"
+    assert for_stage(router, "reduce").model_name == DEFAULT_ROUTING["reduce"]
+
+
+def test_explicit_routing_wins_over_env(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTING", "map=gpt-4.1-nano")
+    assert load_routing({"map": "gpt-4o-mini"})["map"] == "gpt-4o-mini"
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(ValueError):
+        load_routing("summary=gpt-4.1-mini")
+
+
+def test_plain_client_serves_every_stage():
+    llm = MockLLM(latency_scale=0)
+    assert all(for_stage(llm, stage) is llm for stage in DEFAULT_ROUTING)
+
+
+def test_summary_calls_go_to_the_map_and_reduce_models():
+    router = _router({"map": "gpt-4.1-nano", "reduce": "gpt-4o"})
+    chunks = [f"Chunk {n}: our boiler service is fast and reliable." for n in range(3)]
+    summarize_chunks(router, chunks, "Doc", use_cache=False, requests_per_second=None)
+
+    calls = {row["stage"]: (row["model"], row["calls"]) for row in router.stage_report()}
+    assert calls["map"] == ("gpt-4.1-nano", 3)
+    assert calls["reduce"] == ("gpt-4o", 1)
+    assert calls["ads"][1] == 0
@@ -0,0 +1,67 @@
+# Standard Libraries
+import threading
+
+# Third-Party Libraries
+import pytest
+
+# Local Modules
+from pipeline import Pipeline
+
+
+def test_stages_run_after_their_dependencies_with_results_in_order():
+    order = []
+
+    def stage(name, value):
+        def run(*args):
+            order.append(name)
+            return value(*args)
+        return run
+
+    pipeline = Pipeline()
+    pipeline.add("a", stage("a", lambda: 2))
+    pipeline.add("b", stage("b", lambda: 3))
+    pipeline.add("product", stage("product", lambda a, b: a * b), deps=["a", "b"])
+    pipeline.add("diff", stage("diff", lambda product, a: product - a), deps=["product", "a"])
+
+    results = pipeline.run()
+
+    assert results == {"a": 2, "b": 3, "product": 6, "diff": 4}
+    assert order.index("product") > max(order.index("a"), order.index("b"))
+    assert order[-1] == "diff"
+
+
+def test_independent_stages_overlap():
+    both_started = threading.Barrier(2, timeout=5)
+
+    # Only returns once the other stage is running too
+    def meet():
+        both_started.wait()
+        return True
+
+    pipeline = Pipeline()
+    pipeline.add("left", meet)
+    pipeline.add("right", meet)
+
+    assert pipeline.run() == {"left": True, "right": True}
+
+
+def test_failed_stage_skips_its_dependents():
+    ran = []
+
+    def fail():
+        raise RuntimeError("download failed")
+
+    pipeline = Pipeline()
+    pipeline.add("download", fail)
+    pipeline.add("extract", lambda data: ran.append("extract"), deps=["download"])
+    pipeline.add("summary", lambda chunks: ran.append("summary"), deps=["extract"])
+
+    with pytest.raises(RuntimeError, match="download failed"):
+        pipeline.run()
+    assert ran == []
+    assert "extract" not in pipeline.results
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        Pipeline().add("ads", lambda summary: summary, deps=["summary"])
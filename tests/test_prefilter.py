@@ -0,0 +1,24 @@
+# Local Modules
+from prefilter import prefilter_chunks
+
+CHUNKS = [
+    "Tom: hi, how was the weekend?\nAnn: good, the weather was lovely",
+    "Tom: our boiler service comes with a two year warranty\nAnn: great",
+    "Tom: the kids are fine\nAnn: we ran a sale on boiler repairs last week\nTom: ha",
+    "Tom: the price is 49 dollars for a boiler check",
+]
+GROUPS = {"Boilers": ["boiler repair", "boiler service"]}
+
+
+def test_drop_keeps_most_relevant_chunks_in_order():
+    kept, report = prefilter_chunks(CHUNKS, GROUPS, keep_fraction=0.5)
+    assert kept == [CHUNKS[1], CHUNKS[3]]
+    assert report["calls_saved"] == 2 and report["merged"] == 0
+
+
+def test_merge_condenses_relevant_lines_of_low_chunks():
+    kept, report = prefilter_chunks(CHUNKS, GROUPS, keep_fraction=0.5, merge=True)
+    assert kept == [CHUNKS[1], "Ann: we ran a sale on boiler repairs last week", CHUNKS[3]]
+    assert report["merged"] == 1
+    assert report["calls_saved"] == 1
+    assert report["tokens_saved"] > 0
@@ -0,0 +1,63 @@
+# Standard Libraries
+import os
+import threading
+
+# Local Modules
+from ad_generator import generate_ads
+from mock_llm import MockLLM
+from model_routing import ModelRouter
+from prompt_prefix import PrefixStats, SharedPrefix, count_tokens
+
+# Provider prompt caches only apply to prefixes of at least this many tokens
+MIN_CACHED_TOKENS = 1024
+
+RULES = "\n".join(f"Rule {n}: keep every headline specific, benefit-led and free of filler." for n in range(200))
+
+
+# Mock provider with a per-model prompt cache: a prompt is a cache hit when it shares at least
+# MIN_CACHED_TOKENS of leading text with a prompt this model has already been sent
+class CachingProvider(MockLLM):
+    def __init__(self, model):
+        super().__init__(model, latency_scale=0)
+        self._lock = threading.Lock()
+        self.first_prompt = None
+        self.prompts = 0
+        self.hits = 0
+
+    def predict(self, prompt):
+        with self._lock:
+            self.prompts += 1
+            if self.first_prompt is None:
+                self.first_prompt = prompt
+            else:
+                shared = os.path.commonprefix([self.first_prompt, prompt])
+                self.hits += count_tokens(shared) >= MIN_CACHED_TOKENS
+        return super().predict(prompt)
+
+
+def test_prefix_is_reused_across_a_200_group_run():
+    clients = {
+        stage: CachingProvider("gpt-4.1-mini" if stage == "repair" else "gpt-4.1")
+        for stage in ("map", "reduce", "ads", "chatbot", "repair")
+    }
+    router = ModelRouter(clients=clients)
+    groups = {f"Group {n}": [f"boiler repair {n}", f"boiler service {n}"] for n in range(200)}
+    stats = PrefixStats()
+
+    rows = generate_ads(router, groups, RULES, prefix_stats=stats, requests_per_second=None)
+
+    ads = clients["ads"]
+    assert len(rows) == 200
+    assert ads.prompts == stats.prompts == 200
+    # What the provider saw matches what the prefix layer reports
+    assert ads.hits == stats.reused == 199
+    assert stats.reuse_rate >= 0.99
+
+
+def test_reuse_is_counted_per_model():
+    prefix = SharedPrefix("Shared instructions")
+    stats = PrefixStats()
+    stats.record(prefix, "a", model="gpt-4.1")
+    stats.record(prefix, "b", model="gpt-4.1")
+    stats.record(prefix, "c", model="gpt-4.1-mini")
+    assert (stats.prompts, stats.reused) == (3, 1)
@@ -0,0 +1,122 @@
+# Third-Party Libraries
+import pytest
+
+# Local Modules
+from mock_llm import MockLLM
+import summary_cache
+from summarizer import estimate_summary_plan, summarize_chunks
+from summary_cache import SummaryCache
+
+
+# MockLLM that notes how many chunks had been read when each map call started
+class ObservingMock(MockLLM):
+    def __init__(self, read):
+        super().__init__(latency_scale=0)
+        self.read = read
+        self.seen_at_call = []
+
+    def predict(self, prompt):
+        if "CONTENT:" in prompt:
+            self.seen_at_call.append(len(self.read))
+        return super().predict(prompt)
+
+
+def test_streamed_chunks_reach_the_map_stage_before_extraction_ends():
+    read = []
+
+    def chunks():
+        for n in range(20):
+            read.append(n)
+            yield {"text": f"Chunk {n}: our boiler service is fast and reliable."}
+
+    llm = ObservingMock(read)
+    report = {}
+    summary = summarize_chunks(
+        llm, chunks(), "Doc", max_workers=1, requests_per_second=None, use_cache=False, report=report
+    )
+
+    assert summary
+    assert report == {"chunks": 20, "summarized": 20, "complete": True}
+    assert min(llm.seen_at_call) < 20
+
+
+# MockLLM that counts its calls
+class CountingMock(MockLLM):
+    def __init__(self):
+        super().__init__(latency_scale=0)
+        self.calls = 0
+
+    def predict(self, prompt):
+        self.calls += 1
+        return super().predict(prompt)
+
+
+def _long_document(chunks=100):
+    return [
+        " ".join(f"Fact {n}.{i}: the boiler service includes a free safety check." for i in range(40))
+        for n in range(chunks)
+    ]
+
+
+def test_plan_includes_reduce_levels():
+    chunks = _long_document()
+    plan = estimate_summary_plan(chunks, "Doc", map_model="gpt-4.1", reduce_model="gpt-4.1")
+    short_plan = estimate_summary_plan(chunks[:5], "Doc", map_model="gpt-4.1", reduce_model="gpt-4.1")
+
+    assert plan["reduce_levels"] == 1 and plan["reduce_calls"] > 1
+    assert plan["calls"] == len(chunks) + plan["reduce_calls"] + 1
+    assert short_plan["reduce_calls"] == 0 and short_plan["calls"] == 6
+
+    llm = CountingMock()
+    summarize_chunks(llm, chunks, "Doc", use_cache=False, requests_per_second=None)
+    assert llm.calls == plan["calls"]
+
+
+def test_cost_cap_uses_the_full_plan():
+    chunks = _long_document()
+    plan = estimate_summary_plan(chunks, "Doc", map_model="gpt-4.1", reduce_model="gpt-4.1")
+
+    with pytest.raises(ValueError):
+        summarize_chunks(CountingMock(), chunks, "Doc", use_cache=False, max_cost=plan["cost"] - 0.0001)
+    summary = summarize_chunks(
+        CountingMock(), chunks, "Doc", use_cache=False, requests_per_second=None, max_cost=plan["cost"]
+    )
+    assert summary
+
+
+def test_streamed_rerun_makes_no_llm_calls(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_cache, "_default_cache", SummaryCache(str(tmp_path / "summaries.sqlite3")))
+    chunks = [f"Chunk {n}: our boiler service is fast and reliable." for n in range(5)]
+
+    first = CountingMock()
+    summary = summarize_chunks(first, iter(chunks), "Streamed Doc", requests_per_second=None)
+    assert first.calls == 6
+
+    rerun = CountingMock()
+    assert summarize_chunks(rerun, iter(chunks), "Streamed Doc", requests_per_second=None) == summary
+    assert rerun.calls == 0
+
+
+# MockLLM whose final combine call fails
+class FailingFinalMock(CountingMock):
+    def predict(self, prompt):
+        if "Summarize the following summaries" in prompt:
+            raise RuntimeError("final combine failed")
+        return super().predict(prompt)
+
+
+def test_failed_final_combine_keeps_the_chunk_summaries(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_cache, "_default_cache", SummaryCache(str(tmp_path / "summaries.sqlite3")))
+    chunks = [f"Chunk {n}: our boiler service is fast and reliable." for n in range(3)]
+
+    report = {}
+    summary = summarize_chunks(
+        FailingFinalMock(), chunks, "Doc", max_workers=1, requests_per_second=None, report=report
+    )
+    assert summary.count("\n\n") == 2
+    assert report["complete"] is False
+
+    # The fallback is not cached, so the next run retries the combine
+    rerun = CountingMock()
+    assert summarize_chunks(rerun, chunks, "Doc", requests_per_second=None) != summary
+    assert rerun.calls == 1
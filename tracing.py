@@ -0,0 +1,323 @@
+# Standard Libraries
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Where each run's spans are written as JSON lines (override via environment variable)
+TRACE_DIR = os.getenv("TRACE_DIR", os.path.join(".cache", "traces"))
+
+# Prometheus text endpoint: off unless METRICS_PORT is set, and bound to localhost unless
+# METRICS_HOST says otherwise (override via environment variables)
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Counters that leaf code adds to the current span and that roll up into the run summary
+SPAN_COUNTERS = ("cache_hits", "checkpoint_hits", "bytes_downloaded", "rate_limit_wait")
+
+# Tracer of the run being executed and the innermost open span; copied into worker
+# threads by the pipeline and concurrency helpers
+_current_tracer = contextvars.ContextVar("current_tracer", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+# One timed unit of work (a pipeline stage, an LLM call, ...) with free-form attributes
+class Span:
+    def __init__(self, run_id, name, kind, parent_id=None, attrs=None):
+        self.run_id = run_id
+        self.id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attrs = dict(attrs or {})
+        self.start = time.time()
+        self.duration = None
+        self.status = "ok"
+        self.error = None
+        self._lock = threading.Lock()
+
+    def set(self, **attrs):
+        with self._lock:
+            self.attrs.update(attrs)
+
+    # Add to a numeric attribute (spans may be updated from several worker threads)
+    def add(self, name, amount=1):
+        with self._lock:
+            self.attrs[name] = self.attrs.get(name, 0) + amount
+
+    def as_dict(self):
+        return {
+            "run_id": self.run_id,
+            "span_id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": round(self.start, 3),
+            "duration": round(self.duration or 0.0, 4),
+            "status": self.status,
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+# Stand-in used when no run is being traced
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+    def add(self, name, amount=1):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# Collects the spans of one run
+class Tracer:
+    def __init__(self, run_id=None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.spans = []
+        self._lock = threading.Lock()
+
+    # Make this the tracer for code running in the current context
+    @contextlib.contextmanager
+    def activate(self):
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    # Function to time a block as a span, nested under the current span
+    @contextlib.contextmanager
+    def span(self, name, kind="stage", **attrs):
+        parent = _current_span.get()
+        span = Span(self.run_id, name, kind, parent.id if isinstance(parent, Span) else None, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = str(e)[:200]
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.time() - span.start
+            with self._lock:
+                self.spans.append(span)
+            get_metrics_registry().observe(span)
+
+    # Function to write the spans as JSON lines (TRACE_DIR/<run id>.jsonl by default)
+    def write_jsonl(self, path=None):
+        path = path or os.path.join(TRACE_DIR, f"{self.run_id}.jsonl")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.as_dict(), ensure_ascii=False) + "\n")
+        return path
+
+    # Function to roll every stage span's subtree (LLM calls, counters) into one row per stage
+    def summary_rows(self):
+        with self._lock:
+            spans = list(self.spans)
+        children = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+        run_start = min((span.start for span in spans), default=0.0)
+
+        def subtree(span):
+            yield span
+            for child in children.get(span.id, []):
+                yield from subtree(child)
+
+        rows = []
+        for stage in sorted((s for s in spans if s.kind == "stage"), key=lambda s: s.start):
+            calls = [s for s in subtree(stage) if s.kind == "llm"]
+            row = {
+                "stage": stage.name,
+                "status": stage.status,
+                "start": round(stage.start - run_start, 2),
+                "seconds": round(stage.duration or 0.0, 2),
+                "llm_calls": len(calls),
+                "llm_errors": sum(s.status != "ok" for s in calls),
+                "retries": sum(s.attrs.get("retries", 0) for s in calls),
+                "prompt_tokens": sum(s.attrs.get("prompt_tokens", 0) for s in calls),
+                "completion_tokens": sum(s.attrs.get("completion_tokens", 0) for s in calls),
+                "queue_wait": sum(s.attrs.get("queue_wait", 0.0) for s in calls),
+                "model_latency": round(sum(s.attrs.get("latency", 0.0) for s in calls), 2),
+            }
+            for counter in SPAN_COUNTERS:
+                row[counter] = sum(s.attrs.get(counter, 0) for s in subtree(stage))
+            # Queue wait covers both the concurrency governor and the request rate limit
+            row["queue_wait"] = round(row["queue_wait"] + row.pop("rate_limit_wait"), 2)
+            rows.append(row)
+        return rows
+
+    def summary(self):
+        lines = ["🧭 Run summary (stage: seconds | LLM calls | tokens in/out | queue wait vs model time):"]
+        for row in self.summary_rows():
+            lines.append(
+                f"  {row['stage']:<24} {row['seconds']:>8.2f}s | {row['llm_calls']:>4} calls "
+                f"({row['retries']} retries) | {row['prompt_tokens']:>7}/{row['completion_tokens']:<6} | "
+                f"wait {row['queue_wait']:.1f}s vs model {row['model_latency']:.1f}s | "
+                f"{row['cache_hits'] + row['checkpoint_hits']} cache hits | "
+                f"{row['bytes_downloaded'] / 1024:.0f} KB"
+            )
+        return "\n".join(lines)
+
+
+# Tracer of the current run, or None outside a traced run
+def current_tracer():
+    return _current_tracer.get()
+
+
+# Function to time a block as a span of the current run (a no-op outside a traced run)
+@contextlib.contextmanager
+def trace_span(name, kind="stage", **attrs):
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield _NULL_SPAN
+        return
+    with tracer.span(name, kind, **attrs) as span:
+        yield span
+
+
+# Add to a counter on the innermost open span (cache hits, bytes downloaded, ...)
+def count(name, amount=1):
+    span = _current_span.get()
+    if span is not None:
+        span.add(name, amount)
+
+
+# Process-wide counters fed by finished spans, rendered in the Prometheus text format
+class MetricsRegistry:
+    FAMILIES = {
+        "adgen_runs_total": ("counter", "Traced pipeline runs"),
+        "adgen_stage_seconds_total": ("counter", "Wall time spent in each pipeline stage"),
+        "adgen_stage_runs_total": ("counter", "Pipeline stage executions"),
+        "adgen_llm_calls_total": ("counter", "LLM calls"),
+        "adgen_llm_retries_total": ("counter", "LLM call retries"),
+        "adgen_llm_prompt_tokens_total": ("counter", "Prompt tokens sent"),
+        "adgen_llm_completion_tokens_total": ("counter", "Completion tokens received"),
+        "adgen_llm_latency_seconds": ("summary", "Model latency of LLM calls"),
+        "adgen_llm_queue_wait_seconds_total": ("counter", "Time LLM calls waited for a concurrency slot"),
+        "adgen_rate_limit_wait_seconds_total": ("counter", "Time requests waited on the request rate limit"),
+        "adgen_cache_hits_total": ("counter", "Cache and checkpoint hits"),
+        "adgen_download_bytes_total": ("counter", "Bytes downloaded"),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {}  # (metric, labels) -> value
+
+    def _inc(self, metric, amount=1, **labels):
+        if amount:
+            key = (metric, tuple(sorted(labels.items())))
+            self.values[key] = self.values.get(key, 0) + amount
+
+    # Function to fold a finished span into the counters
+    def observe(self, span):
+        attrs = span.attrs
+        with self._lock:
+            if span.kind == "run":
+                self._inc("adgen_runs_total", status=span.status)
+            elif span.kind == "stage":
+                stage = span.name.split(":", 1)[0]
+                self._inc("adgen_stage_seconds_total", span.duration, stage=stage)
+                self._inc("adgen_stage_runs_total", stage=stage, status=span.status)
+            elif span.kind == "llm":
+                labels = {"stage": attrs.get("stage") or "", "model": attrs.get("model", "")}
+                self._inc("adgen_llm_calls_total", status=span.status, **labels)
+                self._inc("adgen_llm_retries_total", attrs.get("retries", 0), **labels)
+                self._inc("adgen_llm_prompt_tokens_total", attrs.get("prompt_tokens", 0), **labels)
+                self._inc("adgen_llm_completion_tokens_total", attrs.get("completion_tokens", 0), **labels)
+                self._inc("adgen_llm_queue_wait_seconds_total", attrs.get("queue_wait", 0.0), **labels)
+                if span.status == "ok":
+                    self._inc("adgen_llm_latency_seconds_sum", attrs.get("latency", 0.0), **labels)
+                    self._inc("adgen_llm_latency_seconds_count", 1, **labels)
+            for counter in ("cache_hits", "checkpoint_hits"):
+                self._inc("adgen_cache_hits_total", attrs.get(counter, 0), kind=counter.split("_")[0])
+            self._inc("adgen_download_bytes_total", attrs.get("bytes_downloaded", 0))
+            self._inc("adgen_rate_limit_wait_seconds_total", attrs.get("rate_limit_wait", 0.0))
+
+    # Function to render every metric in the Prometheus text exposition format
+    def render(self):
+        with self._lock:
+            values = dict(self.values)
+        lines = []
+        for family, (kind, help_text) in self.FAMILIES.items():
+            samples = sorted(
+                (metric, labels, value)
+                for (metric, labels), value in values.items()
+                if metric == family or (kind == "summary" and metric.startswith(family + "_"))
+            )
+            if not samples:
+                continue
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+            for metric, labels, value in samples:
+                label_text = ",".join(f'{name}="{_escape(label)}"' for name, label in labels)
+                lines.append(f"{metric}{{{label_text}}} {value:g}" if label_text else f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Escape a label value for the text format
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+# Shared metrics registry for the process
+def get_metrics_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+# Serves GET /metrics from the shared registry
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = get_metrics_registry().render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Function to start the Prometheus endpoint once per process; returns the server or None
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    global _server
+    with _server_lock:
+        if _server is None and port:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True, name="metrics").start()
+            print(f"📡 Prometheus metrics on http://{host}:{port}/metrics")
+        return _server